@@ -0,0 +1,180 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+# Admission control for the render endpoints. Two independent checks:
+# - a token bucket per client (address, or a known API key): one client can't crowd out the rest (429)
+# - a gate on concurrent renders with a short, bounded queue: past that the server is
+#   saturated and says so right away instead of letting latency climb for everyone (503)
+# Like metrics.py, all state is touched from the event loop thread only.
+
+CLIENT_RATE = 5.0         # sustained requests per second per client
+CLIENT_BURST = 20         # requests a client may make at once after being idle
+MAX_CLIENTS = 10000       # buckets kept; the least recently seen client is forgotten first
+RENDER_CONCURRENCY = 4
+RENDER_QUEUE = 32
+QUEUE_TIMEOUT = 2.0       # seconds a render may wait for a slot
+
+# API keys that get a bucket of their own (comma-separated). Any other key is ignored:
+# otherwise a client could shed its limit, and push real clients' buckets out, by
+# sending a fresh key with every request.
+API_KEYS = frozenset(key.strip() for key in os.environ.get("EMS_API_KEYS", "").split(",") if key.strip())
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float, cost: float = 1.0) -> float:
+        """Spend `cost` tokens: 0.0 if allowed, else the seconds until it would be"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate
+
+
+class ClientLimiter:
+    """A token bucket per client"""
+
+    def __init__(self, rate: float = CLIENT_RATE, burst: int = CLIENT_BURST, max_clients: int = MAX_CLIENTS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.clock = clock
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, client: str, cost: int = 1, paid: int = 0) -> float:
+        """0.0 if the client may go ahead, else how many seconds it should wait. `paid` tokens
+        were already taken for this request (by AdmissionMiddleware); they are put back and
+        the request charged as a whole, so a refusal costs nothing and waiting the returned
+        time is enough for the retry. A total above the burst can never succeed."""
+        now = self.clock()
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = TokenBucket(self.burst, now)
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+
+        if paid:
+            bucket.tokens = min(self.burst, bucket.tokens + paid)
+        wait = bucket.take(self.rate, self.burst, now, cost + paid)
+        if wait:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return wait
+
+
+class Saturated(Exception):
+    """No render slot free and the queue is full, or the wait for one timed out"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RenderGate:
+    """At most `limit` renders at once, at most `max_queue` waiting for a slot"""
+
+    def __init__(self, limit: int = RENDER_CONCURRENCY, max_queue: int = RENDER_QUEUE,
+                 timeout: float = QUEUE_TIMEOUT):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "queue_timeout": 0}
+        # Moving average of render time, for Retry-After
+        self.render_seconds = 0.05
+
+    def retry_after(self) -> float:
+        """Roughly how long until the renders queued now have drained"""
+        return self.render_seconds * (self.waiting + self.active + 1) / self.limit
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.active >= self.limit and self.waiting >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise Saturated("queue_full", self.retry_after())
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected["queue_timeout"] += 1
+            raise Saturated("queue_timeout", self.retry_after())
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+            self.render_seconds = 0.9 * self.render_seconds + 0.1 * (time.perf_counter() - start)
+
+    def depth(self) -> Dict[Tuple, int]:
+        return {(("state", "active"),): self.active, (("state", "waiting"),): self.waiting}
+
+    def rejections(self) -> Dict[Tuple, int]:
+        return {(("reason", reason),): n for reason, n in self.rejected.items()}
+
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    """Retry-After takes whole seconds; never tell a client 0"""
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def client_key(headers: Dict[str, str], client, api_keys: frozenset = API_KEYS) -> str:
+    """The client's API key if it is a known one, else its address"""
+    key = headers.get("x-api-key")
+    if key and key in api_keys:
+        return f"key:{key}"
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware: charges the client's bucket before the body is even read,
+    so a flood of rejected requests costs next to nothing"""
+
+    def __init__(self, app, limiter: ClientLimiter, paths: Iterable[str]):
+        self.app = app
+        self.limiter = limiter
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"] if k == b"x-api-key"}
+        wait = self.limiter.check(client_key(headers, scope.get("client")))
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Rate limit exceeded"}).encode("utf-8")
+        retry = retry_after_header(wait)["Retry-After"].encode("latin-1")
+        await send({"type": "http.response.start", "status": 429,
+                    "headers": [(b"content-type", b"application/json"), (b"retry-after", retry),
+                                (b"content-length", str(len(body)).encode("latin-1"))]})
+        await send({"type": "http.response.body", "body": body})
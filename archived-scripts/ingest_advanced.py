@@ -1,11 +1,24 @@
+import argparse
 import json
+import os
 import re
+import sys
 from pathlib import Path
 from typing import Dict, List, Optional
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from protocol_catalog import catalog_titles, load_catalog
+# Shared with the SQLite store, which derives the same fields from the served DB
+from protocol_store import extract_medications, provider_levels, requires_telemetry
+
+from ingest_profiler import add_profile_args, profile_protocol, profile_stage, profiling
+from section_scanner import bullet_blocks, extraction_budget, section_after_heading, starred_section
+
 TEXT_FILE = "ems-protocol-manual.txt"
 OUTPUT_FILE = "ems_protocols_structured.json"
 
+PEARLS_HEADING = re.compile(r'pearls?$', re.IGNORECASE)
+
 class ProtocolParser:
     """Advanced parser for EMS protocols with structured field extraction"""
     
@@ -14,18 +27,13 @@ class ProtocolParser:
         
     def extract_section(self, text: str, section_name: str) -> Optional[str]:
         """Extract a specific section from protocol text"""
-        # Try various section header formats
-        patterns = [
-            rf'{section_name}\s*\n(.*?)(?=\n[A-Z][a-z]+:|$)',
-            rf'{section_name}\s*\n(.*?)(?=\n\n[A-Z]|$)',
-            rf'\*\s*{section_name}[:\s]*(.*?)(?=\n\*|$)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-            if match:
-                return match.group(1).strip()
-        return None
+        # Either a heading line followed by the body, or an inline "* Name: ..." item.
+        # Both are single line-by-line passes; see section_scanner.
+        with extraction_budget(f"extract_section({section_name})"):
+            section = section_after_heading(text, section_name)
+            if section is None:
+                section = starred_section(text, section_name)
+        return section
     
     def extract_bulleted_list(self, text: str) -> List[str]:
         """Extract bullet point items"""
@@ -65,13 +73,9 @@ class ProtocolParser:
         pearls = []
         
         # Look for Pearls section
-        pearls_pattern = r'Pearls?\s*\n((?:^\s*\*[^\n]+\n?)+)'
-        matches = re.finditer(pearls_pattern, text, re.IGNORECASE | re.MULTILINE)
-        
-        for match in matches:
-            pearl_text = match.group(1)
-            items = re.findall(r'\*\s*([^\n]+)', pearl_text)
-            pearls.extend([p.strip() for p in items if len(p.strip()) > 10])
+        with extraction_budget("extract_pearls"):
+            items = bullet_blocks(text, PEARLS_HEADING)
+        pearls.extend([p for p in items if len(p) > 10])
         
         return pearls[:20]  # Limit to top 20
     
@@ -94,50 +98,7 @@ class ProtocolParser:
     
     def extract_medications(self, text: str) -> List[Dict]:
         """Extract medication administrations with dosages"""
-        meds = []
-        
-        # Comprehensive medication patterns
-        med_patterns = {
-            'EPINEPHRINE': r'EPINEPHRINE\s+(?:1:1000|1:10,000|1:100,000)?\s*,?\s*([^\n]+)',
-            'ATROPINE': r'ATROPINE\s+([^\n]+)',
-            'NALOXONE': r'NALOXONE\s+([^\n]+)',
-            'ALBUTEROL': r'ALBUTEROL\s+([^\n]+)',
-            'MIDAZOLAM': r'MIDAZOLAM\s+([^\n]+)',
-            'FENTANYL': r'FENTANYL\s+([^\n]+)',
-            'MORPHINE': r'MORPHINE\s+([^\n]+)',
-            'NITROGLYCERIN': r'NITROGLYCERIN\s+([^\n]+)',
-            'ADENOSINE': r'ADENOSINE\s+([^\n]+)',
-            'AMIODARONE': r'AMIODARONE\s+([^\n]+)',
-            'CALCIUM CHLORIDE': r'CALCIUM CHLORIDE\s+([^\n]+)',
-            'SODIUM BICARBONATE': r'SODIUM BICARBONATE\s+([^\n]+)',
-            'GLUCOSE': r'(?:GLUCOSE|D10)\s+([^\n]+)',
-            'DIPHENHYDRAMINE': r'DIPHENHYDRAMINE\s+([^\n]+)',
-            'ONDANSETRON': r'ONDANSETRON\s+([^\n]+)',
-        }
-        
-        for med_name, pattern in med_patterns.items():
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                dosage_info = match.group(1).strip()
-                
-                # Extract route
-                route = None
-                if re.search(r'\bIV\b', dosage_info, re.IGNORECASE):
-                    route = "IV"
-                elif re.search(r'\bIM\b', dosage_info, re.IGNORECASE):
-                    route = "IM"
-                elif re.search(r'\bIO\b', dosage_info, re.IGNORECASE):
-                    route = "IO"
-                elif re.search(r'\bIN\b', dosage_info, re.IGNORECASE):
-                    route = "IN"
-                
-                meds.append({
-                    'name': med_name.title(),
-                    'dosage': dosage_info,
-                    'route': route
-                })
-        
-        return meds
+        return extract_medications(text)
     
     def extract_decision_tree(self, text: str) -> List[Dict]:
         """Extract if/then decision logic"""
@@ -160,18 +121,7 @@ class ProtocolParser:
     
     def requires_telemetry(self, text: str) -> bool:
         """Check if protocol requires telemetry"""
-        telemetry_keywords = [
-            r'telemetry.*required',
-            r'contact.*physician',
-            r'physician order',
-            r'medical control',
-            r'telemetry contact shall be established'
-        ]
-        
-        for keyword in telemetry_keywords:
-            if re.search(keyword, text, re.IGNORECASE):
-                return True
-        return False
+        return requires_telemetry(text)
     
     def extract_contraindications(self, text: str) -> List[str]:
         """Extract contraindications"""
@@ -264,6 +214,7 @@ class ProtocolParser:
             
             # Treatment Information
             "medications": self.extract_medications(text),
+            "contraindications": self.extract_contraindications(text),
             "decision_tree": self.extract_decision_tree(text),
             
             # Operational Information
@@ -281,14 +232,7 @@ class ProtocolParser:
     
     def determine_provider_level(self, text: str) -> List[str]:
         """Determine which provider levels can use this protocol"""
-        levels = []
-        if re.search(r'\bE\b.*EMT', text):
-            levels.append('EMT')
-        if re.search(r'\bA\b.*AEMT', text):
-            levels.append('AEMT')
-        if re.search(r'\bP\b.*Paramedic', text):
-            levels.append('Paramedic')
-        return levels or ['All']
+        return provider_levels(text)
     
     def generate_id(self, title: str) -> str:
         """Generate clean protocol ID"""
@@ -300,8 +244,9 @@ class ProtocolParser:
     def parse_all_protocols(self):
         """Main parsing function"""
         print(f"📄 Reading {TEXT_FILE}...")
-        with open(TEXT_FILE, "r", encoding="utf-8", errors="ignore") as f:
-            full_text = f.read()
+        with profile_stage("read"):
+            with open(TEXT_FILE, "r", encoding="utf-8", errors="ignore") as f:
+                full_text = f.read()
         
         # Define all protocol titles and categories
         categories = self.get_protocol_categories()
@@ -323,7 +268,8 @@ class ProtocolParser:
         pattern = r'(' + '|'.join(escaped_titles) + r')'
         
         # Split text
-        segments = re.split(pattern, full_text, flags=re.IGNORECASE)
+        with profile_stage("split"):
+            segments = re.split(pattern, full_text, flags=re.IGNORECASE)
         
         print(f"   🔍 Found {len(segments) // 2} protocol segments")
         
@@ -343,7 +289,8 @@ class ProtocolParser:
             category = title_to_category.get(raw_title.upper(), "Uncategorized")
             
             # Parse protocol
-            protocol = self.parse_protocol(raw_title, content, category)
+            with profile_stage("parse"), profile_protocol(f"[{category}] {raw_title}"):
+                protocol = self.parse_protocol(raw_title, content, category)
             
             # Handle duplicates (merge or create variant)
             protocol_id = protocol['id']
@@ -364,99 +311,8 @@ class ProtocolParser:
         return self.protocols
     
     def get_protocol_categories(self) -> Dict[str, List[str]]:
-        """Return comprehensive protocol categories"""
-        return {
-            "Adult": [
-                "General Adult Assessment",
-                "General Adult Trauma Assessment",
-                "Abdominal Pain/Flank Pain, Nausea & Vomiting",
-                "Allergic Reaction",
-                "Altered Mental Status/Syncope",
-                "Behavioral Emergencies",
-                "Bradycardia",
-                "Burns",
-                "Cardiac Arrest (Non-Traumatic)",
-                "Chest Pain (Non-Traumatic) and Suspected Acute Coronary Syndrome",
-                "Cold Related Illness",
-                "Epistaxis",
-                "Heat-Related Illness",
-                "Hyperkalemia (Suspected)",
-                "OB-Obstetric Emergency",
-                "OB-Preeclampsia/Eclampsia",
-                "OB-Uncomplicated Childbirth/Labor",
-                "Overdose/Poisoning",
-                "Pain Management",
-                "Pulmonary Edema/CHF",
-                "Respiratory Distress",
-                "Seizure",
-                "Sepsis",
-                "Shock",
-                "Smoke Inhalation",
-                "STEMI (Suspected)",
-                "Stroke (CVA)",
-                "Tachycardia/Stable",
-                "Tachycardia/Unstable",
-                "Ventilation Management"
-            ],
-            "Pediatric": [
-                "General Pediatric Assessment",
-                "General Pediatric Trauma Assessment",
-                "Abdominal/Flank Pain, Nausea & Vomiting",
-                "Allergic Reaction",
-                "Altered Mental Status",
-                "Behavioral Emergencies",
-                "Bradycardia",
-                "Burns",
-                "Cardiac Arrest (Non-Traumatic)",
-                "Cold Related Illness",
-                "Epistaxis",
-                "Heat Related Illness",
-                "Neonatal Resuscitation",
-                "Overdose/Poisoning",
-                "Pain Management",
-                "Respiratory Distress",
-                "Seizure",
-                "Shock",
-                "Smoke Inhalation",
-                "Tachycardia/Stable",
-                "Tachycardia/Unstable",
-                "Ventilation Management"
-            ],
-            "Procedures": [
-                "Cervical Stabilization",
-                "Electrical Therapy/Defibrillation",
-                "Electrical Therapy/Synchronized Cardioversion",
-                "Electrical Therapy/Transcutaneous Pacing",
-                "Endotracheal Intubation",
-                "Extraglottic Device",
-                "First Response Evaluate/Release",
-                "Hemorrhage Control",
-                "Medication Administration",
-                "Needle Cricothyroidotomy",
-                "Needle Thoracostomy",
-                "Non-Invasive Positive Pressure Ventilation (NIPPV)",
-                "Patient Restraint",
-                "Tracheostomy Tube Replacement",
-                "Traction Splint",
-                "Vagal Maneuvers",
-                "Vascular Access"
-            ],
-            "Operations": [
-                "Communications",
-                "Do Not Resuscitate (DNR/POLST)",
-                "Documentation",
-                "Hostile Mass Casualty Incident",
-                "Inter-Facility Transfer of Patients by Ambulance",
-                "Pediatric Patient Destination",
-                "Prehospital Death Determination",
-                "Public Intoxication/Mental Health Crisis",
-                "Quality Improvement Review",
-                "Termination of Resuscitation",
-                "Transport Destinations",
-                "Trauma Field Triage Criteria",
-                "Waiting Room Criteria"
-            ]
-        }
+        """Return protocol categories from the manual's TABLE OF CONTENTS"""
+        return catalog_titles(load_catalog(TEXT_FILE))
     
     def save_to_file(self):
         """Save parsed protocols to JSON"""
@@ -487,6 +343,12 @@ class ProtocolParser:
             print(f"   {cat}: {count}")
 
 if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Parse the EMS manual into structured protocols")
+    add_profile_args(cli)
+    args = cli.parse_args()
+
     parser = ProtocolParser()
-    parser.parse_all_protocols()
-    parser.save_to_file()
\ No newline at end of file
+    with profiling("ingest_advanced", args, instrument=[parser]):
+        parser.parse_all_protocols()
+        with profile_stage("save"):
+            parser.save_to_file()
@@ -1,67 +1,91 @@
+import argparse
 import json
-import re
-from pydantic import BaseModel
-from pypdf import PdfReader
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pdf-parser"))
+sys.path.insert(0, ROOT)
+from pdf_backends import BACKENDS, extract_page_texts
+from protocol_catalog import TEXT_FILE, entry_pages, find_entry, load_catalog
 
 # Configuration
 PDF_PATH = "ems-protocol-manual.pdf"
 OUTPUT_FILE = "database_seed.json"
 
-# Based on your PDF, Adult Protocols are roughly pages 10 to 68
-START_PAGE = 10 
-END_PAGE = 68
-
-def clean_title(text):
-    """
-    Heuristic to find the protocol title from the page text.
-    Usually the first or second line in uppercase.
-    """
-    lines = text.split('\n')
-    for line in lines[:5]: # Look at first 5 lines
-        clean_line = line.strip()
-        # If line is mostly uppercase and long enough, it's likely a title
-        if len(clean_line) > 5 and clean_line.isupper():
-            return clean_line.title() # Convert "SEIZURE" to "Seizure"
-    return "Unknown Protocol"
-
-def ingest_manual():
-    print(f"📚 Reading {PDF_PATH}...")
-    reader = PdfReader(PDF_PATH)
-    
+# Page ranges come from the TABLE OF CONTENTS in the text version of the manual
+TOC_FILE = TEXT_FILE
+
+def extract_entry(job):
+    """Runs in a worker: pull just this protocol's pages"""
+    entry, backend = job
+    texts = extract_page_texts(PDF_PATH, backend, entry_pages(entry))
+    return entry, "\n".join(texts[page] for page in sorted(texts))
+
+def build_record(entry, text):
+    return {
+        "title": entry["title"],
+        "category": entry["category"],
+        "page_number": entry["first_page"],
+        "pages": [entry["first_page"], entry["last_page"]],
+        "raw_text": text[:500] + "..." # Store first 500 chars for preview
+    }
+
+def extract_entries(entries, backend, workers=None):
+    jobs = [(entry, backend) for entry in entries]
+    if len(jobs) == 1:
+        return [extract_entry(jobs[0])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(extract_entry, jobs))
+
+def ingest_manual(backend="pypdf", category="Adult", workers=None):
+    catalog = load_catalog(TOC_FILE)
+    entries = [e for e in catalog if e["category"] == category and e["last_page"] is not None]
+    print(f"📚 Reading {len(entries)} {category} protocols from {PDF_PATH} with {backend}...")
+
     database = {}
-    
-    # Loop through the specific page range
-    for i in range(START_PAGE, END_PAGE):
-        page = reader.pages[i]
-        text = page.extract_text()
-        
+    for entry, text in extract_entries(entries, backend, workers):
         if not text:
             continue
+        print(f"   Found: {entry['title']} (pages {entry['first_page']}-{entry['last_page']})")
+        database[entry["id"]] = build_record(entry, text)
 
-        # Extract Title
-        title = clean_title(text)
-        
-        # Create a unique ID (e.g., "Seizure" -> "seizure")
-        protocol_id = title.lower().replace(" ", "_").replace("/", "_")
-        
-        # Skip generic pages if they don't look like protocols
-        if "General" in title or "Table" in title:
-            continue
+    # Save to JSON
+    with open(OUTPUT_FILE, "w") as f:
+        json.dump(database, f, indent=4)
 
-        print(f"   Found: {title}")
+    print(f"✅ Successfully ingested {len(database)} protocols into {OUTPUT_FILE}")
 
-        # Add to Database
-        database[protocol_id] = {
-            "title": title,
-            "page_number": i + 1, # Humans read 1-based, Python is 0-based
-            "raw_text": text[:500] + "..." # Store first 500 chars for preview
-        }
+def rebuild_protocol(protocol, backend="pypdf"):
+    """Incremental rebuild: re-extract one protocol's pages and update it in place"""
+    entry = find_entry(load_catalog(TOC_FILE), protocol)
+    if entry is None:
+        print(f"❌ '{protocol}' is not in the table of contents")
+        return
+
+    database = {}
+    if os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, "r") as f:
+            database = json.load(f)
+
+    _, text = extract_entry((entry, backend))
+    database[entry["id"]] = build_record(entry, text)
 
-    # Save to JSON
     with open(OUTPUT_FILE, "w") as f:
         json.dump(database, f, indent=4)
-    
-    print(f"✅ Successfully ingested {len(database)} protocols into {OUTPUT_FILE}")
+
+    print(f"✅ Rebuilt {entry['title']} from {len(entry_pages(entry))} pages into {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    ingest_manual()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingest protocol pages straight from the PDF")
+    parser.add_argument("--backend", default="pypdf", choices=list(BACKENDS))
+    parser.add_argument("--category", default="Adult", help="Catalog category to ingest")
+    parser.add_argument("--protocol", help="Rebuild just this protocol (ID or title)")
+    parser.add_argument("--workers", type=int, help="Extraction processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.protocol:
+        rebuild_protocol(args.protocol, args.backend)
+    else:
+        ingest_manual(args.backend, args.category, args.workers)
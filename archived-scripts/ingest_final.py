@@ -1,5 +1,10 @@
 import json
+import os
 import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from protocol_catalog import catalog_titles, load_catalog
 
 TEXT_FILE = "ems-protocol-manual.txt"
 OUTPUT_FILE = "database_seed.json"
@@ -23,41 +28,8 @@ def parse_manual_blocks():
 
     database = {}
 
-    # 1. Define Categories and their Protocols explicitly
-    SECTIONS = [
-        ("Adult", [
-            "General Adult Assessment", "General Adult Trauma Assessment", "Abdominal Pain/Flank Pain, Nausea & Vomiting",
-            "Allergic Reaction", "Altered Mental Status/Syncope", "Behavioral Emergencies", "Bradycardia", "Burns",
-            "Cardiac Arrest (Non-Traumatic)", "Chest Pain (Non-Traumatic) and Suspected Acute Coronary Syndrome",
-            "Childbirth/Labor", "Cold Related Illness", "Epistaxis", "Heat-Related Illness", "Hyperkalemia (Suspected)",
-            "Obstetrical Emergency", "Overdose/Poisoning", "Pain Management", "Pulmonary Edema/CHF",
-            "Respiratory Distress", "Seizure", "Sepsis", "Shock", "Smoke Inhalation", "STEMI (Suspected)",
-            "Stroke (CVA)", "Tachycardia/Stable", "Tachycardia/Unstable", "Ventilation Management"
-        ]),
-        ("Pediatric", [
-            "General Pediatric Assessment", "General Pediatric Trauma Assessment", "Abdominal/Flank Pain, Nausea & Vomiting",
-            "Pediatric Allergic Reaction", "Pediatric Altered Mental Status", "Pediatric Behavioral Emergency", 
-            "Pediatric Bradycardia", "Pediatric Burns", "Pediatric Cardiac Arrest (Non-Traumatic)", 
-            "Pediatric Cold-Related Illness", "Pediatric Epistaxis", "Pediatric Heat-Related Illness", 
-            "Neonatal Resuscitation", "Pediatric Overdose / Poisoning", "Pediatric Pain Management", 
-            "Pediatric Respiratory Distress", "Pediatric Seizure", "Pediatric Shock", "Pediatric Smoke Inhalation",
-            "Pediatric Tachycardia / Stable", "Pediatric Tachycardia / Unstable", "Pediatric Ventilation Management",
-            "Pediatric Patient Destination"
-        ]),
-        ("Procedures", [
-            "Cervical Stabilization", "Electrical Therapy/Defibrillation", "Electrical Therapy/Synchronized Cardioversion",
-            "Electrical Therapy/Transcutaneous Pacing", "Endotracheal Intubation", "Extraglottic Device",
-            "First Response Evaluate/Release", "Hemorrhage Control", "Medication Administration",
-            "Needle Cricothyroidotomy", "Needle Thoracostomy", "Non-Invasive Positive Pressure Ventilation (NIPPV)",
-            "Patient Restraint", "Tracheostomy Tube Replacement", "Traction Splint", "Vagal Maneuvers", "Vascular Access"
-        ]),
-        ("Operations", [
-            "Communications", "Do Not Resuscitate (DNR/POLST)", "Documentation", "Hostile Mass Casualty Incident",
-            "Inter-Facility Transfer of Patients by Ambulance", "Prehospital Death Determination",
-            "Public Intoxication/Mental Health Crisis", "Quality Improvement Review", "Termination of Resuscitation",
-            "Transport Destinations", "Trauma Field Triage Criteria", "Waiting Room Criteria"
-        ])
-    ]
+    # 1. Categories and their Protocols, from the manual's TABLE OF CONTENTS
+    SECTIONS = list(catalog_titles(load_catalog(TEXT_FILE)).items())
 
     # 2. Build the Giant Regex Pattern
     all_titles_flat = []
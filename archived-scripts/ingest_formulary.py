@@ -1,6 +1,9 @@
+import argparse
 import json
 import re
 
+from ingest_profiler import add_profile_args, profile_protocol, profile_stage, profiling
+
 TEXT_FILE = "ems-protocol-manual.txt"
 OUTPUT_FILE = "medication_formulary.json"
 
@@ -14,8 +17,9 @@ class FormularyParser:
         """Split formulary into individual medication entries"""
         
         # Find FORMULARY section
-        formulary_match = re.search(r'FORMULARY\s*\n(.*?)(?=APPENDICES|Southern Nevada Health District)', 
-                                    text, re.DOTALL | re.IGNORECASE)
+        with profile_stage("find_formulary"):
+            formulary_match = re.search(r'FORMULARY\s*\n(.*?)(?=APPENDICES|Southern Nevada Health District)', 
+                                        text, re.DOTALL | re.IGNORECASE)
         
         if not formulary_match:
             print("⚠️  Could not find FORMULARY section")
@@ -71,7 +75,8 @@ class FormularyParser:
         
         # Create pattern to split
         pattern = r'(' + '|'.join(re.escape(name) for name in medication_names) + r')'
-        segments = re.split(pattern, formulary_text, flags=re.IGNORECASE)
+        with profile_stage("split"):
+            segments = re.split(pattern, formulary_text, flags=re.IGNORECASE)
         
         medications = {}
         
@@ -87,7 +92,8 @@ class FormularyParser:
             if len(med_content) < 50:
                 continue
             
-            medications[med_name] = self.parse_medication(med_name, med_content)
+            with profile_stage("parse"), profile_protocol(med_name):
+                medications[med_name] = self.parse_medication(med_name, med_content)
         
         return medications
     
@@ -269,8 +275,9 @@ class FormularyParser:
         """Main parsing function"""
         print("📄 Reading formulary from EMS protocol manual...")
         
-        with open(TEXT_FILE, "r", encoding="utf-8", errors="ignore") as f:
-            full_text = f.read()
+        with profile_stage("read"):
+            with open(TEXT_FILE, "r", encoding="utf-8", errors="ignore") as f:
+                full_text = f.read()
         
         self.medications = self.extract_medication_blocks(full_text)
         
@@ -295,6 +302,12 @@ class FormularyParser:
         print(f"\n🎉 Saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Parse the medication formulary")
+    add_profile_args(cli)
+    args = cli.parse_args()
+
     parser = FormularyParser()
-    parser.parse_formulary()
-    parser.save_to_file()
\ No newline at end of file
+    with profiling("ingest_formulary", args, instrument=[parser]):
+        parser.parse_formulary()
+        with profile_stage("save"):
+            parser.save_to_file()
\ No newline at end of file
@@ -1,6 +1,9 @@
-import json
 import re
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from protocol_db import save_db
 
 TEXT_FILE = "ems-protocol-manual.txt"
 OUTPUT_FILE = "ems_protocols.json"
@@ -160,13 +163,9 @@ class EMSIngestor:
 
     def save(self):
         # Wrap it in the structure your API expects
-        output = {
-            "metadata": {"version": "1.0", "source": "IngestMaster"},
-            "protocols": self.database
-        }
-        
-        with open(OUTPUT_FILE, "w") as f:
-            json.dump(output, f, indent=4)
+        # save_db stamps protocol versions for /sync and writes the startup snapshot
+        snapshot_file = os.path.splitext(OUTPUT_FILE)[0] + ".snapshot"
+        save_db(self.database, {"version": "1.0", "source": "IngestMaster"}, OUTPUT_FILE, snapshot_file)
         print(f"🎉 Success! Database built with {len(self.database)} items.")
 
 if __name__ == "__main__":
@@ -0,0 +1,257 @@
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# The profiler in use, or None. Ingest scripts call profile_stage/profile_protocol
+# unconditionally; both are no-ops unless --profile was passed.
+ACTIVE = None
+
+EXTRACTOR_PREFIXES = ("extract_", "check_", "determine_", "requires_", "find_")
+# Module-level re functions and the compiled-pattern methods of the same names
+REGEX_FUNCTIONS = ["search", "match", "fullmatch", "findall", "finditer", "split", "sub", "subn"]
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class CountedPattern:
+    """Stands in for a compiled pattern, counting calls to its matching methods"""
+
+    def __init__(self, pattern: re.Pattern, count):
+        self.pattern = pattern
+        for name in REGEX_FUNCTIONS:
+            def counted(*args, __method=getattr(pattern, name), **kwargs):
+                count()
+                return __method(*args, **kwargs)
+            setattr(self, name, counted)
+
+    def __getattr__(self, name):
+        # flags, groups, groupindex, ...
+        return getattr(self.pattern, name)
+
+
+def unwrap(pattern):
+    return pattern.pattern if isinstance(pattern, CountedPattern) else pattern
+
+
+class IngestProfiler:
+    """Collects per-stage and per-extractor timings, regex call counts and peak memory"""
+
+    def __init__(self, name: str):
+        self.name = name
+        # Each frame: [label, start, child_seconds, regex_calls, kind]
+        self.frames = [[name, time.perf_counter(), 0.0, 0, "stage"]]
+        self.protocol = None
+        self.stages = {}
+        self.extractors = {}
+        self.pairs = {}
+        self.folded = {}
+        self.peak_bytes = 0
+        self.regex_calls = 0
+        self.originals = {}
+        self.patched_patterns = []
+
+    # --- instrumentation ---------------------------------------------------
+
+    def count_regex(self):
+        self.regex_calls += 1
+        self.frames[-1][3] += 1
+
+    def patch_regex(self):
+        """Count re.* calls, and calls through compiled patterns: those compiled while
+        profiling, and the module-level ones the ingest scripts compiled at import"""
+        for fn_name in REGEX_FUNCTIONS:
+            original = getattr(re, fn_name)
+            self.originals[fn_name] = original
+
+            def counted(pattern, *args, __original=original, **kwargs):
+                self.count_regex()
+                return __original(unwrap(pattern), *args, **kwargs)
+
+            setattr(re, fn_name, counted)
+
+        original_compile = re.compile
+        self.originals["compile"] = original_compile
+        re.compile = lambda pattern, flags=0: CountedPattern(original_compile(unwrap(pattern), flags),
+                                                             self.count_regex)
+
+        for module in list(sys.modules.values()):
+            path = getattr(module, "__file__", None)
+            if not path or os.path.dirname(os.path.abspath(path)) != SCRIPTS_DIR:
+                continue
+            for name, value in list(vars(module).items()):
+                if isinstance(value, re.Pattern):
+                    setattr(module, name, CountedPattern(value, self.count_regex))
+                    self.patched_patterns.append((module, name, value))
+
+    def unpatch_regex(self):
+        for fn_name, original in self.originals.items():
+            setattr(re, fn_name, original)
+        for module, name, pattern in self.patched_patterns:
+            setattr(module, name, pattern)
+        self.patched_patterns = []
+
+    def instrument(self, owner, names=None):
+        """Time every extractor on a module or object (anything starting with EXTRACTOR_PREFIXES)"""
+        if names is None:
+            names = [n for n in dir(owner) if n.startswith(EXTRACTOR_PREFIXES) and callable(getattr(owner, n))]
+        for name in names:
+            fn = getattr(owner, name)
+
+            @functools.wraps(fn)
+            def timed(*args, __fn=fn, __name=name, **kwargs):
+                self.push(__name, "extractor")
+                try:
+                    return __fn(*args, **kwargs)
+                finally:
+                    self.pop()
+
+            setattr(owner, name, timed)
+
+    # --- frame stack -----------------------------------------------------------
+
+    def push(self, label: str, kind: str):
+        # ';' separates frames in the folded output
+        self.frames.append([label.replace(";", ","), time.perf_counter(), 0.0, 0, kind])
+
+    def pop(self):
+        path = ";".join(frame[0] for frame in self.frames)
+        label, start, child_seconds, regex_calls, kind = self.frames.pop()
+        total = time.perf_counter() - start
+        parent = self.frames[-1]
+        parent[2] += total
+        parent[3] += regex_calls
+
+        # Folded stacks hold self time in microseconds, which is what flamegraph.pl expects
+        self.folded[path] = self.folded.get(path, 0) + max(0, int((total - child_seconds) * 1e6))
+
+        if kind == "stage":
+            stage = self.stages.setdefault(path, {"seconds": 0.0, "calls": 0, "regex_calls": 0, "peak_bytes": 0})
+            stage["seconds"] += total
+            stage["calls"] += 1
+            stage["regex_calls"] += regex_calls
+            if tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1]
+                stage["peak_bytes"] = max(stage["peak_bytes"], peak)
+                self.peak_bytes = max(self.peak_bytes, peak)
+                tracemalloc.reset_peak()
+        elif kind == "extractor":
+            ext = self.extractors.setdefault(label, {"seconds": 0.0, "calls": 0, "regex_calls": 0})
+            ext["seconds"] += total
+            ext["calls"] += 1
+            ext["regex_calls"] += regex_calls
+            if self.protocol is not None:
+                pair = self.pairs.setdefault((self.protocol, label), {"seconds": 0.0, "calls": 0, "regex_calls": 0})
+                pair["seconds"] += total
+                pair["calls"] += 1
+                pair["regex_calls"] += regex_calls
+
+    # --- reporting -----------------------------------------------------------
+
+    def report(self) -> dict:
+        total = time.perf_counter() - self.frames[0][1]
+        if tracemalloc.is_tracing():
+            self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+
+        def rounded(rows):
+            return {k: {f: round(v, 6) if isinstance(v, float) else v for f, v in row.items()} for k, row in rows}
+
+        pairs = sorted(self.pairs.items(), key=lambda kv: -kv[1]["seconds"])
+        return {
+            "script": self.name,
+            "total_seconds": round(total, 6),
+            "peak_memory_bytes": self.peak_bytes,
+            "regex_calls": self.regex_calls,
+            "stages": rounded(self.stages.items()),
+            "extractors": rounded(sorted(self.extractors.items(), key=lambda kv: -kv[1]["seconds"])),
+            "protocol_extractor_pairs": [
+                {"protocol": protocol, "extractor": extractor, **{f: round(v, 6) if isinstance(v, float) else v
+                                                                  for f, v in row.items()}}
+                for (protocol, extractor), row in pairs
+            ],
+        }
+
+    def write(self, path: str, top: int):
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        folded_path = path.rsplit(".", 1)[0] + ".folded"
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, micros in sorted(self.folded.items()):
+                if micros:
+                    f.write(f"{stack} {micros}\n")
+
+        print(f"\n⏱️  Profile: {report['total_seconds']:.3f}s total, "
+              f"{report['peak_memory_bytes'] / 1e6:.1f} MB peak, {report['regex_calls']} regex calls")
+        print("\n   Stage                                          Seconds   Regex calls")
+        for stage, row in report["stages"].items():
+            print(f"   {stage[-45:]:<45} {row['seconds']:>9.4f} {row['regex_calls']:>12}")
+
+        print(f"\n   Top {top} slowest protocol × extractor")
+        for row in report["protocol_extractor_pairs"][:top]:
+            print(f"   {row['protocol'][:40]:<40} {row['extractor']:<30} {row['seconds'] * 1000:>8.2f} ms "
+                  f"{row['regex_calls']:>6} regex")
+
+        print(f"\n💾 Saved profile to {path} and {folded_path}")
+
+
+@contextmanager
+def profile_stage(name: str):
+    if ACTIVE is None:
+        yield
+        return
+    ACTIVE.push(name, "stage")
+    try:
+        yield
+    finally:
+        ACTIVE.pop()
+
+
+@contextmanager
+def profile_protocol(title: str):
+    """Attribute extractor calls inside the block to one protocol"""
+    if ACTIVE is None:
+        yield
+        return
+    previous = ACTIVE.protocol
+    ACTIVE.protocol = title
+    ACTIVE.push(title, "protocol")
+    try:
+        yield
+    finally:
+        ACTIVE.pop()
+        ACTIVE.protocol = previous
+
+
+def add_profile_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--profile", nargs="?", const="", metavar="REPORT",
+                        help="Profile stages and extractors; optionally name the JSON report")
+    parser.add_argument("--top", type=int, default=15, help="Rows in the slowest protocol × extractor table")
+
+
+@contextmanager
+def profiling(name: str, args, instrument=()):
+    """Run the block under the profiler when --profile was given, then write the report"""
+    global ACTIVE
+    if args.profile is None:
+        yield
+        return
+
+    profiler = IngestProfiler(name)
+    for owner in instrument:
+        profiler.instrument(owner)
+    profiler.patch_regex()
+    tracemalloc.start()
+    ACTIVE = profiler
+    try:
+        yield profiler
+    finally:
+        ACTIVE = None
+        profiler.unpatch_regex()
+        profiler.write(args.profile or f"{name}_profile.json", args.top)
+        tracemalloc.stop()
@@ -1,70 +1,206 @@
 #This Python script takes a PDF version of the protocol, captures a specific page, and uses AI to turn the visual flowchart into a readable script
 
+import argparse
+import asyncio
 import base64
+import hashlib
 import json
-from pdf2image import convert_from_path
-from openai import OpenAI
 import os
+import time
 
-# Initialize OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-if not os.getenv("OPENAI_API_KEY"):
-  raise RuntimeError("OPENAI_API_KEY environment variable not set")
+from page_renderer import DEFAULT_DPI, PageRenderer
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+MODEL = "gpt-4o"
+PROMPT = "You are an expert EMS instructor. Look at this protocol flowchart. Convert it into a clear, linear textual explanation. Describe the flow of decisions logically. Capture every drug dose and step accurately. Return ONLY the raw text explanation."
+CACHE_DIR = "transcription_cache"
 
-def parse_protocol_flowchart(pdf_path, page_number):
+# pypdfium2 and openai are slow to import, so they load on first use
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        if not os.getenv("OPENAI_API_KEY"):
+            raise RuntimeError("OPENAI_API_KEY environment variable not set")
+        from openai import OpenAI
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+def encode_image(image_bytes):
+    return base64.b64encode(image_bytes).decode('utf-8')
+
+def build_messages(base64_image, prompt=PROMPT):
+    # We ask it to output a structured script suitable for reading aloud
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}"
+                    }
+                }
+            ]
+        }
+    ]
+
+class TranscriptionCache:
+    """Transcriptions on disk, keyed by page image hash + prompt + model, so unchanged pages are never re-sent"""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, image_bytes, prompt, model):
+        digest = hashlib.sha256()
+        for part in (model.encode("utf-8"), prompt.encode("utf-8"), image_bytes):
+            # Length-prefix each part so different splits can't collide
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key):
+        path = os.path.join(self.directory, f"{key}.txt")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def put(self, key, text):
+        path = os.path.join(self.directory, f"{key}.txt")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+
+class RateLimiter:
+    """Spaces request starts evenly so a batch stays under the endpoint's requests-per-minute limit"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+def openai_transcriber(base_url=None, model=MODEL, max_tokens=2000):
+    """Async transcriber for any OpenAI-compatible endpoint; point base_url at a local stub server in tests"""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key and not base_url:
+        raise RuntimeError("OPENAI_API_KEY environment variable not set")
+    from openai import AsyncOpenAI
+    client = AsyncOpenAI(api_key=api_key or "local-stub", base_url=base_url)
+
+    async def transcribe(base64_image, prompt):
+        response = await client.chat.completions.create(
+            model=model,
+            messages=build_messages(base64_image, prompt),
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+    return transcribe
+
+async def transcribe_pages(pdf_path, pages, transcriber, cache=None, concurrency=4,
+                           per_minute=60, prompt=PROMPT, model=MODEL, dpi=DEFAULT_DPI):
+    """Transcribe many flowchart pages at once; returns {page: text}"""
+    cache = cache or TranscriptionCache()
+    # One batch render up front instead of reopening the PDF per page
+    images = await asyncio.to_thread(PageRenderer(pdf_path, dpi).render, pages)
+    limiter = RateLimiter(per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"cached": 0, "sent": 0}
+
+    async def one(page_number):
+        async with semaphore:
+            image_bytes = images[page_number]
+            key = cache.key(image_bytes, prompt, model)
+            cached = cache.get(key)
+            if cached is not None:
+                stats["cached"] += 1
+                print(f"   ♻️  Page {page_number}: unchanged, using cached transcription")
+                return page_number, cached
+
+            await limiter.wait()
+            text = await transcriber(encode_image(image_bytes), prompt)
+            cache.put(key, text)
+            stats["sent"] += 1
+            print(f"   ✅ Page {page_number} transcribed")
+            return page_number, text
+
+    results = dict(await asyncio.gather(*(one(p) for p in pages)))
+    print(f"📊 {stats['sent']} pages sent, {stats['cached']} served from cache")
+    return results
+
+def parse_protocol_flowchart(pdf_path, page_number, dpi=DEFAULT_DPI):
     print(f"📄 Processing Page {page_number} of {pdf_path}...")
-    
+
     # 1. Convert PDF Page to Image
-    images = convert_from_path(pdf_path, first_page=page_number, last_page=page_number)
-    temp_img_path = f"temp_page_{page_number}.jpg"
-    images[0].save(temp_img_path, 'JPEG')
-    
-    base64_image = encode_image(temp_img_path)
+    base64_image = encode_image(PageRenderer(pdf_path, dpi).render_page(page_number))
 
     # 2. Send to GPT-4o to "Read" the Flowchart
-    # We ask it to output a structured script suitable for reading aloud
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "You are an expert EMS instructor. Look at this protocol flowchart. Convert it into a clear, linear textual explanation. Describe the flow of decisions logically. Capture every drug dose and step accurately. Return ONLY the raw text explanation."},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    }
-                ]
-            }
-        ],
+    response = get_client().chat.completions.create(
+        model=MODEL,
+        messages=build_messages(base64_image),
         max_tokens=2000
     )
-    
+
     transcription = response.choices[0].message.content
     print("✅ Protocol Transcribed!")
-    
-    # Clean up
-    os.remove(temp_img_path)
     return transcription
 
+def parse_pages(spec):
+    """'27,30-32' -> [27, 30, 31, 32]"""
+    pages = []
+    for part in spec.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            pages.extend(range(int(first), int(last) + 1))
+        elif part.strip():
+            pages.append(int(part))
+    return pages
+
 # --- RUN THE INGESTION ---
 if __name__ == "__main__":
-    # Example: Extracting the Cardiac Arrest Protocol from Page 27
-    protocol_text = parse_protocol_flowchart("ems-protocol-manual.pdf", 27)
-    
-    # Save to a JSON file (or push to your API DB)
-    data = {
-        "title": "Adult Cardiac Arrest",
-        "raw_content": protocol_text
-    }
-    
-    with open("database_seed.json", "w") as f:
+    parser = argparse.ArgumentParser(description="Transcribe protocol flowchart pages")
+    parser.add_argument("pdf", nargs="?", default="ems-protocol-manual.pdf")
+    parser.add_argument("--pages", help="Batch mode: pages to transcribe, e.g. 27,30-45")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    parser.add_argument("--rpm", type=int, default=60, help="Max requests per minute")
+    parser.add_argument("--endpoint", help="OpenAI-compatible base URL, e.g. a local stub server")
+    parser.add_argument("--mock", action="store_true", help="Use the offline mock transcriber")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--output", default="database_seed.json")
+    args = parser.parse_args()
+
+    if not args.pages:
+        # Example: Extracting the Cardiac Arrest Protocol from Page 27
+        protocol_text = parse_protocol_flowchart(args.pdf, 27, args.dpi)
+
+        # Save to a JSON file (or push to your API DB)
+        data = {
+            "title": "Adult Cardiac Arrest",
+            "raw_content": protocol_text
+        }
+    else:
+        if args.mock:
+            from ingest_protocol_mockrun import mock_transcriber as transcriber
+        else:
+            transcriber = openai_transcriber(args.endpoint)
+        pages = parse_pages(args.pages)
+        print(f"📄 Transcribing {len(pages)} pages of {args.pdf} ({args.concurrency} at a time, {args.rpm}/min)...")
+        results = asyncio.run(transcribe_pages(args.pdf, pages, transcriber, TranscriptionCache(args.cache_dir),
+                                               concurrency=args.concurrency, per_minute=args.rpm, dpi=args.dpi))
+        data = [{"page": page, "raw_content": results[page]} for page in pages]
+
+    with open(args.output, "w") as f:
         json.dump(data, f, indent=4)
-        
-    print("💾 Saved to database_seed.json")
\ No newline at end of file
+
+    print(f"💾 Saved to {args.output}")
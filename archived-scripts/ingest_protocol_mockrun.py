@@ -3,23 +3,30 @@ import json
 import os
 # We don't need OpenAI for the mock version
 # from openai import OpenAI 
-from pdf2image import convert_from_path
 
 # client = OpenAI(api_key="YOUR_OPENAI_API_KEY") 
 
+MOCK_TRANSCRIPTION = (
+    "ADULT CARDIAC ARREST PROTOCOL (MOCK DATA). "
+    "Step 1: Verify cardiac arrest. "
+    "Step 2: Start CPR immediately. Push hard and fast. "
+    "Step 3: Apply AED or defibrillator as soon as possible. "
+    "If shockable rhythm (VF/VT): Shock. Resume CPR for 2 minutes. "
+    "If not shockable (Asystole/PEA): Resume CPR. Administer Epinephrine 1mg every 3-5 minutes. "
+    "This is a placeholder text generated to test the database system."
+)
+
 def parse_protocol_flowchart_MOCK(pdf_path, page_number):
     print(f"📄 Processing Page {page_number} of {pdf_path}...")
     
     # 1. Test the PDF conversion (This is usually where code breaks, so good to test!)
     try:
-        images = convert_from_path(pdf_path, first_page=page_number, last_page=page_number)
-        temp_img_path = f"temp_page_{page_number}.jpg"
-        images[0].save(temp_img_path, 'JPEG')
-        print(f"   ✅ Successfully converted PDF page to image: {temp_img_path}")
+        from page_renderer import PageRenderer
+        image_bytes = PageRenderer(pdf_path).render_page(page_number)
+        print(f"   ✅ Successfully converted PDF page to image ({len(image_bytes)} bytes)")
         
         # In the real version, we'd send this to AI. 
-        # In mock mode, we just clean it up.
-        os.remove(temp_img_path)
+        # In mock mode, we just drop it.
         
     except Exception as e:
         print(f"   ❌ Error converting PDF: {e}")
@@ -28,17 +35,11 @@ def parse_protocol_flowchart_MOCK(pdf_path, page_number):
     print("   ⚠️  MOCK MODE: Skipping OpenAI API call.")
     
     # 2. Return Dummy Data instead of Real AI Data
-    mock_transcription = (
-        "ADULT CARDIAC ARREST PROTOCOL (MOCK DATA). "
-        "Step 1: Verify cardiac arrest. "
-        "Step 2: Start CPR immediately. Push hard and fast. "
-        "Step 3: Apply AED or defibrillator as soon as possible. "
-        "If shockable rhythm (VF/VT): Shock. Resume CPR for 2 minutes. "
-        "If not shockable (Asystole/PEA): Resume CPR. Administer Epinephrine 1mg every 3-5 minutes. "
-        "This is a placeholder text generated to test the database system."
-    )
-    
-    return mock_transcription
+    return MOCK_TRANSCRIPTION
+
+async def mock_transcriber(base64_image, prompt):
+    # Drop-in for ingest_protocol's batch mode (--mock): same call shape as the real transcriber
+    return MOCK_TRANSCRIPTION
 
 if __name__ == "__main__":
     # Make sure the filename matches EXACTLY what is in your folder
@@ -1,49 +1,36 @@
-import json
+import argparse
 import re
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from flowchart import compile_flowchart
+from protocol_catalog import catalog_titles, load_catalog, manual_edition
+from protocol_db import JSONL_FILE, JsonlWriter, save_db, save_jsonl
+from spoken_text import build_expander
 
 TEXT_FILE = "ems-protocol-manual.txt"
 OUTPUT_FILE = "ems_protocols.json"
 
 class UnifiedIngestor:
-    def __init__(self):
+    def __init__(self, jsonl_file=None, text_file=None, output_file=None, progress=None):
         self.database = {}
+        self.edition = {}
+        # Module defaults are read here, not when the class is defined, so callers that
+        # repoint TEXT_FILE/OUTPUT_FILE (e.g. the benchmarks) are honoured
+        self.text_file = text_file or TEXT_FILE
+        self.output_file = output_file or OUTPUT_FILE
+        # Called with (stage, details) as zones finish, e.g. by an API ingest job
+        self.progress = progress or (lambda stage, details: None)
+        # JSONL mode: every record is written out as soon as it is parsed
+        self.writer = JsonlWriter(jsonl_file) if jsonl_file else None
         
-        # Define specific titles for each section
-        self.CATEGORIES = {
-            "Adult": [
-                "General Adult Assessment", "General Adult Trauma Assessment", "Abdominal Pain/Flank Pain, Nausea & Vomiting",
-                "Allergic Reaction", "Altered Mental Status/Syncope", "Behavioral Emergencies", "Bradycardia", "Burns",
-                "Cardiac Arrest (Non-Traumatic)", "Chest Pain (Non-Traumatic) and Suspected Acute Coronary Syndrome",
-                "Childbirth/Labor", "Cold Related Illness", "Epistaxis", "Heat-Related Illness", "Hyperkalemia (Suspected)",
-                "Obstetrical Emergency", "Overdose/Poisoning", "Pain Management", "Pulmonary Edema/CHF",
-                "Respiratory Distress", "Seizure", "Sepsis", "Shock", "Smoke Inhalation", "STEMI (Suspected)",
-                "Stroke (CVA)", "Tachycardia/Stable", "Tachycardia/Unstable", "Ventilation Management"
-            ],
-            "Pediatric": [
-                "General Pediatric Assessment", "General Pediatric Trauma Assessment", "Abdominal/Flank Pain, Nausea & Vomiting",
-                "Pediatric Allergic Reaction", "Pediatric Altered Mental Status", "Pediatric Behavioral Emergency", 
-                "Pediatric Bradycardia", "Pediatric Burns", "Pediatric Cardiac Arrest (Non-Traumatic)", 
-                "Pediatric Cold-Related Illness", "Pediatric Epistaxis", "Pediatric Heat-Related Illness", 
-                "Neonatal Resuscitation", "Pediatric Overdose / Poisoning", "Pediatric Pain Management", 
-                "Pediatric Respiratory Distress", "Pediatric Seizure", "Pediatric Shock", "Pediatric Smoke Inhalation",
-                "Pediatric Tachycardia / Stable", "Pediatric Tachycardia / Unstable", "Pediatric Ventilation Management",
-                "Pediatric Patient Destination"
-            ],
-            "Procedures": [
-                "Cervical Stabilization", "Electrical Therapy/Defibrillation", "Electrical Therapy/Synchronized Cardioversion",
-                "Electrical Therapy/Transcutaneous Pacing", "Endotracheal Intubation", "Extraglottic Device",
-                "First Response Evaluate/Release", "Hemorrhage Control", "Medication Administration",
-                "Needle Cricothyroidotomy", "Needle Thoracostomy", "Non-Invasive Positive Pressure Ventilation (NIPPV)",
-                "Patient Restraint", "Tracheostomy Tube Replacement", "Traction Splint", "Vagal Maneuvers", "Vascular Access"
-            ],
-            "Operations": [
-                "Communications", "Do Not Resuscitate (DNR/POLST)", "Documentation", "Hostile Mass Casualty Incident",
-                "Inter-Facility Transfer of Patients by Ambulance", "Prehospital Death Determination",
-                "Public Intoxication/Mental Health Crisis", "Quality Improvement Review", "Termination of Resuscitation",
-                "Transport Destinations", "Trauma Field Triage Criteria", "Waiting Room Criteria"
-            ]
-        }
+        # Titles per section come from the manual's own TABLE OF CONTENTS
+        self.CATEGORIES = catalog_titles(load_catalog(self.text_file))
+
+    def emit(self, item_id):
+        if self.writer:
+            self.writer.write(item_id, self.database[item_id])
 
     def clean_text(self, text):
         """Removes page numbers and stitches broken lines."""
@@ -70,13 +57,15 @@ class UnifiedIngestor:
         return idx
 
     def parse_file(self):
-        print(f"📄 Reading {TEXT_FILE}...")
-        with open(TEXT_FILE, "r", encoding="utf-8", errors="ignore") as f:
+        print(f"📄 Reading {self.text_file}...")
+        with open(self.text_file, "r", encoding="utf-8", errors="ignore") as f:
             raw_content = f.read()
+        # Effective date from the cover, so the API can tell manual versions apart
+        self.edition = manual_edition(raw_content)
             
         # 1. Global Cleanup: Remove source tags using Regex
-        # This removes patterns like 
-        full_text = re.sub(r'\', '', raw_content)
+        # This removes patterns like [source: 12]
+        full_text = re.sub(r'\[source:\s*\d+\]', '', raw_content)
 
         # --- ROBUST ZONE SPLITTING ---
         # We use the FIRST PROTOCOL of each section as the Anchor.
@@ -129,7 +118,12 @@ class UnifiedIngestor:
                 self.process_definitions(zone_text)
             else:
                 self.process_protocol_zone(category, zone_text)
+            self.progress("parse", {"zone": category, "protocols": len(self.database)})
 
+        self.compile_flowcharts()
+        self.progress("flowcharts", {"protocols": len(self.database)})
+        self.add_spoken_text()
+        self.progress("spoken", {"protocols": len(self.database)})
         self.save()
 
     def process_definitions(self, text):
@@ -147,6 +141,7 @@ class UnifiedIngestor:
                     "raw_text": definition,
                     "metadata": {}
                 }
+                self.emit(term_id)
 
     def process_protocol_zone(self, category, text):
         allowed_titles = self.CATEGORIES.get(category, [])
@@ -173,7 +168,7 @@ class UnifiedIngestor:
 
             # Basic metadata extraction
             metadata = {
-                "medications": list(set(re.findall(r'([A-Z]{4,})', cleaned_content)))
+                "medications": sorted(set(re.findall(r'([A-Z]{4,})', cleaned_content)))
             }
 
             # Merge logic
@@ -181,6 +176,7 @@ class UnifiedIngestor:
                 # If it's the same category, append text (Page 2 of protocol)
                 if self.database[prot_id]['category'] == category:
                     self.database[prot_id]['raw_text'] += "\n\n" + cleaned_content
+                    self.emit(prot_id)
             else:
                 self.database[prot_id] = {
                     "title": clean_title,
@@ -188,6 +184,7 @@ class UnifiedIngestor:
                     "raw_text": cleaned_content,
                     "metadata": metadata
                 }
+                self.emit(prot_id)
 
     def process_formulary(self, text):
         # Splits by Drug Name (All Caps) followed by CLASS:
@@ -214,14 +211,53 @@ class UnifiedIngestor:
                     "dose": dose_match.group(1).strip() if dose_match else ""
                 }
             }
+            self.emit(drug_id)
+
+    def compile_flowcharts(self):
+        # Done after merging so a flowchart continued on the next page stays one graph
+        compiled = 0
+        for item_id, item in self.database.items():
+            if item["category"] in ("Definitions", "Formulary"):
+                continue
+            flow = compile_flowchart(item["raw_text"])
+            if flow:
+                item["flow"] = flow
+                compiled += 1
+        print(f"   🔀 Compiled {compiled} flowcharts")
+
+    def add_spoken_text(self):
+        # Abbreviations expanded once here, using this manual's own Terms and Conventions,
+        # so the API reads spoken_text instead of rewriting raw_text per request
+        expander = build_expander(self.database)
+        for item_id, item in self.database.items():
+            if item["category"] == "Definitions":
+                continue
+            item["spoken_text"] = expander.expand(item["raw_text"])
+        print(f"   🔊 Expanded {expander.terms} terms for speech ({expander.kept_raw} ambiguous kept as written)")
 
     def save(self):
-        # Save in the structure main.py expects
-        output = {"metadata": {"version": "3.0"}, "protocols": self.database}
-        with open(OUTPUT_FILE, "w") as f:
-            json.dump(output, f, indent=4)
-        print(f"🎉 Success! Saved {len(self.database)} items to {OUTPUT_FILE}")
+        if self.writer:
+            # The flowchart and spoken-text passes aren't streamed: compacting writes every
+            # record once in its final form
+            sync = save_jsonl(self.writer, self.database, {"version": "3.0", **self.edition})
+            print(f"🎉 Success! Streamed {len(self.database)} items to {self.writer.path} "
+                  f"(+ offset index, DB version {sync['db_version']})")
+            self.progress("saved", {"protocols": len(self.database), "db_version": sync["db_version"]})
+            return
+
+        # Save in the structure main.py expects, stamped with a DB version for /sync,
+        # plus the startup snapshot and search store next to it
+        base = os.path.splitext(self.output_file)[0]
+        sync = save_db(self.database, {"version": "3.0", **self.edition}, self.output_file,
+                       base + ".snapshot", base + ".db")
+        print(f"🎉 Success! Saved {len(self.database)} items to {self.output_file} (DB version {sync['db_version']})")
+        self.progress("saved", {"protocols": len(self.database), "db_version": sync["db_version"]})
 
 if __name__ == "__main__":
-    ingestor = UnifiedIngestor()
+    parser = argparse.ArgumentParser(description="Ingest the manual text into the DB main.py loads")
+    parser.add_argument("--jsonl", nargs="?", const=JSONL_FILE, metavar="PATH",
+                        help="Stream records to JSONL with an offset index instead of one JSON file")
+    args = parser.parse_args()
+
+    ingestor = UnifiedIngestor(args.jsonl)
     ingestor.parse_file()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import hashlib
+import io
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_DPI = 150
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class ImageCache:
+    """Encoded page images keyed by (pdf hash, page, dpi), evicting least recently used past max_bytes"""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, int, int]) -> Optional[bytes]:
+        data = self.entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: Tuple[str, int, int], data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+# Shared by every renderer in the process, so re-rendering the same PDF is free
+IMAGE_CACHE = ImageCache()
+
+
+class PageRenderer:
+    """Renders pages of one PDF in batches, straight to encoded bytes in memory"""
+
+    def __init__(self, pdf_path: str, dpi: int = DEFAULT_DPI, fmt: str = "JPEG",
+                 cache: Optional[ImageCache] = None):
+        # Read once: the bytes feed both the cache key and the in-process renderer
+        with open(pdf_path, "rb") as f:
+            self.pdf_bytes = f.read()
+        self.pdf_hash = hashlib.sha256(self.pdf_bytes).hexdigest()
+        self.dpi = dpi
+        self.fmt = fmt
+        self.cache = cache if cache is not None else IMAGE_CACHE
+
+    def encode(self, image) -> bytes:
+        buffer = io.BytesIO()
+        image.save(buffer, self.fmt)
+        return buffer.getvalue()
+
+    def render(self, pages: Iterable[int], dpi: Optional[int] = None) -> Dict[int, bytes]:
+        """Return {page: image bytes}; only uncached pages are rendered, all from one open document"""
+        dpi = dpi or self.dpi
+        pages = list(pages)
+        rendered = {}
+        missing = []
+        for page in pages:
+            cached = self.cache.get((self.pdf_hash, page, dpi))
+            if cached is None:
+                missing.append(page)
+            else:
+                rendered[page] = cached
+        if not missing:
+            return rendered
+
+        # pdfium renders in-process: the PDF is parsed once per batch, whatever pages it asks for
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(self.pdf_bytes)
+        try:
+            for page_num in sorted(set(missing)):
+                page = pdf[page_num - 1]
+                image = page.render(scale=dpi / 72).to_pil()
+                page.close()
+                data = self.encode(image)
+                self.cache.put((self.pdf_hash, page_num, dpi), data)
+                rendered[page_num] = data
+        finally:
+            pdf.close()
+
+        return {page: rendered[page] for page in pages if page in rendered}
+
+    def render_page(self, page: int, dpi: Optional[int] = None) -> bytes:
+        return self.render([page], dpi)[page]
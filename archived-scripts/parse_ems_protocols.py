@@ -1,11 +1,24 @@
-import json
+import argparse
+import os
 import re
+import sys
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from protocol_catalog import catalog_titles, load_catalog
+from protocol_db import save_db
+
+from ingest_profiler import add_profile_args, profile_protocol, profile_stage, profiling
+from section_scanner import bullet_blocks, extraction_budget, labelled_runs, starred_lines
+
 # Configuration
 TEXT_FILE = "ems-protocol-manual.txt"
 OUTPUT_FILE = "ems_protocols.json"
 
+CONTRA_LABEL = re.compile(r'CONTRAINDICATIONS?:?', re.IGNORECASE)
+PEARLS_HEADING = re.compile(r'pearls?$', re.IGNORECASE)
+DIFFERENTIAL_HEADING = re.compile(r'differential$', re.IGNORECASE)
+
 def clean_text(text):
     """Clean up text by removing page numbers and extra whitespace."""
     lines = text.split('\n')
@@ -82,12 +95,13 @@ def extract_contraindications(text):
     """Extract contraindications from text."""
     contraindications = []
     
-    # Look for contraindications section
-    contra_pattern = r'CONTRAINDICATION[S]?:?\s*([^\n]+(?:\n(?![A-Z\s]+:)[^\n]+)*)'
-    matches = re.finditer(contra_pattern, text, re.IGNORECASE)
+    # Look for contraindications section: the label's line plus continuation lines
+    # up to the next "Label:" line, found in one pass (see section_scanner)
+    with extraction_budget("extract_contraindications"):
+        runs = labelled_runs(text, CONTRA_LABEL)
     
-    for match in matches:
-        contra_text = match.group(1).strip()
+    for contra_text in runs:
+        contra_text = contra_text.strip()
         # Split by common delimiters
         items = re.split(r'[;•\n]', contra_text)
         for item in items:
@@ -102,22 +116,17 @@ def extract_pearls(text):
     pearls = []
     
     # Look for Pearls section
-    pearls_pattern = r'Pearls?\s*\n((?:^\s*\*[^\n]+\n?)+)'
-    matches = re.finditer(pearls_pattern, text, re.IGNORECASE | re.MULTILINE)
-    
-    for match in matches:
-        pearl_text = match.group(1)
-        # Extract individual pearls (usually bullet points)
-        individual_pearls = re.findall(r'\*\s*([^\n]+)', pearl_text)
-        pearls.extend([p.strip() for p in individual_pearls if len(p.strip()) > 10])
+    with extraction_budget("extract_pearls"):
+        individual_pearls = bullet_blocks(text, PEARLS_HEADING)
+        starred = starred_lines(text)
+    pearls.extend([p for p in individual_pearls if len(p) > 10])
     
     # Also look for standalone pearls
-    standalone_pattern = r'(?:^|\n)\s*\*\s*([A-Z][^\n]{20,})'
-    standalone_matches = re.finditer(standalone_pattern, text, re.MULTILINE)
-    for match in standalone_matches:
-        pearl = match.group(1).strip()
-        if pearl not in pearls and len(pearl) > 20:
+    seen = set(pearls)
+    for pearl in starred:
+        if pearl[:1].isupper() and pearl[:1].isascii() and pearl not in seen and len(pearl) > 20:
             pearls.append(pearl)
+            seen.add(pearl)
     
     return pearls[:15]  # Limit to top 15 pearls
 
@@ -200,20 +209,16 @@ def extract_required_equipment(text):
             eq = pattern.replace(r'\s*', ' ').replace('[Mm]', 'M')
             equipment.append(eq)
     
-    return list(set(equipment))
+    return sorted(set(equipment))  # set order varies by run and would change the content hash
 
 def extract_differential_diagnosis(text):
     """Extract differential diagnosis items."""
     differentials = []
     
     # Look for Differential section
-    diff_pattern = r'Differential\s*\n((?:^\s*\*[^\n]+\n?)+)'
-    matches = re.finditer(diff_pattern, text, re.IGNORECASE | re.MULTILINE)
-    
-    for match in matches:
-        diff_text = match.group(1)
-        items = re.findall(r'\*\s*([^\n]+)', diff_text)
-        differentials.extend([d.strip() for d in items if len(d.strip()) > 3])
+    with extraction_budget("extract_differential_diagnosis"):
+        items = bullet_blocks(text, DIFFERENTIAL_HEADING)
+    differentials.extend([d for d in items if len(d) > 3])
     
     return differentials
 
@@ -270,102 +275,12 @@ def parse_protocols():
     """Parse the EMS protocol manual into structured JSON."""
     
     print(f"📄 Reading {TEXT_FILE}...")
-    with open(TEXT_FILE, "r", encoding="utf-8", errors="ignore") as f:
-        full_text = f.read()
-    
-    # Define protocol categories and their protocols
-    categories = {
-        "Adult": [
-            "General Adult Assessment",
-            "General Adult Trauma Assessment",
-            "Abdominal Pain/Flank Pain, Nausea & Vomiting",
-            "Allergic Reaction",
-            "Altered Mental Status/Syncope",
-            "Behavioral Emergencies",
-            "Bradycardia",
-            "Burns",
-            "Cardiac Arrest (Non-Traumatic)",
-            "Chest Pain (Non-Traumatic) and Suspected Acute Coronary Syndrome",
-            "Cold Related Illness",
-            "Epistaxis",
-            "Heat-Related Illness",
-            "Hyperkalemia (Suspected)",
-            "OB-Obstetric Emergency",
-            "OB-Preeclampsia/Eclampsia",
-            "OB-Uncomplicated Childbirth/Labor",
-            "Overdose/Poisoning",
-            "Pain Management",
-            "Pulmonary Edema/CHF",
-            "Respiratory Distress",
-            "Seizure",
-            "Sepsis",
-            "Shock",
-            "Smoke Inhalation",
-            "STEMI (Suspected)",
-            "Stroke (CVA)",
-            "Tachycardia/Stable",
-            "Tachycardia/Unstable",
-            "Ventilation Management"
-        ],
-        "Pediatric": [
-            "General Pediatric Assessment",
-            "General Pediatric Trauma Assessment",
-            "Abdominal/Flank Pain, Nausea & Vomiting",
-            "Allergic Reaction",
-            "Altered Mental Status",
-            "Behavioral Emergencies",
-            "Bradycardia",
-            "Burns",
-            "Cardiac Arrest (Non-Traumatic)",
-            "Cold Related Illness",
-            "Epistaxis",
-            "Heat Related Illness",
-            "Neonatal Resuscitation",
-            "Overdose/Poisoning",
-            "Pain Management",
-            "Respiratory Distress",
-            "Seizure",
-            "Shock",
-            "Smoke Inhalation",
-            "Tachycardia/Stable",
-            "Tachycardia/Unstable",
-            "Ventilation Management"
-        ],
-        "Procedures": [
-            "Cervical Stabilization",
-            "Electrical Therapy/Defibrillation",
-            "Electrical Therapy/Synchronized Cardioversion",
-            "Electrical Therapy/Transcutaneous Pacing",
-            "Endotracheal Intubation",
-            "Extraglottic Device",
-            "First Response Evaluate/Release",
-            "Hemorrhage Control",
-            "Medication Administration",
-            "Needle Cricothyroidotomy",
-            "Needle Thoracostomy",
-            "Non-Invasive Positive Pressure Ventilation (NIPPV)",
-            "Patient Restraint",
-            "Tracheostomy Tube Replacement",
-            "Traction Splint",
-            "Vagal Maneuvers",
-            "Vascular Access"
-        ],
-        "Operations": [
-            "Communications",
-            "Do Not Resuscitate (DNR/POLST)",
-            "Documentation",
-            "Hostile Mass Casualty Incident",
-            "Inter-Facility Transfer of Patients by Ambulance",
-            "Pediatric Patient Destination",
-            "Prehospital Death Determination",
-            "Public Intoxication/Mental Health Crisis",
-            "Quality Improvement Review",
-            "Termination of Resuscitation",
-            "Transport Destinations",
-            "Trauma Field Triage Criteria",
-            "Waiting Room Criteria"
-        ]
-    }
+    with profile_stage("read"):
+        with open(TEXT_FILE, "r", encoding="utf-8", errors="ignore") as f:
+            full_text = f.read()
+    
+    # Protocol categories and their protocols, from the manual's TABLE OF CONTENTS
+    categories = catalog_titles(load_catalog(TEXT_FILE))
     
     # Build mapping of title to category
     title_to_category = {}
@@ -384,7 +299,8 @@ def parse_protocols():
     pattern = r'(' + '|'.join(escaped_titles) + r')'
     
     # Split text by protocol titles
-    segments = re.split(pattern, full_text, flags=re.IGNORECASE)
+    with profile_stage("split"):
+        segments = re.split(pattern, full_text, flags=re.IGNORECASE)
     
     print(f"   🔍 Found {len(segments) // 2} potential protocols")
     
@@ -417,11 +333,12 @@ def parse_protocols():
         protocol_id = re.sub(r'[^\w\s-]', '', protocol_id)
         protocol_id = re.sub(r'[-\s]+', '_', protocol_id)
         
-        # Clean content
-        cleaned_content = clean_text(content)
-        
-        # Extract metadata
-        metadata = extract_metadata(cleaned_content)
+        with profile_stage("parse"), profile_protocol(f"[{category}] {clean_title}"):
+            # Clean content
+            cleaned_content = clean_text(content)
+            
+            # Extract metadata
+            metadata = extract_metadata(cleaned_content)
         
         # Create protocol entry
         protocol_entry = {
@@ -461,18 +378,25 @@ def parse_protocols():
         "protocols": protocols
     }
     
-    # Write to file
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    # Write to file through save_db, so protocol versions carry on from the previous file
+    # and /sync clients see what changed
+    with profile_stage("save"):
+        snapshot_file = os.path.splitext(OUTPUT_FILE)[0] + ".snapshot"
+        sync = save_db(protocols, output["metadata"], OUTPUT_FILE, snapshot_file)
     
-    print(f"\n🎉 Success! Created {OUTPUT_FILE}")
+    print(f"\n🎉 Success! Created {OUTPUT_FILE} (DB version {sync['db_version']})")
     print(f"   📊 Total protocols: {len(protocols)}")
     print(f"   📁 Categories: {', '.join(categories.keys())}")
     
     return output
 
 if __name__ == "__main__":
-    result = parse_protocols()
+    cli = argparse.ArgumentParser(description="Parse the EMS manual into protocols with metadata")
+    add_profile_args(cli)
+    args = cli.parse_args()
+
+    with profiling("parse_ems_protocols", args, instrument=[sys.modules[__name__]]):
+        result = parse_protocols()
     
     # Print summary
     print("\n📈 Protocol Summary by Category:")
@@ -0,0 +1,158 @@
+import re
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+# Section extraction by walking the text line by line, once. Replaces lazy-dot
+# regexes like r'History\s*\n(.*?)(?=\n[A-Z][a-z]+:|$)' whose cost grows with the
+# square of the text on big merged protocols.
+
+# Seconds any single extraction may take before the ingest is stopped
+EXTRACTION_BUDGET_SECONDS = 2.0
+# Checking the clock every line would cost more than the scan itself
+CHECK_EVERY_LINES = 256
+
+FIELD_LINE = re.compile(r'[A-Za-z][A-Za-z]+:')
+LABEL_PREFIX = re.compile(r'[A-Za-z\s]*:')
+LETTERS_ONLY = re.compile(r'[A-Za-z\s]*')
+
+_deadline = None
+_label = None
+_seconds = None
+
+
+class ExtractionBudgetExceeded(RuntimeError):
+    """An extractor ran past its time budget; the input is pathological or the extractor regressed"""
+
+
+@contextmanager
+def extraction_budget(label: str, seconds: float = EXTRACTION_BUDGET_SECONDS):
+    """Fail the extraction in the block loudly if it scans for longer than `seconds`"""
+    global _deadline, _label, _seconds
+    previous = _deadline, _label, _seconds
+    _deadline, _label, _seconds = time.perf_counter() + seconds, label, seconds
+    try:
+        yield
+    finally:
+        _deadline, _label, _seconds = previous
+
+
+def scan_lines(text: str) -> Iterator[str]:
+    """Yield lines (without newline), checking the active budget as it goes"""
+    lines = text.split("\n")
+    for i in range(len(lines)):
+        if _deadline is not None and i % CHECK_EVERY_LINES == 0 and time.perf_counter() > _deadline:
+            raise ExtractionBudgetExceeded(f"{_label} exceeded its {_seconds}s budget "
+                                           f"at line {i} of {len(lines)}")
+        yield lines[i]
+
+
+def section_after_heading(text: str, name: str) -> Optional[str]:
+    """Body under a `name` heading line, up to the next 'Field:' line or the end"""
+    wanted = name.lower()
+    body = None
+    heading_seen = False
+    for line in scan_lines(text):
+        if body is None:
+            # The heading needs a line after it, so the body only opens on the next line
+            if heading_seen:
+                body = []
+            elif line.rstrip().lower().endswith(wanted):
+                heading_seen = True
+                continue
+            else:
+                continue
+        # The body's first line is never a terminator
+        if body and FIELD_LINE.match(line):
+            break
+        if body or line.strip():
+            body.append(line)
+    return "\n".join(body).strip() if body is not None else None
+
+
+def starred_section(text: str, name: str) -> Optional[str]:
+    """'* Name: text' plus its continuation lines, up to the next line starting with '*'"""
+    pattern = re.compile(rf'\*\s*{re.escape(name)}[:\s]*', re.IGNORECASE)
+    body = None
+    for line in scan_lines(text):
+        if body is None:
+            match = pattern.search(line)
+            if match:
+                body = [line[match.end():]]
+            continue
+        if line.startswith("*"):
+            break
+        body.append(line)
+    return "\n".join(body).strip() if body is not None else None
+
+
+def bullet_blocks(text: str, heading: re.Pattern) -> List[str]:
+    """Items of every '* item' block that directly follows a line matching `heading`"""
+    items = []
+    in_block = False
+    for line in scan_lines(text):
+        stripped = line.strip()
+        if in_block:
+            if stripped.startswith("*") and len(stripped) > 1:
+                items.append(stripped[1:].strip())
+                continue
+            if not stripped:
+                continue
+            in_block = False
+        if heading.search(line.rstrip()):
+            in_block = True
+    return items
+
+
+def starred_lines(text: str) -> List[str]:
+    """Text of every line that starts with '*' (after indentation)"""
+    items = []
+    for line in scan_lines(text):
+        stripped = line.lstrip()
+        if stripped.startswith("*"):
+            items.append(stripped[1:].strip())
+    return items
+
+
+def label_ahead(lines: List[str]) -> List[bool]:
+    """For each line: does a run of letters/whitespace from its start reach a ':'?
+
+    The run may continue over following lines, as r'(?![A-Z\\s]+:)' would see it,
+    but each line is looked at once (back to front) instead of once per line above it.
+    """
+    ahead = [False] * len(lines)
+    reach_next = False
+    for i in range(len(lines) - 1, -1, -1):
+        line = lines[i]
+        colon = LABEL_PREFIX.match(line)
+        letters_only = LETTERS_ONLY.fullmatch(line) is not None
+        # The newline before the next line counts as the one required character
+        ahead[i] = bool(colon and colon.end() > 1) or (letters_only and reach_next)
+        reach_next = bool(colon) or (letters_only and reach_next)
+    return ahead
+
+
+def labelled_runs(text: str, label: re.Pattern) -> List[str]:
+    """Text after each `label` match plus the lines that follow, until a blank line or another 'Label:' line"""
+    ahead = label_ahead(text.split("\n"))
+    runs = []
+    current = None
+    for i, line in enumerate(scan_lines(text)):
+        if current is not None:
+            if not current:
+                # Label at the end of its line: the run starts at the next non-blank line
+                if line.strip():
+                    current.append(line.strip())
+                continue
+            if line and not ahead[i]:
+                current.append(line)
+                continue
+            runs.append("\n".join(current))
+            current = None
+        match = label.search(line)
+        if match:
+            rest = line[match.end():].strip()
+            current = [rest] if rest else []
+    if current:
+        runs.append("\n".join(current))
+    return runs
@@ -0,0 +1,144 @@
+"""Overload /generate-segment with one flooding client and check well-behaved clients keep their latency.
+
+Run from the repo root after an ingest has written ems_protocols.json:
+
+    python benchmarks/bench_admission.py
+    python benchmarks/bench_admission.py --render-ms 20 --flood 32 --seconds 10 --json admission.json
+
+Renders are made artificially expensive (--render-ms of CPU, like audio synthesis would
+cost) and the render cache is bypassed, so every admitted request costs a render.
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, REPO_ROOT)
+
+
+def load_main():
+    spec = importlib.util.spec_from_file_location("bench_admission_main", os.path.join(REPO_ROOT, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def configure(main, admission: bool, render_ms: float):
+    from admission import RenderGate
+
+    build_segment = main.build_segment
+
+    def expensive_segment(protocol_id, mode):
+        end = time.perf_counter() + render_ms / 1000
+        while time.perf_counter() < end:
+            pass
+        return build_segment(protocol_id, mode)
+
+    main.build_segment = expensive_segment
+    main.RENDER_CACHE.tiers = []
+    if not admission:
+        # The middleware holds on to the limiter, so open it up in place
+        main.CLIENT_LIMITER.rate = main.CLIENT_LIMITER.burst = 10 ** 9
+        main.RENDER_GATE = RenderGate(limit=10 ** 6, max_queue=10 ** 6, timeout=10 ** 6)
+
+
+async def scenario(main, seconds: float, good_clients: int, good_rate: float, flood: int, rtt: float) -> dict:
+    import httpx
+
+    protocol_id = next(iter(main.PROTOCOL_DB))
+    body = {"protocol_id": protocol_id, "mode": "study"}
+    good_latencies, good_status, flood_status = [], {}, {}
+    deadline = time.perf_counter() + seconds
+
+    async def good(client, n):
+        # Stays well under the per-client rate, as a real player would
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post("/generate-segment", json=body, headers={"x-api-key": f"good-{n}"})
+            good_latencies.append(time.perf_counter() - start)
+            good_status[response.status_code] = good_status.get(response.status_code, 0) + 1
+            await asyncio.sleep(max(0.0, 1 / good_rate - (time.perf_counter() - start)))
+
+    async def flooder(client):
+        # Ignores Retry-After and fires again as soon as the answer is back over the network
+        while time.perf_counter() < deadline:
+            response = await client.post("/generate-segment", json=body, headers={"x-api-key": "flood"})
+            flood_status[response.status_code] = flood_status.get(response.status_code, 0) + 1
+            await asyncio.sleep(rtt)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await asyncio.gather(*(good(client, n) for n in range(good_clients)),
+                             *(flooder(client) for _ in range(flood)))
+
+    return {
+        "good": {"requests": len(good_latencies), "status": good_status,
+                 "p50_ms": round(percentile(good_latencies, 50) * 1000, 2),
+                 "p99_ms": round(percentile(good_latencies, 99) * 1000, 2)},
+        "flood": {"requests": sum(flood_status.values()), "status": flood_status},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--render-ms", type=float, default=10.0, help="Simulated cost of one render")
+    parser.add_argument("--good", type=int, default=8, help="Well-behaved clients")
+    parser.add_argument("--good-rate", type=float, default=2.0, help="Requests per second per good client")
+    parser.add_argument("--flood", type=int, default=16, help="Concurrent requests from the flooding client")
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="Network round trip the flooder waits between requests")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        print("❌ httpx is needed to drive the app")
+        sys.exit(1)
+
+    main_module = load_main()
+    if not main_module.PROTOCOL_DB:
+        print("❌ No protocols loaded; run an ingest first (e.g. archived-scripts/ingest_unified.py)")
+        sys.exit(1)
+
+    results = {}
+    print(f"📊 {args.good} clients at {args.good_rate}/s plus a flood of {args.flood} concurrent requests, "
+          f"{args.render_ms}ms renders, {args.seconds}s")
+    for label, admission in (("baseline", None), ("no admission", False), ("admission", True)):
+        main_module = load_main()
+        if admission is None:
+            # Just the good clients: the latency they should keep under overload
+            configure(main_module, True, args.render_ms)
+            row = asyncio.run(scenario(main_module, args.seconds, args.good, args.good_rate, 0, 0))
+        else:
+            configure(main_module, admission, args.render_ms)
+            row = asyncio.run(scenario(main_module, args.seconds, args.good, args.good_rate, args.flood,
+                                       args.rtt_ms / 1000))
+        results[label] = row
+        print(f"   {label:<13} good p50 {row['good']['p50_ms']:>8}ms  p99 {row['good']['p99_ms']:>8}ms  "
+              f"good status {row['good']['status']}  flood status {row['flood']['status']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Measure cold start: API import + DB load + first request, and ingest script import times.
+
+Run from the repo root:
+
+    python benchmarks/bench_cold_start.py --runs 5 --json cold_start.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(REPO_ROOT, "archived-scripts")
+
+# Runs in a fresh interpreter so nothing is already imported or cached
+API_PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, REPO_ROOT)
+import main
+imported = time.perf_counter()
+
+from starlette.testclient import TestClient
+client = TestClient(main.app)
+protocol_id = next(iter(main.PROTOCOL_DB), "")
+first = time.perf_counter()
+client.post("/generate-segment", json={"protocol_id": protocol_id, "mode": "study"})
+done = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "db_load_s": main.DB_LOAD_SECONDS,
+    "first_request_ms": (done - first) * 1000,
+}))
+"""
+
+SCRIPT_PROBE = r"""
+import json, sys, time
+sys.path.insert(0, SCRIPTS_DIR)
+start = time.perf_counter()
+import MODULE
+print(json.dumps({"import_s": time.perf_counter() - start,
+                  "heavy_modules": sorted(m for m in ("openai", "pypdfium2", "pypdf", "pdfplumber") if m in sys.modules)}))
+"""
+
+INGEST_MODULES = ["ingest_protocol", "ingest_protocol_mockrun", "ingest_bulk"]
+
+
+def probe(code: str, cwd: str) -> dict:
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: list) -> dict:
+    keys = [k for k, v in samples[0].items() if isinstance(v, (int, float))]
+    return {k: round(statistics.median(s[k] for s in samples), 6) for k in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ems-coldstart-")
+    try:
+        shutil.copy(os.path.join(REPO_ROOT, "ems-protocol-manual.txt"), workdir)
+        subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, "ingest_unified.py")],
+                       cwd=workdir, check=True, capture_output=True)
+        snapshot = os.path.join(workdir, "ems_protocols.snapshot")
+        hidden = snapshot + ".off"
+
+        results = {"api": {}, "ingest_imports": {}}
+        api_probe = API_PROBE.replace("REPO_ROOT", repr(REPO_ROOT))
+        for mode in ("json", "snapshot"):
+            # main.py falls back to JSON when there is no snapshot
+            if mode == "json":
+                os.rename(snapshot, hidden)
+            samples = [probe(api_probe, workdir) for _ in range(args.runs)]
+            if mode == "json":
+                os.rename(hidden, snapshot)
+            if "error" in samples[0]:
+                results["api"][mode] = samples[0]
+                print(f"   ❌ {mode}: {samples[0]['error']}")
+                continue
+            results["api"][mode] = summarize(samples)
+            row = results["api"][mode]
+            print(f"   🚀 {mode:<9} import {row['import_s'] * 1000:7.1f} ms   db load {row['db_load_s'] * 1000:6.2f} ms   "
+                  f"first request {row['first_request_ms']:6.2f} ms")
+
+        for module in INGEST_MODULES:
+            code = SCRIPT_PROBE.replace("SCRIPTS_DIR", repr(SCRIPTS_DIR)).replace("MODULE", module)
+            samples = [probe(code, workdir) for _ in range(args.runs)]
+            if "error" in samples[0]:
+                results["ingest_imports"][module] = samples[0]
+                print(f"   ❌ import {module}: {samples[0]['error']}")
+                continue
+            results["ingest_imports"][module] = {**summarize(samples), "heavy_modules": samples[0]["heavy_modules"]}
+            heavy = ", ".join(samples[0]["heavy_modules"]) or "none"
+            print(f"   📦 import {module:<24} {results['ingest_imports'][module]['import_s'] * 1000:7.1f} ms   "
+                  f"heavy deps loaded: {heavy}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compare precompressed protocol payloads with per-request compression.
+
+Run from the repo root after an ingest so ems_protocols.json exists:
+
+    python benchmarks/bench_compression.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from compression import available_encoders, build_variants, choose_encoding
+from protocol_db import DB_FILE, read_db_file
+
+# Downlink bandwidth (kbit/s) and round-trip time (ms) for cellular-like links
+LINK_PROFILES = {
+    "slow-3g": (400, 400),
+    "fast-3g": (1600, 150),
+    "weak-lte": (5000, 70),
+}
+
+# TCP slow start: 10 segments of 1460 bytes in the first window, doubling every round trip
+INITIAL_WINDOW_BYTES = 10 * 1460
+
+
+def transfer_ms(size: int, kbps: int, rtt_ms: int) -> float:
+    """Estimate time to deliver `size` bytes on a fresh connection, request RTT included"""
+    round_trips = 1
+    window, sent = INITIAL_WINDOW_BYTES, 0
+    while sent + window < size:
+        sent += window
+        window *= 2
+        round_trips += 1
+    return round_trips * rtt_ms + size * 8 / kbps
+
+
+def cpu_us_per_call(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def bench_payload(name: str, payload: bytes, iterations: int) -> dict:
+    variants = build_variants(payload)
+    encoders = available_encoders()
+    accept = "gzip, deflate, br, zstd"
+
+    result = {"payload": name, "raw_bytes": len(payload), "encodings": {}}
+    for encoding, body in variants.items():
+        row = {"bytes": len(body)}
+        if encoding in encoders:
+            encode = encoders[encoding]
+            row["cpu_us_per_request_on_the_fly"] = round(cpu_us_per_call(lambda: encode(payload), iterations), 1)
+        row["cpu_us_per_request_precompressed"] = round(
+            cpu_us_per_call(lambda: variants[choose_encoding(accept, variants)], iterations * 100), 3)
+        row["transfer_ms"] = {
+            profile: round(transfer_ms(len(body), kbps, rtt), 1)
+            for profile, (kbps, rtt) in LINK_PROFILES.items()
+        }
+        result["encodings"][encoding] = row
+    return result
+
+
+def print_table(results: list):
+    for res in results:
+        print(f"\n📦 {res['payload']} ({res['raw_bytes']} bytes raw)")
+        print(f"   {'encoding':<9} {'bytes':>8} {'cpu/req live':>13} {'cpu/req pre':>12}  " +
+              "  ".join(f"{p:>9}" for p in LINK_PROFILES))
+        for encoding, row in res["encodings"].items():
+            live = row.get("cpu_us_per_request_on_the_fly")
+            live = f"{live:.1f} us" if live is not None else "-"
+            pre = f"{row['cpu_us_per_request_precompressed']:.2f} us"
+            times = "  ".join(f"{row['transfer_ms'][p]:>7.0f}ms" for p in LINK_PROFILES)
+            print(f"   {encoding:<9} {row['bytes']:>8} {live:>13} {pre:>12}  {times}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    data = read_db_file(args.db)
+    if data is None:
+        sys.exit(f"❌ {args.db} not found. Run an ingest first.")
+    protocols = data.get("protocols", data)
+
+    catalog = [{"id": k, "title": v["title"], "category": v.get("category", "Uncategorized")}
+               for k, v in protocols.items()]
+    largest = max(protocols, key=lambda k: len(protocols[k].get("raw_text", "")))
+
+    def dump(obj):
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    results = [
+        bench_payload("catalog", dump(catalog), args.iterations),
+        bench_payload(f"protocol:{largest}", dump({"id": largest, **protocols[largest]}), args.iterations),
+    ]
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
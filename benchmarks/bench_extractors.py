@@ -0,0 +1,170 @@
+"""Stress the section extractors with large and pathological inputs and check they scale linearly.
+
+Run from the repo root:
+
+    python benchmarks/bench_extractors.py                    # exits non-zero if any extractor grows faster than linear
+    python benchmarks/bench_extractors.py --legacy --json extractors.json
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(REPO_ROOT, "archived-scripts")
+MANUAL = os.path.join(REPO_ROOT, "ems-protocol-manual.txt")
+
+sys.path.insert(0, SCRIPTS_DIR)
+
+# log(time) / log(size) above this means worse than linear
+MAX_SLOPE = 1.3
+# The legacy regexes are quadratic; past this many lines one run takes minutes
+LEGACY_MAX_LINES = 4000
+
+# The regexes the extractors used before section_scanner, for comparison
+LEGACY = {
+    "section": lambda text: re.search(r'History\s*\n(.*?)(?=\n[A-Z][a-z]+:|$)', text, re.IGNORECASE | re.DOTALL),
+    "contraindications": lambda text: re.findall(r'CONTRAINDICATION[S]?:?\s*([^\n]+(?:\n(?![A-Z\s]+:)[^\n]+)*)',
+                                                 text, re.IGNORECASE),
+    "pearls": lambda text: re.findall(r'Pearls?\s*\n((?:^\s*\*[^\n]+\n?)+)', text, re.IGNORECASE | re.MULTILINE),
+}
+
+
+def load_module(path: str, name: str):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def protocol_sample() -> str:
+    """A slice of real protocol text from the manual (or a stand-in if it's missing)"""
+    if os.path.exists(MANUAL):
+        with open(MANUAL, "r", encoding="utf-8", errors="ignore") as f:
+            text = f.read().replace("\r\n", "\n")
+        start = text.find("History")
+        if start != -1:
+            return text[start:start + 20000]
+    return "History\n* Chest pain\nSigns and Symptoms\n* Diaphoresis\nPearls\n* Obtain a 12 lead early\n"
+
+
+# Each input is built from `lines` lines so the sizes line up across kinds
+def concatenated(lines: int, sample: str) -> str:
+    """Many protocols merged into one block, as the ingestors see big merged entries"""
+    base = sample.split("\n")
+    return "\n".join(base[i % len(base)] for i in range(lines))
+
+
+def contraindications_without_labels(lines: int, _sample: str) -> str:
+    """Letters-only lines after CONTRAINDICATIONS: - every line re-scans the rest looking for a ':'"""
+    return "CONTRAINDICATIONS:\n" + "\n".join("Known allergy to the agent or its class" for _ in range(lines))
+
+
+def long_bullet_block(lines: int, _sample: str) -> str:
+    return "Pearls\n" + "\n".join(f"* Pearl number {i} about reassessing the patient often" for i in range(lines))
+
+
+def unterminated_history(lines: int, _sample: str) -> str:
+    """A History heading whose body never reaches another 'Field:' line"""
+    return "History\n" + "\n".join(f"* item {i} with no field label after it" for i in range(lines))
+
+
+INPUTS = {
+    "concatenated": concatenated,
+    "contra_no_colon": contraindications_without_labels,
+    "long_bullets": long_bullet_block,
+    "unterminated_history": unterminated_history,
+}
+
+
+def extractors() -> dict:
+    advanced = load_module(os.path.join(SCRIPTS_DIR, "ingest_advanced.py"), "bench_ingest_advanced")
+    parse = load_module(os.path.join(SCRIPTS_DIR, "parse_ems_protocols.py"), "bench_parse_ems_protocols")
+    parser = advanced.ProtocolParser()
+    return {
+        "advanced.extract_section": lambda text: parser.extract_section(text, "History"),
+        "advanced.extract_pearls": parser.extract_pearls,
+        "parse.extract_contraindications": parse.extract_contraindications,
+        "parse.extract_pearls": parse.extract_pearls,
+        "parse.extract_differential_diagnosis": parse.extract_differential_diagnosis,
+    }
+
+
+def best_of(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def slope(sizes: list, seconds: list) -> float:
+    """Least-squares slope of log(seconds) against log(size): ~1 is linear, ~2 quadratic"""
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread if spread else 0.0
+
+
+def run(name: str, fn, build, sizes: list, sample: str, repeat: int) -> dict:
+    seconds = [best_of(fn, build(lines, sample), repeat) for lines in sizes]
+    fitted = round(slope(sizes, seconds), 2)
+    return {"name": name, "lines": sizes, "ms": [round(s * 1000, 3) for s in seconds],
+            "slope": fitted, "linear": fitted < MAX_SLOPE}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500, help="Lines in the 1x input")
+    parser.add_argument("--scales", type=int, nargs="*", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of runs per size")
+    parser.add_argument("--legacy", action="store_true", help="Also time the old regexes (slow: they're quadratic)")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    sample = protocol_sample()
+    sizes = [args.lines * scale for scale in args.scales]
+    results = {"current": {}, "legacy": {}}
+
+    current = extractors()
+    print(f"📊 {len(INPUTS)} inputs at {', '.join(str(s) for s in sizes)} lines")
+    for kind, build in INPUTS.items():
+        print(f"\n📄 {kind}")
+        for name, fn in current.items():
+            row = run(name, fn, build, sizes, sample, args.repeat)
+            results["current"].setdefault(kind, []).append(row)
+            mark = "✅" if row["linear"] else "❌"
+            print(f"   {mark} {name:<40} slope {row['slope']:>5}  {row['ms'][0]:>9} → {row['ms'][-1]:>9} ms")
+
+        if args.legacy:
+            legacy_sizes = [s for s in sizes if s <= LEGACY_MAX_LINES]
+            if len(legacy_sizes) < 2:
+                continue
+            for name, fn in LEGACY.items():
+                row = run(f"legacy.{name}", fn, build, legacy_sizes, sample, 1)
+                results["legacy"].setdefault(kind, []).append(row)
+                print(f"   ·  {row['name']:<40} slope {row['slope']:>5}  {row['ms'][0]:>9} → {row['ms'][-1]:>9} ms")
+
+    superlinear = [f"{kind}/{row['name']}" for kind, rows in results["current"].items()
+                   for row in rows if not row["linear"]]
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Saved results to {args.json}")
+
+    if superlinear:
+        print(f"\n❌ Worse than linear (slope ≥ {MAX_SLOPE}): {', '.join(superlinear)}")
+        sys.exit(1)
+    print(f"\n🎉 Every extractor scales linearly (slope < {MAX_SLOPE})")
+
+
+if __name__ == "__main__":
+    main()
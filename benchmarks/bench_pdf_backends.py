@@ -0,0 +1,153 @@
+"""Bake off the PDF text backends: speed, memory, and agreement with ems-protocol-manual.txt.
+
+Run from the repo root:
+
+    python benchmarks/bench_pdf_backends.py                          # synthetic PDF built from the manual text
+    python benchmarks/bench_pdf_backends.py --pdf ems-protocol-manual.pdf --json backends.json
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+PDF_PARSER_DIR = os.path.join(REPO_ROOT, "pdf-parser")
+MANUAL = os.path.join(REPO_ROOT, "ems-protocol-manual.txt")
+
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, PDF_PARSER_DIR)
+from pdf_backends import BACKENDS, available_backends
+from synthetic_pdf import paginate, write_text_pdf
+
+# Each backend runs in a fresh interpreter so peak RSS is its own
+PROBE = r"""
+import json, resource, sys, time
+sys.path.insert(0, PDF_PARSER_DIR)
+from pdf_backends import extract_page_texts
+start = time.perf_counter()
+texts = extract_page_texts(PDF_PATH, BACKEND)
+elapsed = time.perf_counter() - start
+with open(OUT_PATH, "w", encoding="utf-8") as f:
+    json.dump(texts, f)
+print(json.dumps({"seconds": elapsed, "pages": len(texts),
+                  "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+WORD = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+# Doses as written in the manual: "0.5 mg", "1mg/kg", "150 mcg", "2 L/min", "200 J"
+DOSE = re.compile(r"\b\d+(?:\.\d+)?\s?(?:mcg/kg/min|mcg/kg|mg/kg|mg/min|mcg|mg|mEq|g|ml|mL|L/min|units?|J)\b")
+
+
+def words(text: str) -> Counter:
+    return Counter(WORD.findall(text.lower()))
+
+
+def doses(text: str) -> Counter:
+    return Counter(re.sub(r"\s+", "", m).lower() for m in DOSE.findall(text))
+
+
+def overlap(extracted: Counter, reference: Counter) -> dict:
+    common = sum((extracted & reference).values())
+    return {
+        "precision": round(common / max(1, sum(extracted.values())), 4),
+        "recall": round(common / max(1, sum(reference.values())), 4),
+    }
+
+
+def score(text: str, reference: str) -> dict:
+    extracted_doses, reference_doses = doses(text), doses(reference)
+    return {
+        "words": overlap(words(text), words(reference)),
+        "doses": {
+            **overlap(extracted_doses, reference_doses),
+            # Dose strings that appear only in the extraction were mangled on the way out
+            "not_in_reference": sum((extracted_doses - reference_doses).values()),
+        },
+    }
+
+
+def run_backend(backend: str, pdf_path: str, workdir: str) -> dict:
+    out_path = os.path.join(workdir, f"{backend}.json")
+    code = (PROBE.replace("PDF_PARSER_DIR", repr(PDF_PARSER_DIR)).replace("PDF_PATH", repr(pdf_path))
+            .replace("BACKEND", repr(backend)).replace("OUT_PATH", repr(out_path)))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+
+    row = json.loads(result.stdout.strip().splitlines()[-1])
+    with open(out_path, encoding="utf-8") as f:
+        row["text"] = "\n".join(text for _, text in sorted(json.load(f).items(), key=lambda kv: int(kv[0])))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", help="PDF to extract (default: a synthetic PDF of the manual text)")
+    parser.add_argument("--pages", type=int, default=100, help="Pages in the synthetic PDF")
+    parser.add_argument("--backends", nargs="*", default=None, help=f"Subset of: {', '.join(BACKENDS)}")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    with open(MANUAL, "r", encoding="utf-8", errors="ignore") as f:
+        reference = f.read()
+
+    workdir = tempfile.mkdtemp(prefix="ems-backends-")
+    pdf_path = args.pdf
+    if not pdf_path:
+        pages = paginate(reference, args.pages)
+        pdf_path = os.path.join(workdir, "synthetic.pdf")
+        write_text_pdf(pdf_path, pages)
+        # The synthetic PDF holds a (latin-1) slice of the manual, so that slice is the reference
+        reference = "\n".join("\n".join(lines) for lines in pages).encode("latin-1", "replace").decode("latin-1")
+
+    try:
+        installed = available_backends()
+        results = {}
+        print(f"📄 {pdf_path}")
+        print(f"   {'backend':<12} {'pages/s':>9} {'peak MB':>9} {'word prec':>10} {'word rec':>9} "
+              f"{'dose rec':>9} {'bad doses':>10}")
+        for backend in args.backends or list(BACKENDS):
+            if backend not in installed:
+                results[backend] = {"skipped": "not installed"}
+                print(f"   {backend:<12} skipped (not installed)")
+                continue
+            row = run_backend(backend, pdf_path, workdir)
+            if "error" in row:
+                results[backend] = row
+                print(f"   ❌ {backend}: {row['error']}")
+                continue
+
+            text = row.pop("text")
+            row["pages_per_sec"] = round(row["pages"] / row["seconds"], 1) if row["seconds"] else 0.0
+            row["peak_rss_mb"] = round(row["peak_rss_mb"], 1)
+            row.update(score(text, reference))
+            results[backend] = row
+            print(f"   {backend:<12} {row['pages_per_sec']:>9} {row['peak_rss_mb']:>9} "
+                  f"{row['words']['precision']:>10} {row['words']['recall']:>9} "
+                  f"{row['doses']['recall']:>9} {row['doses']['not_in_reference']:>10}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Fastest backend that loses no doses and doesn't invent any
+    intact = [name for name, row in results.items()
+              if "doses" in row and row["doses"]["recall"] >= 0.999 and row["doses"]["not_in_reference"] == 0]
+    if intact:
+        best = max(intact, key=lambda name: results[name]["pages_per_sec"])
+        print(f"🏆 Fastest backend with doses intact: {best}")
+    else:
+        print("⚠️ No backend kept every dose intact")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Compare per-worker memory for the protocol DB as parsed vs with its repeated strings interned.
+
+Run from the repo root after an ingest has written ems_protocols.json:
+
+    python benchmarks/bench_record_memory.py
+    python benchmarks/bench_record_memory.py --db ems_protocols.json --copies 20 --json record_memory.json
+
+Each DB is measured as the JSON file and as JSONL, which parses every record on its own.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, REPO_ROOT)
+from protocol_db import JsonlWriter
+
+# Each representation loads in a fresh interpreter, like an API worker does
+PROBE = r"""
+import gc, json, os, sys, tracemalloc
+sys.path.insert(0, REPO_ROOT)
+from protocol_db import JsonlReader, intern_protocols, load_db_data
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+if TRACE:
+    tracemalloc.start()
+before = rss_bytes()
+if MODE == "dicts" and FORMAT == "jsonl":
+    # read_jsonl interns as it reads; this is each record exactly as parsed
+    reader = JsonlReader(JSONL_PATH)
+    protocols = {pid: reader.get(pid) for pid in reader.ids()}
+    reader.close()
+else:
+    # The same steps as main.load_db, with or without interning
+    data = load_db_data(DB_PATH, SNAPSHOT_PATH, JSONL_PATH)
+    protocols = data.get("protocols", data)
+    del data
+    if MODE == "interned":
+        protocols = intern_protocols(protocols)
+gc.collect()
+print(json.dumps({
+    "protocols": len(protocols),
+    "rss_mb": (rss_bytes() - before) / 2**20,
+    "heap_mb": tracemalloc.get_traced_memory()[0] / 2**20 if TRACE else None,
+}))
+"""
+
+MODES = ["dicts", "interned"]
+FORMATS = ["json", "jsonl"]
+
+
+def probe(mode: str, fmt: str, db_path: str, jsonl_path: str, trace: bool) -> dict:
+    # Missing paths make load_db_data read exactly the one file asked for
+    missing = os.path.join(os.path.dirname(db_path), "missing")
+    code = (PROBE.replace("REPO_ROOT", repr(REPO_ROOT)).replace("DB_PATH", repr(db_path))
+            .replace("SNAPSHOT_PATH", repr(missing + ".snapshot")).replace("JSONL_PATH", repr(jsonl_path))
+            .replace("MODE", repr(mode)).replace("FORMAT", repr(fmt)).replace("TRACE", repr(trace)))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def scaled_db(db_path: str, copies: int, workdir: str) -> str:
+    """The DB repeated `copies` times under new IDs, to stand in for a bigger manual"""
+    if copies <= 1:
+        return db_path
+    with open(db_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    protocols = data.get("protocols", data)
+    scaled = {f"{pid}_{n}": record for n in range(copies) for pid, record in protocols.items()}
+    path = os.path.join(workdir, f"x{copies}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"protocols": scaled}, f)
+    return path
+
+
+def jsonl_copy(db_path: str, workdir: str) -> str:
+    """The same DB written as JSONL, one record per line"""
+    with open(db_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    path = os.path.join(workdir, os.path.splitext(os.path.basename(db_path))[0] + ".jsonl")
+    with JsonlWriter(path) as writer:
+        for pid, record in data.get("protocols", data).items():
+            writer.write(pid, record)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join(REPO_ROOT, "ems_protocols.json"))
+    parser.add_argument("--copies", type=int, nargs="*", default=[1, 10], help="Also measure the DB repeated N times")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per measurement (the lowest RSS is kept)")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ {args.db} not found; run an ingest first (e.g. archived-scripts/ingest_unified.py)")
+        sys.exit(1)
+
+    workdir = tempfile.mkdtemp(prefix="ems-records-")
+    results = {}
+    try:
+        print(f"📄 {args.db}")
+        print(f"   {'copies':>6} {'format':<6} {'protocols':>10} {'repr':<9} {'RSS MB':>8} {'heap MB':>8}")
+        for copies in args.copies:
+            db_path = scaled_db(args.db, copies, workdir)
+            paths = {"json": (db_path, os.path.join(workdir, "missing.jsonl")),
+                     "jsonl": (os.path.join(workdir, "missing.json"), jsonl_copy(db_path, workdir))}
+            for fmt in FORMATS:
+                rows = {}
+                for mode in MODES:
+                    samples = [probe(mode, fmt, *paths[fmt], trace=False) for _ in range(args.runs)]
+                    errors = [s for s in samples if "error" in s]
+                    if errors:
+                        rows[mode] = errors[0]
+                        print(f"   ❌ {fmt} {mode}: {errors[0]['error']}")
+                        continue
+                    row = min(samples, key=lambda s: s["rss_mb"])
+                    row["heap_mb"] = probe(mode, fmt, *paths[fmt], trace=True).get("heap_mb")
+                    row["rss_mb"] = round(row["rss_mb"], 2)
+                    row["heap_mb"] = round(row["heap_mb"], 2) if row["heap_mb"] is not None else None
+                    rows[mode] = row
+                    print(f"   {copies:>6} {fmt:<6} {row['protocols']:>10} {mode:<9} {row['rss_mb']:>8} {row['heap_mb']:>8}")
+
+                if all("error" not in rows.get(mode, {"error": 1}) for mode in MODES):
+                    dicts, interned = rows["dicts"], rows["interned"]
+                    rows["saved"] = {
+                        "rss_mb": round(dicts["rss_mb"] - interned["rss_mb"], 2),
+                        "heap_pct": round(100 * (1 - interned["heap_mb"] / dicts["heap_mb"]), 1) if dicts["heap_mb"] else 0.0,
+                    }
+                    print(f"   📊 x{copies} {fmt}: interning saves {rows['saved']['rss_mb']} MB RSS per worker, "
+                          f"{rows['saved']['heap_pct']}% of the live heap")
+                results[f"x{copies}_{fmt}"] = rows
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Simulate several API workers rendering a skewed request mix, with and without the shared cache tier.
+
+Run from the repo root:
+
+    python benchmarks/bench_render_cache.py
+    python benchmarks/bench_render_cache.py --workers 8 --requests 2000 --json render_cache.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, REPO_ROOT)
+from render_cache import MemoryTier, RenderCache, SqliteTier
+
+
+def request_mix(protocols: int, requests: int, skew: float, seed: int) -> list:
+    """Zipf-like: a few protocols (Cardiac Arrest, STEMI) take most of the traffic"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(protocols)]
+    return rng.choices(range(protocols), weights=weights, k=requests)
+
+
+def run_worker(job) -> dict:
+    worker, path, args = job
+    tiers = [MemoryTier(max_entries=args["memory_entries"])]
+    if path:
+        tiers.append(SqliteTier(path))
+    cache = RenderCache(tiers)
+
+    def render(pid):
+        time.sleep(args["render_ms"] / 1000)
+        return {"title": f"protocol {pid}", "mode": "study", "audio_url": "", "script_text": "x" * 2000}
+
+    start = time.perf_counter()
+    for pid in request_mix(args["protocols"], args["requests"], args["skew"], seed=worker):
+        cache.get_or_render(f"p{pid}:study", lambda: render(pid))
+    return {"seconds": time.perf_counter() - start, "renders": cache.renders,
+            "tiers": {t.name: {"hits": t.hits, "misses": t.misses} for t in tiers}}
+
+
+def run(workers: int, path, args: dict) -> dict:
+    with Pool(workers) as pool:
+        rows = pool.map(run_worker, [(w, path, args) for w in range(workers)])
+    tiers = {}
+    for row in rows:
+        for name, counts in row["tiers"].items():
+            slot = tiers.setdefault(name, {"hits": 0, "misses": 0})
+            slot["hits"] += counts["hits"]
+            slot["misses"] += counts["misses"]
+    for slot in tiers.values():
+        slot["hit_ratio"] = round(slot["hits"] / max(1, slot["hits"] + slot["misses"]), 4)
+    return {"renders": sum(r["renders"] for r in rows),
+            "worker_seconds": round(max(r["seconds"] for r in rows), 3), "tiers": tiers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per worker")
+    parser.add_argument("--protocols", type=int, default=150)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of protocol popularity")
+    parser.add_argument("--render-ms", type=float, default=2.0, help="Simulated cost of one render")
+    parser.add_argument("--memory-entries", type=int, default=64, help="Per-worker memory tier size")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+    settings = {k: getattr(args, k) for k in ("requests", "protocols", "skew", "render_ms", "memory_entries")}
+
+    workdir = tempfile.mkdtemp(prefix="ems-render-cache-")
+    results = {}
+    try:
+        print(f"📊 {args.requests} requests per worker over {args.protocols} protocols (skew {args.skew})")
+        print(f"   {'workers':>7} {'tiers':<15} {'renders':>8} {'memory hit':>11} {'shared hit':>11} {'slowest s':>10}")
+        for workers in args.workers:
+            for label in ("memory", "memory+shared"):
+                path = os.path.join(workdir, f"w{workers}.db") if label == "memory+shared" else None
+                row = run(workers, path, settings)
+                results[f"{workers}:{label}"] = row
+                shared = row["tiers"].get("shared", {}).get("hit_ratio", "-")
+                print(f"   {workers:>7} {label:<15} {row['renders']:>8} {row['tiers']['memory']['hit_ratio']:>11} "
+                      f"{shared:>11} {row['worker_seconds']:>10}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
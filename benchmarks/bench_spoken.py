@@ -0,0 +1,114 @@
+"""Time the single-pass trie expansion against one regex substitution per term, as the term table grows.
+
+Run from the repo root after an ingest has written ems_protocols.json:
+
+    python benchmarks/bench_spoken.py
+    python benchmarks/bench_spoken.py --extra-terms 0 500 5000 --json spoken.json
+
+Also checks that expansion stays linear on one long text full of words that need a look
+at their context (IN, MAD, SOB), and exits non-zero if it doesn't.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, REPO_ROOT)
+from protocol_db import load_db_data
+from spoken_text import ABBREVIATION, CURATED, Expander, build_expander, definition_terms
+
+
+def term_table(db: dict, extra: int) -> dict:
+    terms = {term: (expansion, ABBREVIATION) for term, expansion in definition_terms(db).items()}
+    terms.update(CURATED)
+    # Stand-ins for a bigger pronunciation table: same shape, never in the text
+    for n in range(extra):
+        terms[f"ZX{n}Q"] = (f"synthetic term {n}", ABBREVIATION)
+    return terms
+
+
+def naive_expand(patterns, text: str) -> str:
+    # What this replaces: a pass over the whole text for every term
+    for pattern, spoken in patterns:
+        text = pattern.sub(spoken, text)
+    return text
+
+
+def timed(fn, texts, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Context-only and English-word abbreviations, in and out of context
+LINEAR_SAMPLE = "Place patient IN position. Give 2 mg IN/ IM via MAD. REVISED AND MAD APPROVED, SOB NOTED. "
+LINEAR_SCALE = 8
+# Linear work grows about LINEAR_SCALE times; quadratic grows about LINEAR_SCALE squared
+LINEAR_MAX_RATIO = 2 * LINEAR_SCALE
+
+
+def linear_check(expander: Expander, repeat: int, copies: int = 2000) -> dict:
+    small = LINEAR_SAMPLE * copies
+    large = LINEAR_SAMPLE * (copies * LINEAR_SCALE)
+    small_s = timed(expander.expand, [small], repeat)
+    large_s = timed(expander.expand, [large], repeat)
+    return {"chars": [len(small), len(large)], "ms": [round(small_s * 1000, 2), round(large_s * 1000, 2)],
+            "ratio": round(large_s / small_s, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--extra-terms", type=int, nargs="*", default=[0, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    data = load_db_data(os.path.join(REPO_ROOT, "ems_protocols.json"), os.path.join(REPO_ROOT, "ems_protocols.snapshot"))
+    if not data:
+        print("❌ No protocols loaded; run an ingest first (e.g. archived-scripts/ingest_unified.py)")
+        sys.exit(1)
+    db = data.get("protocols", data)
+    texts = [item.get("raw_text", "") for item in db.values() if item.get("category") != "Definitions"]
+    chars = sum(len(t) for t in texts)
+
+    results = {}
+    print(f"📊 Expanding {len(texts)} protocols ({chars} chars), best of {args.repeat}")
+    print(f"   {'terms':>6} {'trie ms':>9} {'regex ms':>10} {'speedup':>8}")
+    for extra in args.extra_terms:
+        terms = term_table(db, extra)
+        expander = Expander(terms)
+        patterns = [(re.compile(r'(?<![A-Za-z])' + re.escape(term) + r'(?![A-Za-z0-9])'), spoken)
+                    for term, (spoken, _) in sorted(terms.items(), key=lambda kv: -len(kv[0]))]
+        trie_s = timed(expander.expand, texts, args.repeat)
+        naive_s = timed(lambda text: naive_expand(patterns, text), texts, args.repeat)
+        row = {"terms": len(terms), "trie_ms": round(trie_s * 1000, 2), "regex_ms": round(naive_s * 1000, 2),
+               "speedup": round(naive_s / trie_s, 1)}
+        results[len(terms)] = row
+        print(f"   {row['terms']:>6} {row['trie_ms']:>9} {row['regex_ms']:>10} {row['speedup']:>7}x")
+
+    linear = linear_check(build_expander(db), args.repeat)
+    results["linear"] = linear
+    print(f"📈 {linear['chars'][0]} -> {linear['chars'][1]} chars: {linear['ms'][0]} -> {linear['ms'][1]} ms "
+          f"({linear['ratio']}x, limit {LINEAR_MAX_RATIO}x)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+    if linear["ratio"] > LINEAR_MAX_RATIO:
+        print("❌ Expansion time grew faster than the text")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Hold thousands of idle /updates connections on one event loop and time how long a publish takes to reach all of them.
+
+Run from the repo root:
+
+    python benchmarks/bench_updates.py
+    python benchmarks/bench_updates.py --listeners 1000 10000 --json updates.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, REPO_ROOT)
+from updates import UpdateBroadcaster
+
+
+async def listen(stream, received: list, ready: asyncio.Event):
+    # Stands in for the connection: the response body is the generator's output
+    async for message in stream:
+        received.append(len(message))
+        if message.startswith(b"event: version"):
+            ready.set()
+        elif message.startswith(b"event: update"):
+            return
+
+
+async def scenario(listeners: int, changed: int) -> dict:
+    broadcaster = UpdateBroadcaster(db_version=1, keepalive=3600, max_subscribers=listeners)
+    received = [[] for _ in range(listeners)]
+    ready = [asyncio.Event() for _ in range(listeners)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(listen(broadcaster.stream(), received[i], ready[i])) for i in range(listeners)]
+    for event in ready:
+        await event.wait()
+    per_listener = (tracemalloc.get_traced_memory()[0] - before) / listeners
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    broadcaster.publish(2, [f"protocol_{n}" for n in range(changed)], [])
+    await asyncio.gather(*tasks)
+    seconds = time.perf_counter() - start
+
+    return {"listeners": listeners, "fanout_ms": round(seconds * 1000, 2),
+            "per_listener_us": round(seconds / listeners * 1e6, 2),
+            "bytes_per_idle_listener": round(per_listener),
+            "delivered": sum(1 for r in received if len(r) == 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listeners", type=int, nargs="*", default=[100, 1000, 5000, 10000])
+    parser.add_argument("--changed", type=int, default=5, help="Protocol IDs in the update event")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"📊 One update event ({args.changed} changed IDs) to idle listeners")
+    print(f"   {'listeners':>9} {'fan-out ms':>11} {'us/listener':>12} {'idle bytes':>11} {'delivered':>10}")
+    for listeners in args.listeners:
+        row = asyncio.run(scenario(listeners, args.changed))
+        results[listeners] = row
+        print(f"   {listeners:>9} {row['fanout_ms']:>11} {row['per_listener_us']:>12} "
+              f"{row['bytes_per_idle_listener']:>11} {row['delivered']:>10}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
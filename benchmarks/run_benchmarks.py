@@ -0,0 +1,318 @@
+"""Benchmark the ingestors, PDF extraction and the API, and save the results as JSON.
+
+Run from the repo root:
+
+    python benchmarks/run_benchmarks.py                  # writes benchmarks/results/<timestamp>.json
+    python benchmarks/run_benchmarks.py --compare a.json b.json
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(REPO_ROOT, "archived-scripts")
+PDF_PARSER_DIR = os.path.join(REPO_ROOT, "pdf-parser")
+MANUAL = os.path.join(REPO_ROOT, "ems-protocol-manual.txt")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+sys.path.insert(0, BENCH_DIR)
+# The ingest and pdf-parser scripts import their siblings (e.g. ingest_profiler, page_artifacts)
+sys.path.insert(1, SCRIPTS_DIR)
+sys.path.insert(2, PDF_PARSER_DIR)
+from synthetic_pdf import paginate, write_text_pdf
+
+
+def load_module(path: str, name: str):
+    """Import a script by path (the script folders aren't packages)"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def instrument(owner, names, timings: dict):
+    """Wrap functions on a module or instance so every call adds to `timings`"""
+    for name in names:
+        fn = getattr(owner, name, None)
+        if fn is None:
+            continue
+
+        def timed(*args, __fn=fn, __name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return __fn(*args, **kwargs)
+            finally:
+                slot = timings.setdefault(__name, {"calls": 0, "seconds": 0.0})
+                slot["calls"] += 1
+                slot["seconds"] += time.perf_counter() - start
+
+        setattr(owner, name, timed)
+
+
+def extractor_names(obj) -> list:
+    return [n for n in dir(obj) if n.startswith(("extract_", "check_", "determine_", "requires_", "find_"))]
+
+
+# --- Ingest ---------------------------------------------------------------
+
+def run_ingest_final(mod, timings):
+    instrument(mod, ["clean_block"], timings)
+    mod.parse_manual_blocks()
+
+
+def run_ingest_unified(mod, timings):
+    ingestor = mod.UnifiedIngestor()
+    instrument(ingestor, ["clean_text", "find_real_index", "process_definitions",
+                          "process_protocol_zone", "process_formulary", "save"], timings)
+    ingestor.parse_file()
+
+
+def run_ingest_advanced(mod, timings):
+    parser = mod.ProtocolParser()
+    instrument(parser, ["parse_protocol", "save_to_file"] + extractor_names(parser), timings)
+    parser.parse_all_protocols()
+    parser.save_to_file()
+
+
+def run_parse_ems_protocols(mod, timings):
+    instrument(mod, ["clean_text", "extract_metadata"] + extractor_names(mod), timings)
+    mod.parse_protocols()
+
+
+INGESTORS = {
+    "ingest_final": run_ingest_final,
+    "ingest_unified": run_ingest_unified,
+    "ingest_advanced": run_ingest_advanced,
+    "parse_ems_protocols": run_parse_ems_protocols,
+}
+
+
+def bench_ingest(workdir: str, repeat: int) -> dict:
+    results = {}
+    for name, run in INGESTORS.items():
+        walls, stages = [], {}
+        for _ in range(repeat):
+            mod = load_module(os.path.join(SCRIPTS_DIR, f"{name}.py"), f"bench_{name}")
+            mod.TEXT_FILE = MANUAL
+            timings = {}
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                run(mod, timings)
+            walls.append(time.perf_counter() - start)
+            stages = timings
+        results[name] = {
+            "wall_s": round(statistics.median(walls), 4),
+            # Stage times are inclusive: parse_protocol also contains its extractors
+            "stages": {k: {"calls": v["calls"], "seconds": round(v["seconds"], 4)}
+                       for k, v in sorted(stages.items(), key=lambda kv: -kv[1]["seconds"])},
+        }
+        print(f"   ⏱️  {name}: {results[name]['wall_s']:.3f}s")
+    return results
+
+
+# --- PDF extraction --------------------------------------------------------
+
+def double_letters(text: str) -> str:
+    # pdfplumber returns "CCaarrddiiaacc" for the manual's shadowed headings
+    return "".join(ch * 2 if ch.isalpha() else ch for ch in text)
+
+
+def bench_clean_duplicated_text(pages: int) -> dict:
+    extractor = load_module(os.path.join(PDF_PARSER_DIR, "extract_text_pdfplumber.py"), "bench_extract")
+    with open(MANUAL, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    page_texts = [double_letters("\n".join(lines)) for lines in paginate(text, pages)]
+
+    start = time.perf_counter()
+    for page in page_texts:
+        extractor.clean_duplicated_text(page)
+    elapsed = time.perf_counter() - start
+    return {"pages": pages, "seconds": round(elapsed, 4), "pages_per_sec": round(pages / elapsed, 1)}
+
+
+def bench_pdf_extract(workdir: str, pages: int) -> dict:
+    try:
+        import pdfplumber
+    except ImportError:
+        return {"skipped": "pdfplumber not installed"}
+
+    with open(MANUAL, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    pdf_path = os.path.join(workdir, "synthetic.pdf")
+    write_text_pdf(pdf_path, paginate(text, pages))
+
+    start = time.perf_counter()
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            page.extract_text()
+    elapsed = time.perf_counter() - start
+    return {"pages": pages, "seconds": round(elapsed, 4), "pages_per_sec": round(pages / elapsed, 1)}
+
+
+# --- API --------------------------------------------------------------------
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def drive(client, method: str, path: str, body, requests: int, concurrency: int) -> dict:
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "req_per_s": round(requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def bench_api(workdir: str, requests: int, concurrency: int) -> dict:
+    try:
+        import httpx
+    except ImportError:
+        return {"skipped": "httpx not installed"}
+
+    # main.py loads ems_protocols.json from the working directory at import
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        main = load_module(os.path.join(REPO_ROOT, "main.py"), "bench_main")
+    protocol_id = next(iter(main.PROTOCOL_DB), "")
+    # Every request comes from one client: this measures throughput, not the rate limiter
+    main.CLIENT_LIMITER.rate = main.CLIENT_LIMITER.burst = 10 ** 9
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return {
+                "/protocols": await drive(client, "GET", "/protocols", None, requests, concurrency),
+                "/generate-segment": await drive(client, "POST", "/generate-segment",
+                                                 {"protocol_id": protocol_id, "mode": "study"},
+                                                 requests, concurrency),
+            }
+
+    results = asyncio.run(run())
+    for route, row in results.items():
+        print(f"   🌐 {route}: {row['req_per_s']} req/s, p50 {row['p50_ms']}ms, p99 {row['p99_ms']}ms")
+    return results
+
+
+# --- Reporting ----------------------------------------------------------------
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def flatten(data, prefix="") -> dict:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as f:
+        old = flatten({k: v for k, v in json.load(f).items() if k != "meta"})
+    with open(new_path) as f:
+        new = flatten({k: v for k, v in json.load(f).items() if k != "meta"})
+
+    print(f"{'metric':<70} {'old':>12} {'new':>12} {'change':>9}")
+    for key in sorted(old.keys() & new.keys()):
+        if key.endswith((".calls", ".requests", ".concurrency", ".pages")):
+            continue
+        before, after = old[key], new[key]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "-"
+        print(f"{key:<70} {before:>12} {after:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Ingest runs per ingestor (median is kept)")
+    parser.add_argument("--pages", type=int, default=40, help="Pages in the synthetic PDF")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--output", help="Where to write the results JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="ems-bench-")
+    os.chdir(workdir)
+    try:
+        print("📊 Ingest")
+        ingest = bench_ingest(workdir, args.repeat)
+        print("📊 PDF extraction")
+        cleaning = bench_clean_duplicated_text(args.pages * 10)
+        print(f"   🧹 clean_duplicated_text: {cleaning['pages_per_sec']} pages/s")
+        pdf = bench_pdf_extract(workdir, args.pages)
+        print(f"   📄 pdfplumber: {pdf.get('pages_per_sec', pdf.get('skipped'))}")
+        print("📊 API")
+        api = bench_api(workdir, args.requests, args.concurrency)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "ingest": ingest,
+        "clean_duplicated_text": cleaning,
+        "pdf_extract": pdf,
+        "api": api,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Saved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Write small text-only PDFs for benchmarks, without any PDF library."""
+from typing import List
+
+LINES_PER_PAGE = 60
+FONT_SIZE = 9
+LEADING = 11
+
+
+def escape_pdf_text(line: str) -> str:
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def paginate(text: str, pages: int, line_width: int = 110) -> List[List[str]]:
+    """Cut text into `pages` pages of wrapped lines, cycling the text if it runs out"""
+    lines = []
+    for raw in text.splitlines():
+        raw = raw.replace("\t", " ")
+        while len(raw) > line_width:
+            lines.append(raw[:line_width])
+            raw = raw[line_width:]
+        lines.append(raw)
+    lines = [line for line in lines if line.strip()] or ["(empty)"]
+
+    out = []
+    cursor = 0
+    for _ in range(pages):
+        page = []
+        for _ in range(LINES_PER_PAGE):
+            page.append(lines[cursor % len(lines)])
+            cursor += 1
+        out.append(page)
+    return out
+
+
+def write_text_pdf(path: str, pages: List[List[str]]):
+    """Write one Helvetica text page per entry in `pages`"""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for lines in pages:
+        ops = [f"BT /F1 {FONT_SIZE} Tf {LEADING} TL 40 760 Td"]
+        for line in lines:
+            ops.append(f"({escape_pdf_text(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref_at)
+
+    with open(path, "wb") as f:
+        f.write(out)
@@ -0,0 +1,81 @@
+import gzip
+from typing import Dict
+
+# Optional encoders: served only when the library is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Server preference when the client rates several encodings equally
+PREFERENCE = ["zstd", "br", "gzip", "identity"]
+
+# Payloads this small cost more in headers than they save
+MIN_COMPRESS_BYTES = 256
+
+# Levels per encoder: the smallest output for payloads built ahead of time, and cheap
+# ones for anything that has to be compressed while a request waits
+BEST_LEVELS = {"gzip": 9, "br": 11, "zstd": 19}
+FAST_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+
+def available_encoders(fast: bool = False) -> Dict[str, callable]:
+    levels = FAST_LEVELS if fast else BEST_LEVELS
+    encoders = {"gzip": lambda data: gzip.compress(data, compresslevel=levels["gzip"], mtime=0)}
+    if brotli is not None:
+        encoders["br"] = lambda data: brotli.compress(data, quality=levels["br"])
+    if zstandard is not None:
+        encoders["zstd"] = zstandard.ZstdCompressor(level=levels["zstd"]).compress
+    return encoders
+
+
+def build_variants(payload: bytes, fast: bool = False) -> Dict[str, bytes]:
+    """Compress a payload once with every available encoder"""
+    variants = {"identity": payload}
+    if len(payload) < MIN_COMPRESS_BYTES:
+        return variants
+
+    for name, encode in available_encoders(fast).items():
+        compressed = encode(payload)
+        # Keep a variant only if it actually saves bytes
+        if len(compressed) < len(payload):
+            variants[name] = compressed
+    return variants
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+    return weights
+
+
+def choose_encoding(accept_encoding: str, variants: Dict[str, bytes]) -> str:
+    """Pick the best variant the client accepts, falling back to identity"""
+    weights = parse_accept_encoding(accept_encoding or "")
+    wildcard = weights.get("*", 0.0)
+
+    best, best_q = "identity", 0.0
+    for name in PREFERENCE:
+        if name not in variants or name == "identity":
+            continue
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
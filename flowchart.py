@@ -0,0 +1,152 @@
+import re
+from typing import List, Optional
+
+# Compiled flowcharts are stored per protocol as parallel arrays, indexed by node number:
+#   text:  node text
+#   kind:  one char per node, "Q" question or "A" action
+#   level: one char per node, "E"/"A"/"P" provider level marker or "-"
+#   yes:   next node on Yes (for actions, simply the next node), -1 when the flow ends
+#   no:    next node on No, -1 for actions
+# Edges only ever point forward, so a walk always terminates.
+
+STOP_SECTIONS = ("Pearls",)
+SECTION_HEADERS = {"History", "Signs and Symptoms", "Differential", "Disposition", "QI Metrics"}
+BRANCH_LABELS = {"YES", "NO"}
+BULLET = re.compile(r'^[\*\-•]\s*')
+LEVEL_MARK = re.compile(r'^([EAP])(?=[A-Z][a-z])')
+MAX_ACTION_CHARS = 240
+
+
+def flowchart_steps(text: str) -> List[tuple]:
+    """Turn flowchart text into ordered (kind, level, text) steps"""
+    steps = []
+    buffer = []
+    level = "-"
+
+    def flush():
+        nonlocal level
+        if buffer:
+            steps.append(("A", level, " ".join(buffer)))
+            buffer.clear()
+        level = "-"
+
+    for raw in text.splitlines():
+        # Yes/No arrow labels get pulled into the text as their own tab-separated cells
+        cells = [c.strip() for c in raw.split("\t")]
+        line = " ".join(c for c in cells if c and c.upper() not in BRANCH_LABELS)
+        if not line:
+            continue
+        if line.startswith(STOP_SECTIONS):
+            break
+        if line in SECTION_HEADERS or BULLET.match(line):
+            flush()
+            continue
+
+        # A lone E/A/P, or one glued to the step text, marks who may perform the next step
+        if line in ("E", "A", "P"):
+            flush()
+            level = line
+            continue
+        mark = LEVEL_MARK.match(line)
+        if mark:
+            flush()
+            level = mark.group(1)
+            line = line[1:]
+
+        if line.endswith("?"):
+            # Short dangling fragments are the start of the question wrapped over several lines
+            if buffer and buffer[-1].endswith((".", ")")):
+                flush()
+            steps.append(("Q", level, " ".join(buffer + [line])))
+            buffer.clear()
+            level = "-"
+        else:
+            buffer.append(line)
+            if sum(len(b) for b in buffer) > MAX_ACTION_CHARS:
+                flush()
+    flush()
+    return steps
+
+
+def compile_flowchart(text: str) -> Optional[dict]:
+    """Compile protocol text into the adjacency arrays above, or None if it has no decisions"""
+    steps = flowchart_steps(text)
+    if not any(kind == "Q" for kind, _, _ in steps):
+        return None
+
+    count = len(steps)
+    yes, no = [], []
+    for i, (kind, _, _) in enumerate(steps):
+        nxt = i + 1 if i + 1 < count else -1
+        yes.append(nxt)
+        if kind == "A":
+            no.append(-1)
+            continue
+        # The Yes branch is written out first; No skips past it to the next decision
+        skip = next((k for k in range(i + 2, count) if steps[k][0] == "Q"), -1)
+        no.append(skip)
+
+    return {
+        "text": [t for _, _, t in steps],
+        "kind": "".join(k for k, _, _ in steps),
+        "level": "".join(lv for _, lv, _ in steps),
+        "yes": yes,
+        "no": no,
+    }
+
+
+def flow_node(flow: dict, node: int) -> dict:
+    """Describe one node and where each answer leads; O(1) per hop"""
+    kind = flow["kind"][node]
+    level = flow["level"][node]
+
+    def target(index):
+        return None if index < 0 else {"node": index, "text": flow["text"][index]}
+
+    described = {
+        "node": node,
+        "kind": "question" if kind == "Q" else "action",
+        "level": None if level == "-" else level,
+        "text": flow["text"][node],
+    }
+    if kind == "Q":
+        described["yes"] = target(flow["yes"][node])
+        described["no"] = target(flow["no"][node])
+    else:
+        described["next"] = target(flow["yes"][node])
+    return described
+
+
+def walk(flow: dict, answers: List[str], start: int = 0) -> List[int]:
+    """Follow answers from `start`; actions advance on their own, each question consumes one answer"""
+    path = []
+    node = start
+    pending = [a.strip().lower() for a in answers]
+    while 0 <= node < len(flow["kind"]):
+        path.append(node)
+        if flow["kind"][node] == "A":
+            node = flow["yes"][node]
+            continue
+        if not pending:
+            break
+        answer = pending.pop(0)
+        node = flow["yes"][node] if answer in ("yes", "y", "true") else flow["no"][node]
+    return path
+
+
+def narrate(flow: dict, answers: List[str]) -> str:
+    """Radio script for just the branch the listener picked"""
+    lines = []
+    answer_iter = iter(a.strip().lower() for a in answers)
+    for node in walk(flow, answers):
+        text = flow["text"][node]
+        if flow["kind"][node] == "Q":
+            answer = next(answer_iter, None)
+            if answer is None:
+                lines.append(f"Decision point: {text}")
+            else:
+                said = "Yes" if answer in ("yes", "y", "true") else "No"
+                lines.append(f"{text} {said}.")
+        else:
+            lines.append(text if text.endswith(".") else f"{text}.")
+    return " ".join(lines)
@@ -0,0 +1,340 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from protocol_db import DB_FILE
+
+# Manual re-ingests started from the API. The parse runs in a separate process so the
+# event loop keeps serving requests; the worker reports progress over a queue that the
+# server drains into each job's event log, and SSE clients follow that log.
+# Jobs and their logs live in a SQLite file under JOBS_DIR, so with several API workers
+# any of them can report on a job, and only one ingest runs across all of them.
+
+JOBS_DIR = os.environ.get("EMS_INGEST_DIR", "ingest_jobs")
+PDF_BACKEND = os.environ.get("EMS_PDF_BACKEND", "pdfplumber")
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+POLL_SECONDS = 0.1
+KEEP_JOBS = 20            # finished jobs kept for status lookups
+FOLLOW_SECONDS = 0.5      # how often an events stream checks the log for new entries
+HEARTBEAT_SECONDS = 2.0
+# A job whose API worker hasn't checked in for this long died with it (restart, OOM)
+STALE_SECONDS = 30.0
+ACTIVE = ("queued", "running", "publishing")
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Set in each pool process by the initializer
+PROGRESS_QUEUE = None
+
+
+class IngestError(Exception):
+    """The manual was read but produced nothing that could be published"""
+
+
+class JobBusy(Exception):
+    """Another ingest is still running"""
+
+
+def set_progress_queue(progress_queue):
+    global PROGRESS_QUEUE
+    PROGRESS_QUEUE = progress_queue
+
+
+def report(job_id: str, stage: str, details: dict):
+    if PROGRESS_QUEUE is not None:
+        PROGRESS_QUEUE.put((job_id, stage, details))
+
+
+def extract_pdf_text(job_id: str, pdf_path: str, text_path: str, backend: str) -> int:
+    """Write the PDF's text page by page, reporting each page"""
+    from pdf_backends import get_backend
+
+    pages = 0
+    with open(text_path, "w", encoding="utf-8") as out:
+        for page_num, text in get_backend(backend).page_texts(pdf_path):
+            out.write(text + "\n")
+            pages += 1
+            report(job_id, "extract", {"pages": pages, "page": page_num})
+    return pages
+
+
+def run_ingest(job_id: str, upload_path: str, kind: str, workdir: str,
+               live_db: str = DB_FILE, backend: str = PDF_BACKEND) -> dict:
+    """Runs in a pool process: manual -> text -> zones -> protocols -> DB file in `workdir`"""
+    for sub in ("archived-scripts", "pdf-parser"):
+        path = os.path.join(REPO_ROOT, sub)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    from ingest_unified import UnifiedIngestor
+
+    text_path = upload_path
+    if kind == "pdf":
+        text_path = os.path.join(workdir, "manual.txt")
+        pages = extract_pdf_text(job_id, upload_path, text_path, backend)
+        if not pages:
+            raise IngestError("The PDF has no pages")
+
+    # Start from a copy of the live file so versions continue from what clients have synced
+    output_file = os.path.join(workdir, os.path.basename(live_db))
+    snapshot_file = os.path.splitext(output_file)[0] + ".snapshot"
+    store_file = os.path.splitext(output_file)[0] + ".db"
+    if os.path.exists(live_db):
+        shutil.copyfile(live_db, output_file)
+
+    ingestor = UnifiedIngestor(text_file=text_path, output_file=output_file,
+                               progress=lambda stage, details: report(job_id, stage, details))
+    ingestor.parse_file()
+    # The snapshot is only written by a successful save, never copied
+    if not ingestor.database or not os.path.exists(snapshot_file):
+        raise IngestError("No protocols found in the manual")
+    return {"output_file": output_file, "snapshot_file": snapshot_file, "store_file": store_file,
+            "protocols": len(ingestor.database)}
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    finished REAL,
+    error TEXT,
+    result TEXT,
+    heartbeat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class JobStore:
+    """Ingest jobs and their event logs, shared by every API worker on the host"""
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def expire(self, now: float):
+        """Fail active jobs whose worker stopped checking in"""
+        placeholders = ",".join("?" * len(ACTIVE))
+        self.conn.execute(f"UPDATE jobs SET status = 'failed', finished = ?, error = 'API worker stopped' "
+                          f"WHERE status IN ({placeholders}) AND heartbeat < ?", (now, *ACTIVE, now - STALE_SECONDS))
+
+    def claim(self, job_id: str, kind: str, size: int) -> bool:
+        """Add a queued job unless another one is still active"""
+        now = self.clock()
+        with self.lock:
+            # IMMEDIATE: two workers taking uploads at once must not both start an ingest
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.expire(now)
+                placeholders = ",".join("?" * len(ACTIVE))
+                busy = self.conn.execute(f"SELECT 1 FROM jobs WHERE status IN ({placeholders})", ACTIVE).fetchone()
+                if not busy:
+                    self.conn.execute("INSERT INTO jobs (id, kind, bytes, status, created, heartbeat) "
+                                      "VALUES (?, ?, ?, 'queued', ?, ?)", (job_id, kind, size, now, now))
+                    self.forget()
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return not busy
+
+    def forget(self):
+        """Drop finished jobs beyond the newest KEEP_JOBS, with their logs"""
+        placeholders = ",".join("?" * len(ACTIVE))
+        old = [row[0] for row in self.conn.execute(
+            f"SELECT id FROM jobs WHERE status NOT IN ({placeholders}) ORDER BY created DESC LIMIT -1 OFFSET ?",
+            (*ACTIVE, KEEP_JOBS))]
+        self.conn.executemany("DELETE FROM events WHERE job_id = ?", [(job_id,) for job_id in old])
+        self.conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in old])
+
+    def add_event(self, job_id: str, stage: str, details: dict, status: Optional[str] = None, **fields):
+        """Append to the job's log; with `status`, move the job on in the same transaction"""
+        now = self.clock()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self.conn.execute("SELECT COUNT(*) FROM events WHERE job_id = ?", (job_id,)).fetchone()[0]
+                event = {"seq": seq, "stage": stage, "time": round(now, 3), **details}
+                self.conn.execute("INSERT INTO events VALUES (?, ?, ?)", (job_id, seq, json.dumps(event)))
+                if status is not None:
+                    if "result" in fields:
+                        fields["result"] = json.dumps(fields["result"])
+                    columns = {"status": status, "heartbeat": now, **fields}
+                    assignments = ", ".join(f"{name} = ?" for name in columns)
+                    self.conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self, job_id: str):
+        with self.lock:
+            self.conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (self.clock(), job_id))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            self.expire(self.clock())
+            row = self.conn.execute("SELECT j.id, j.kind, j.bytes, j.status, j.created, j.finished, j.error, "
+                                    "j.result, (SELECT COUNT(*) FROM events e WHERE e.job_id = j.id) "
+                                    "FROM jobs j WHERE j.id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "kind": row[1], "bytes": row[2], "status": row[3], "created": row[4],
+                "finished": row[5], "error": row[6], "result": json.loads(row[7]) if row[7] else None,
+                "events": row[8]}
+
+    def events(self, job_id: str, after: int) -> Tuple[Optional[dict], List[dict]]:
+        """The job, then its events from seq `after` on. Read in that order, a finished
+        job's events are complete: the last one is written with the final status."""
+        job = self.get(job_id)
+        with self.lock:
+            rows = self.conn.execute("SELECT body FROM events WHERE job_id = ? AND seq >= ? ORDER BY seq",
+                                     (job_id, after)).fetchall()
+        return job, [json.loads(row[0]) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        # At most KEEP_JOBS finished rows plus one active
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class IngestRunner:
+    """One ingest at a time (per host, through the job store) in a single-process pool;
+    `publish` swaps the result in"""
+
+    def __init__(self, publish: Callable[[dict], Awaitable[dict]], jobs_dir: str = JOBS_DIR,
+                 live_db: str = DB_FILE, store: Optional[JobStore] = None):
+        self.publish = publish
+        self.jobs_dir = jobs_dir
+        self.live_db = os.path.abspath(live_db)
+        self.store = store or JobStore(os.path.join(jobs_dir, "jobs.db"))
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.queue = None
+        self.beat = 0.0
+        # The loop only keeps weak references to tasks
+        self.tasks = set()
+
+    def start_pool(self):
+        # Spawned, not forked: a fork would copy the server's event loop and open sockets
+        context = multiprocessing.get_context("spawn")
+        self.queue = context.Queue()
+        self.pool = ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                        initializer=set_progress_queue, initargs=(self.queue,))
+
+    async def in_thread(self, fn, *args, **kwargs):
+        # The job store is SQLite: its calls stay off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: fn(*args, **kwargs))
+
+    async def submit(self, body: bytes, kind: str) -> dict:
+        job_id = uuid.uuid4().hex[:12]
+        if not await self.in_thread(self.store.claim, job_id, kind, len(body)):
+            raise JobBusy()
+        if self.pool is None:
+            self.start_pool()
+
+        workdir = os.path.abspath(os.path.join(self.jobs_dir, job_id))
+        upload_path = os.path.join(workdir, "manual.pdf" if kind == "pdf" else "upload.txt")
+        await self.in_thread(write_upload, upload_path, body)
+        await self.in_thread(self.store.add_event, job_id, "queued", {"bytes": len(body)})
+        task = asyncio.get_running_loop().create_task(self.watch(job_id, kind, upload_path, workdir))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return await self.in_thread(self.store.get, job_id)
+
+    async def watch(self, job_id: str, kind: str, upload_path: str, workdir: str):
+        loop = asyncio.get_running_loop()
+        try:
+            await self.in_thread(self.store.add_event, job_id, "running", {}, status="running")
+            future = loop.run_in_executor(self.pool, run_ingest, job_id, upload_path, kind, workdir,
+                                          self.live_db)
+            while not future.done():
+                await self.in_thread(self.drain, job_id)
+                await asyncio.sleep(POLL_SECONDS)
+            await self.in_thread(self.drain, job_id)
+
+            output = future.result()
+            await self.in_thread(self.store.add_event, job_id, "publishing", {"protocols": output["protocols"]},
+                                 status="publishing")
+            result = {"protocols": output["protocols"], **await self.publish(output)}
+            await self.in_thread(self.store.add_event, job_id, "done", result, status="done",
+                                 finished=time.time(), result=result)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # The pool process died (crashed, OOM-killed): the next job starts a fresh one
+                self.pool.shutdown(wait=False)
+                self.pool = None
+            error = str(e) or type(e).__name__
+            await self.in_thread(self.store.add_event, job_id, "failed", {"error": error}, status="failed",
+                                 finished=time.time(), error=error)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def drain(self, job_id: str):
+        """Move worker progress from the queue into the job's event log"""
+        while True:
+            try:
+                queued_id, stage, details = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if queued_id == job_id:
+                self.store.add_event(job_id, stage, details)
+        now = time.time()
+        if now - self.beat >= HEARTBEAT_SECONDS:
+            self.store.heartbeat(job_id)
+            self.beat = now
+
+    async def follow(self, job_id: str):
+        """Every event so far, then each new one as it is logged, until the job is finished.
+        Works from any API worker, not just the one running the job."""
+        sent = 0
+        while True:
+            job, events = await self.in_thread(self.store.events, job_id, sent)
+            for event in events:
+                yield event
+                sent = event["seq"] + 1
+            if job is None or job["status"] not in ACTIVE:
+                return
+            await asyncio.sleep(FOLLOW_SECONDS)
+
+    def stats(self) -> Dict[tuple, int]:
+        counts = {"queued": 0, "running": 0, "publishing": 0, "done": 0, "failed": 0}
+        counts.update(self.store.counts())
+        return {(("status", status),): n for status, n in counts.items()}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.store.close()
+
+
+def write_upload(path: str, body: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
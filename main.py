@@ -1,9 +1,47 @@
+import asyncio
+import hmac
 import json
-from fastapi import FastAPI, HTTPException
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import Body, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from admission import (CLIENT_BURST, AdmissionMiddleware, ClientLimiter, RenderGate, Saturated, client_key,
+                       retry_after_header)
+from compression import build_variants, choose_encoding
+from flowchart import flow_node, narrate, walk
+from ingest_jobs import MAX_UPLOAD_BYTES, IngestRunner, JobBusy
+from manual_versions import open_version_store
+from metrics import Metrics, MetricsMiddleware
+from protocol_db import (DB_FILE, JSONL_FILE, SNAPSHOT_FILE, build_sync_info, changes_since, intern_protocols,
+                         load_db_data, manifest_changes, mtime)
+from protocol_store import STORE_FILE, open_store
+from render_cache import open_render_cache
+from spoken_text import build_expander
+from station import Station, build_rotation, build_stations
+from updates import UpdateBroadcaster
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Publishes from other workers reach this one through the DB files
+    watcher = asyncio.create_task(watch_db_files())
+    yield
+    watcher.cancel()
+    INGEST_RUNNER.close()
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+# Per-client token buckets on the render routes; added before CORS so a 429 still carries CORS headers
+CLIENT_LIMITER = ClientLimiter()
+app.add_middleware(AdmissionMiddleware, limiter=CLIENT_LIMITER, paths=["/generate-segment", "/generate-segments"])
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,59 +51,612 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+METRICS = Metrics()
+app.add_middleware(MetricsMiddleware, metrics=METRICS)
+
 def load_db():
-    try:
-        with open("ems_protocols.json", "r") as f:
-            data = json.load(f)
-            # Support both old flat format and new nested format
-            return data.get("protocols", data) 
-    except FileNotFoundError:
+    data = load_db_data()
+    if data is None:
         print("⚠️ DB not found.")
-        return {}
+        return {}, build_sync_info({}), {}
+    # Support both old flat format and new nested format
+    sync = build_sync_info(data)
+    metadata = data.get("metadata", {}) if "protocols" in data else {}
+    return intern_protocols(data.get("protocols", data)), sync, metadata
+
+def text_bytes(db) -> int:
+    return sum(len(item.get("raw_text", "").encode("utf-8")) for item in db.values())
 
-PROTOCOL_DB = load_db()
+load_started = time.perf_counter()
+PROTOCOL_DB, DB_SYNC, DB_METADATA = load_db()
+DB_LOAD_SECONDS = time.perf_counter() - load_started
+DB_TEXT_BYTES = text_bytes(PROTOCOL_DB)
 
 class RadioRequest(BaseModel):
     protocol_id: str
     mode: str
+    # Yes/No answers through the protocol's flowchart: narrate only that path
+    answers: Optional[List[str]] = None
 
-@app.get("/protocols")
-async def get_all_protocols():
-    return [
+class StationRequest(BaseModel):
+    name: str
+    mode: str = "review"
+    category: Optional[str] = None
+    provider_level: Optional[str] = None
+    protocol_ids: Optional[List[str]] = None
+    lookahead: int = Field(5, ge=1, le=20)
+
+def to_json_bytes(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def build_catalog_variants(db):
+    # Protocol texts don't change between reloads, so each payload is compressed once
+    catalog = [
         {
-            "id": key, 
+            "id": key,
             "title": val["title"],
             "category": val.get("category", "Uncategorized")
-        } 
-        for key, val in PROTOCOL_DB.items()
+        }
+        for key, val in db.items()
     ]
+    return build_variants(to_json_bytes(catalog))
 
-@app.post("/generate-segment")
-async def generate_radio_segment(request: RadioRequest):
-    item = PROTOCOL_DB.get(request.protocol_id)
-    
+CATALOG_VARIANTS = build_catalog_variants(PROTOCOL_DB)
+
+def fill_protocol_variants(db, variants: dict) -> dict:
+    """Best-level variants of every protocol payload, added to `variants` one by one"""
+    for pid, item in db.items():
+        variants[pid] = build_variants(to_json_bytes({"id": pid, **item}))
+    return variants
+
+# Max-level compression of the whole DB takes seconds, so at startup it runs on a
+# background thread instead of delaying the first request; publish_db builds the next
+# set on the thread pool before swapping it in
+PROTOCOL_VARIANTS = {}
+threading.Thread(target=fill_protocol_variants, args=(PROTOCOL_DB, PROTOCOL_VARIANTS), daemon=True).start()
+
+def protocol_variants(protocol_id: str):
+    variants = PROTOCOL_VARIANTS.get(protocol_id)
+    if variants is None and protocol_id in PROTOCOL_DB:
+        # Not reached by the startup pass yet: fast levels now, the pass replaces them
+        fast = build_variants(to_json_bytes({"id": protocol_id, **PROTOCOL_DB[protocol_id]}), fast=True)
+        variants = PROTOCOL_VARIANTS.setdefault(protocol_id, fast)
+    return variants
+
+def precompressed_response(request: Request, variants: dict, headers: Optional[dict] = None) -> Response:
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), variants)
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(variants[encoding], media_type="application/json", headers=headers)
+
+@app.get("/protocols")
+async def get_all_protocols(request: Request):
+    return precompressed_response(request, CATALOG_VARIANTS)
+
+def db_mtime() -> float:
+    """When the newest of the files load_db reads from was written"""
+    return max(mtime(DB_FILE), mtime(SNAPSHOT_FILE), mtime(JSONL_FILE))
+
+# Structured search over the loaded DB; save_db writes it next to the DB file, and a
+# missing or older store (a DB from before it existed) is rebuilt from what was loaded
+PROTOCOL_STORE = open_store(STORE_FILE, PROTOCOL_DB, db_mtime())
+
+# Plain def: sqlite calls block, so FastAPI runs this on its thread pool
+@app.get("/protocols/search")
+def search_protocols(level: Optional[str] = None, medication: Optional[str] = None,
+                     category: Optional[str] = None, telemetry: Optional[bool] = None,
+                     flowchart: Optional[bool] = None, limit: int = 100):
+    if PROTOCOL_STORE is None:
+        raise HTTPException(status_code=503, detail="SQLite store not built")
+    return PROTOCOL_STORE.search(level=level, medication=medication, category=category,
+                                 telemetry=telemetry, flowchart=flowchart, limit=min(limit, 500))
+
+@app.get("/protocols/{protocol_id}")
+async def get_protocol(protocol_id: str, request: Request):
+    variants = protocol_variants(protocol_id)
+    if not variants:
+        raise HTTPException(status_code=404, detail="Protocol not found")
+    return precompressed_response(request, variants)
+
+def get_flow(protocol_id: str) -> dict:
+    item = PROTOCOL_DB.get(protocol_id)
     if not item:
-        if not PROTOCOL_DB: raise HTTPException(status_code=404, detail="DB Empty")
-        item = PROTOCOL_DB[next(iter(PROTOCOL_DB))]
+        raise HTTPException(status_code=404, detail="Protocol not found")
+    if not item.get("flow"):
+        raise HTTPException(status_code=404, detail="Protocol has no flowchart")
+    return item["flow"]
+
+# Step-by-step walk: the client sends back the node it was pointed to
+@app.get("/protocols/{protocol_id}/flow")
+async def get_protocol_flow(protocol_id: str, node: int = 0):
+    flow = get_flow(protocol_id)
+    if not 0 <= node < len(flow["kind"]):
+        raise HTTPException(status_code=404, detail="Node not found")
+    return {"protocol_id": protocol_id, "nodes": len(flow["kind"]), **flow_node(flow, node)}
 
+@app.get("/protocols/{protocol_id}/flow/path")
+async def get_protocol_flow_path(protocol_id: str, answers: str = ""):
+    flow = get_flow(protocol_id)
+    chosen = [a for a in answers.split(",") if a.strip()]
+    return {"protocol_id": protocol_id, "answers": chosen,
+            "path": [flow_node(flow, node) for node in walk(flow, chosen)]}
+
+# Tablets on the same version all ask for the same delta, so each is built and compressed
+# once: {(db_version, since): variants}, oldest first. Emptied when a new DB is swapped in.
+SYNC_BUNDLES = {}
+MAX_SYNC_BUNDLES = 64
+
+def build_sync_variants(db, sync: dict, since: int) -> dict:
+    changes = changes_since(db, sync, since)
+    return build_variants(json.dumps(changes, separators=(",", ":")).encode("utf-8"))
+
+@app.get("/sync")
+async def sync_protocols(request: Request, since: int = 0):
+    db, sync, since = PROTOCOL_DB, DB_SYNC, max(0, since)
+    key = (sync["db_version"], since)
+    variants = SYNC_BUNDLES.get(key)
+    if variants is None:
+        # A full bundle is the whole DB at the best levels: too slow for the loop
+        variants = await run_in_threadpool(build_sync_variants, db, sync, since)
+        if sync is DB_SYNC:
+            SYNC_BUNDLES[key] = variants
+            while len(SYNC_BUNDLES) > MAX_SYNC_BUNDLES:
+                del SYNC_BUNDLES[next(iter(SYNC_BUNDLES))]
+    return precompressed_response(request, variants, {"X-DB-Version": str(sync["db_version"])})
+
+# For DBs ingested before spoken_text was precomputed, and for /whats-new's diff lines
+SPEECH_EXPANDER = build_expander(PROTOCOL_DB)
+
+@lru_cache(maxsize=512)
+def script_body(protocol_id: str) -> str:
     # Format the text for better reading
-    raw_text = item.get("raw_text", "")
-    
+    item = PROTOCOL_DB[protocol_id]
+    text = item.get("spoken_text")
+    if text is None:
+        text = SPEECH_EXPANDER.expand(item.get("raw_text", ""))
+
     # Simple cleanup for the radio script
     # Remove excessive newlines
-    script_body = raw_text.replace("\n", " ").replace("  ", " ")
-    
+    return text.replace("\n", " ").replace("  ", " ")
+
+def build_segment(protocol_id: str, mode: str) -> dict:
+    item = PROTOCOL_DB[protocol_id]
+
     # Custom Intro
     if item.get("category") == "Formulary":
         intro = f"Formulary Drug: {item['title']}."
     else:
-        intro = f"You are listening to the {request.mode.upper()} breakdown of {item['title']}."
+        intro = f"You are listening to the {mode.upper()} breakdown of {item['title']}."
 
-    full_script = f"{intro}\n\n{script_body}"
+    full_script = f"{intro}\n\n{script_body(protocol_id)}"
 
     return {
         "title": item["title"],
-        "mode": request.mode,
-        "audio_url": "", 
+        "mode": mode,
+        "audio_url": "",
         "script_text": full_script
-    }
\ No newline at end of file
+    }
+
+def build_path_segment(protocol_id: str, mode: str, answers: List[str]) -> dict:
+    item = PROTOCOL_DB[protocol_id]
+    if not item.get("flow"):
+        return build_segment(protocol_id, mode)
+
+    intro = f"You are listening to the {mode.upper()} walkthrough of {item['title']}."
+    return {
+        "title": item["title"],
+        "mode": mode,
+        "audio_url": "",
+        "answers": answers,
+        "script_text": f"{intro}\n\n{narrate(item['flow'], answers)}"
+    }
+
+# Shared by every worker on the host, so a popular segment is rendered once per host
+RENDER_CACHE = open_render_cache()
+
+def render_key(protocol_id: str, mode: str, answers: Optional[List[str]]) -> str:
+    # The content hash changes with the protocol, so a re-ingest never serves stale renders
+    digest = DB_SYNC["manifest"].get(protocol_id, {}).get("hash", "")
+    path = ",".join(answers) if answers is not None else "-"
+    return f"{protocol_id}:{digest}:{mode}:{path}"
+
+def render_plan(protocol_id: str, req: RadioRequest):
+    """Cache key and render function for one request"""
+    if req.answers is not None:
+        return (render_key(protocol_id, req.mode, req.answers),
+                lambda: build_path_segment(protocol_id, req.mode, req.answers))
+    return render_key(protocol_id, req.mode, None), lambda: build_segment(protocol_id, req.mode)
+
+# A cap on renders in flight, with a short queue in front of it
+RENDER_GATE = RenderGate()
+
+@app.exception_handler(Saturated)
+async def saturated_handler(request: Request, exc: Saturated):
+    return JSONResponse({"detail": "Server busy", "reason": exc.reason}, status_code=503,
+                        headers=retry_after_header(exc.retry_after))
+
+def admit(request: Request, cost: int):
+    # AdmissionMiddleware already took the first of the request's `cost` tokens
+    wait = CLIENT_LIMITER.check(client_key(request.headers, request.client), cost - 1, paid=1)
+    if wait:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=retry_after_header(wait))
+
+async def cached_render(key: str, render) -> dict:
+    # The memory tier is checked here on the loop; the shared tier is SQLite, so both its
+    # read and its write run on the thread pool
+    segment = RENDER_CACHE.lookup(key, shared=False)
+    if segment is None:
+        segment = await run_in_threadpool(RENDER_CACHE.lookup_shared, key)
+        if segment is not None:
+            RENDER_CACHE.promote(key, segment)
+    if segment is None:
+        # Only misses do real work, so only misses wait for a render slot
+        async with RENDER_GATE.slot():
+            segment = await run_in_threadpool(render)
+        RENDER_CACHE.store(key, segment, shared=False)
+        await run_in_threadpool(RENDER_CACHE.share, key, segment)
+    return segment
+
+async def render_request(protocol_id: str, req: RadioRequest) -> dict:
+    return await cached_render(*render_plan(protocol_id, req))
+
+@app.post("/generate-segment")
+async def generate_radio_segment(request: RadioRequest):
+    protocol_id = request.protocol_id
+
+    if protocol_id not in PROTOCOL_DB:
+        if not PROTOCOL_DB: raise HTTPException(status_code=404, detail="DB Empty")
+        protocol_id = next(iter(PROTOCOL_DB))
+
+    return await render_request(protocol_id, request)
+
+async def resolve_batch(requests: List[RadioRequest], partial: bool = False):
+    # Each (protocol, mode, path) is rendered once, even if a playlist repeats it
+    rendered = {}
+    for index, req in enumerate(requests):
+        key = (req.protocol_id, req.mode, tuple(req.answers) if req.answers is not None else None)
+        if key not in rendered:
+            if req.protocol_id not in PROTOCOL_DB:
+                rendered[key] = {"error": "Protocol not found"}
+            elif partial:
+                # Mid-stream there's no status code left to send: report the busy item inline
+                try:
+                    rendered[key] = await render_request(req.protocol_id, req)
+                except Saturated as exc:
+                    yield {"index": index, "protocol_id": req.protocol_id, "error": "Server busy",
+                           "retry_after": retry_after_header(exc.retry_after)["Retry-After"]}
+                    continue
+            else:
+                rendered[key] = await render_request(req.protocol_id, req)
+        yield {"index": index, "protocol_id": req.protocol_id, **rendered[key]}
+
+# Segments one /generate-segments call may ask for; longer playlists are sent in several calls.
+# A batch costs one token per item, so a full one has to fit in an idle client's bucket.
+MAX_BATCH = CLIENT_BURST
+
+@app.post("/generate-segments")
+async def generate_radio_segments(request: Request, requests: List[RadioRequest] = Body(..., max_length=MAX_BATCH),
+                                  stream: bool = False):
+    if not PROTOCOL_DB: raise HTTPException(status_code=404, detail="DB Empty")
+    if len(requests) > 1:
+        admit(request, cost=len(requests))
+
+    # Stream one JSON object per line when asked, so a player can start on the first segment
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        lines = (json.dumps(segment) + "\n" async for segment in resolve_batch(requests, partial=True))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    return [segment async for segment in resolve_batch(requests)]
+
+# Every manual version served so far, for diffs and the "what's new" segment
+VERSION_STORE = open_version_store()
+WHATS_NEW_LINES = 3  # changed lines read out per protocol
+
+def record_version(db, sync: dict, metadata: dict):
+    if VERSION_STORE is not None and db and not VERSION_STORE.has_version(sync["db_version"]):
+        VERSION_STORE.add_version(db, sync["db_version"], metadata)
+
+record_version(PROTOCOL_DB, DB_SYNC, DB_METADATA)
+
+def get_version_store():
+    if VERSION_STORE is None:
+        raise HTTPException(status_code=503, detail="Version store unavailable")
+    return VERSION_STORE
+
+def version_range(from_version: Optional[int], to_version: Optional[int]):
+    """Default to the newest version and the one before it"""
+    store = get_version_store()
+    to_version = to_version if to_version is not None else store.latest()
+    if from_version is None and to_version is not None:
+        from_version = store.previous(to_version)
+    if from_version is None or to_version is None:
+        raise HTTPException(status_code=404, detail="No earlier version to compare with")
+    return from_version, to_version
+
+# Plain defs: the store is sqlite, so these run on the thread pool
+@app.get("/versions")
+def list_versions():
+    return {"current": DB_SYNC["db_version"], "versions": get_version_store().versions()}
+
+@app.get("/protocols/{protocol_id}/diff")
+def protocol_diff(protocol_id: str, from_version: Optional[int] = Query(None, alias="from"),
+                  to_version: Optional[int] = Query(None, alias="to")):
+    from_version, to_version = version_range(from_version, to_version)
+    diff = get_version_store().diff(protocol_id, from_version, to_version)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    if diff["status"] == "missing":
+        raise HTTPException(status_code=404, detail="Protocol not in either version")
+    return diff
+
+def counted(n: int, noun: str) -> str:
+    return f"{n} {noun}" if n == 1 else f"{n} {noun}s"
+
+def build_whats_new_segment(from_version: int, to_version: int, mode: str) -> dict:
+    store = get_version_store()
+    edition = next((v for v in store.versions() if v["db_version"] == to_version), {})
+    if edition.get("effective"):
+        intro = f"What's new in the protocols effective {edition['effective']}."
+    else:
+        intro = f"What's new in protocol version {to_version}."
+
+    changes = store.changes(from_version, to_version)
+    parts = [intro, f"{counted(len(changes), 'protocol')} changed." if changes else "No protocols changed."]
+    for change in changes:
+        if change["status"] == "added":
+            parts.append(f"New protocol: {change['title']}.")
+        elif change["status"] == "removed":
+            parts.append(f"Removed: {change['title']}.")
+        else:
+            added = [line for hunk in change["hunks"] for line in hunk["added"]]
+            parts.append(f"{change['title']}: {counted(change['lines_added'], 'line')} added, "
+                         f"{counted(change['lines_removed'], 'line')} removed.")
+            if added:
+                # Diff lines are raw manual text; read them the way segments are read
+                parts.append("Now reads: " + SPEECH_EXPANDER.expand(" ".join(added[:WHATS_NEW_LINES])))
+
+    return {
+        "title": "What's New",
+        "mode": mode,
+        "audio_url": "",
+        "from": from_version,
+        "to": to_version,
+        "script_text": "\n\n".join(parts)
+    }
+
+@app.get("/whats-new")
+async def whats_new_segment(mode: str = "review", from_version: Optional[int] = Query(None, alias="from"),
+                            to_version: Optional[int] = Query(None, alias="to")):
+    # The version store is SQLite, like the render cache's shared tier: both off the loop
+    from_version, to_version = await run_in_threadpool(version_range, from_version, to_version)
+    # Versions never change once stored, so the key needs no content hash
+    return await cached_render(f"whats_new:{from_version}:{to_version}:{mode}",
+                               lambda: build_whats_new_segment(from_version, to_version, mode))
+
+async def station_segment_render(protocol_id: str, mode: str) -> dict:
+    # Same path as /generate-segment: cache, then a render slot and the thread pool
+    return await render_request(protocol_id, RadioRequest(protocol_id=protocol_id, mode=mode))
+
+STATIONS = build_stations(PROTOCOL_DB, station_segment_render)
+MAX_CUSTOM_STATIONS = 50
+
+def get_station(name: str) -> Station:
+    station = STATIONS.get(name)
+    if not station:
+        raise HTTPException(status_code=404, detail="Station not found")
+    return station
+
+@app.get("/stations")
+async def list_stations():
+    return [
+        {"name": name, "mode": station.mode, "protocol_count": len(station.rotation)}
+        for name, station in STATIONS.items()
+    ]
+
+@app.post("/stations")
+async def create_station(request: StationRequest):
+    existing = STATIONS.get(request.name)
+    if existing and not existing.custom:
+        raise HTTPException(status_code=409, detail="Built-in stations can't be replaced")
+    if not existing and sum(station.custom for station in STATIONS.values()) >= MAX_CUSTOM_STATIONS:
+        raise HTTPException(status_code=429, detail="Too many stations")
+    rotation = build_rotation(PROTOCOL_DB, request.category, request.provider_level, request.protocol_ids)
+    if not rotation:
+        raise HTTPException(status_code=400, detail="Station has no protocols")
+
+    STATIONS[request.name] = Station(request.name, rotation, station_segment_render,
+                                     mode=request.mode, lookahead=request.lookahead, custom=True)
+    return {"name": request.name, "mode": request.mode, "protocol_count": len(rotation)}
+
+@app.get("/stations/{name}/now-playing")
+async def station_now_playing(name: str):
+    return await get_station(name).now_playing()
+
+@app.get("/stations/{name}/playlist.m3u8")
+async def station_playlist(name: str):
+    playlist = await get_station(name).playlist(lambda seq: f"/stations/{name}/segments/{seq}")
+    return Response(playlist, media_type="application/vnd.apple.mpegurl")
+
+@app.get("/stations/{name}/segments/{seq}")
+async def station_segment(name: str, seq: int):
+    entry = await get_station(name).get_segment(seq)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Segment is no longer in the live window")
+    return {"seq": entry["seq"], "duration": entry["duration"], **entry["segment"]}
+
+def refresh_stations():
+    # Stations keep their schedule so listeners don't skip; only what comes next changes
+    for name, fresh in build_stations(PROTOCOL_DB, station_segment_render).items():
+        # A new category's station takes its name back from a custom one
+        if name in STATIONS and not STATIONS[name].custom:
+            STATIONS[name].rotation = fresh.rotation
+        else:
+            STATIONS[name] = fresh
+    for name, station in list(STATIONS.items()):
+        station.rotation = [pid for pid in station.rotation if pid in PROTOCOL_DB]
+        if not station.rotation:
+            del STATIONS[name]
+
+# Each API worker holds its own copy of the DB. The worker that ran an ingest moves the
+# files into place and reloads; every other worker notices the files changed and reloads
+# from them, so all of them serve the new version within DB_RELOAD_SECONDS.
+DB_RELOAD_SECONDS = 2.0
+DB_LOADED_MTIME = db_mtime()
+DB_SWAP_LOCK = asyncio.Lock()
+
+async def publish_db(output: dict) -> dict:
+    # JSON first, then the snapshot, so a worker starting in between still loads a matching pair;
+    # the store last, so it is never older than the DB and isn't rebuilt at startup
+    os.replace(output["output_file"], DB_FILE)
+    os.replace(output["snapshot_file"], SNAPSHOT_FILE)
+    os.replace(output["store_file"], STORE_FILE)
+    return await reload_db()
+
+def db_files_changed() -> bool:
+    # The store is moved in last: while it is older than the DB, a publish is still under way
+    store_mtime = mtime(STORE_FILE)
+    return db_mtime() != DB_LOADED_MTIME and (store_mtime < 0 or store_mtime >= mtime(DB_FILE))
+
+async def watch_db_files():
+    """Reload whenever another worker publishes"""
+    while True:
+        await asyncio.sleep(DB_RELOAD_SECONDS)
+        if db_files_changed():
+            try:
+                await reload_db()
+            except Exception as e:
+                # Keep serving what is loaded; the next change is tried again
+                print(f"⚠️ DB reload failed: {e}")
+
+async def reload_db() -> dict:
+    global PROTOCOL_DB, DB_SYNC, DB_METADATA, DB_LOAD_SECONDS, DB_TEXT_BYTES, CATALOG_VARIANTS, PROTOCOL_VARIANTS
+    global SPEECH_EXPANDER, PROTOCOL_STORE, DB_LOADED_MTIME
+    async with DB_SWAP_LOCK:
+        # Taken before reading: files replaced during the load show up as another change
+        loaded_mtime = db_mtime()
+        started = time.perf_counter()
+        db, sync, metadata = await run_in_threadpool(load_db)
+        load_seconds = time.perf_counter() - started
+        # Diffs against the previous version and the compressed payloads are built here, off the loop.
+        # Every worker may record the same version; the store adds it once.
+        await run_in_threadpool(record_version, db, sync, metadata)
+        catalog_variants = await run_in_threadpool(build_catalog_variants, db)
+        variants = await run_in_threadpool(fill_protocol_variants, db, {})
+        store = await run_in_threadpool(open_store, STORE_FILE, db, loaded_mtime)
+
+        # No await from here on: requests see either the old DB or the new one, never a mix
+        DB_LOADED_MTIME = loaded_mtime
+        changes = manifest_changes(DB_SYNC, sync)
+        PROTOCOL_DB, DB_SYNC, DB_METADATA, DB_LOAD_SECONDS = db, sync, metadata, load_seconds
+        DB_TEXT_BYTES = text_bytes(PROTOCOL_DB)
+        CATALOG_VARIANTS, PROTOCOL_VARIANTS = catalog_variants, variants
+        # Searches already running keep their connection to the old file
+        old_store, PROTOCOL_STORE = PROTOCOL_STORE, store
+        if old_store is not None:
+            old_store.close()
+        SPEECH_EXPANDER = build_expander(PROTOCOL_DB)
+        script_body.cache_clear()
+        SYNC_BUNDLES.clear()
+        refresh_stations()
+        # Render cache keys carry the content hash, so changed protocols miss on their own
+        UPDATES.publish(DB_SYNC["db_version"], changes["changed"], changes["removed"])
+        return {"db_version": DB_SYNC["db_version"], "loaded": len(PROTOCOL_DB),
+                "changed": len(changes["changed"]), "removed": len(changes["removed"])}
+
+# Connected clients hear about a swap instead of polling /protocols for it
+UPDATES = UpdateBroadcaster(DB_SYNC["db_version"])
+
+@app.get("/updates")
+async def protocol_updates(request: Request, since: Optional[int] = None):
+    if UPDATES.full():
+        raise HTTPException(status_code=503, detail="Too many update listeners", headers=retry_after_header(30))
+    # A reconnecting EventSource sends the id of the last event it saw
+    last_id = request.headers.get("last-event-id", "")
+    if since is None and last_id.isdigit():
+        since = int(last_id)
+    return StreamingResponse(UPDATES.stream(since), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+INGEST_RUNNER = IngestRunner(publish_db)
+ADMIN_TOKEN = os.environ.get("EMS_ADMIN_TOKEN", "")
+UPLOAD_KINDS = {"application/pdf": "pdf", "text/plain": "text"}
+
+def require_admin(request: Request):
+    # No token configured means no admin routes at all
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+async def get_ingest_job(job_id: str) -> dict:
+    # Jobs are shared by all workers, so any of them can answer for one
+    job = await run_in_threadpool(INGEST_RUNNER.store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job
+
+# The manual is the raw request body (Content-Type application/pdf or text/plain)
+@app.post("/admin/ingest", status_code=202)
+async def start_ingest(request: Request):
+    require_admin(request)
+    kind = UPLOAD_KINDS.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if not kind:
+        raise HTTPException(status_code=415, detail="Send the manual as application/pdf or text/plain")
+    if int(request.headers.get("content-length") or 0) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Manual too large")
+    body = await request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    if len(body) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Manual too large")
+
+    try:
+        job = await INGEST_RUNNER.submit(body, kind)
+    except JobBusy:
+        raise HTTPException(status_code=409, detail="An ingest is already running")
+    return {**job, "events_url": f"/admin/ingest/{job['id']}/events"}
+
+@app.get("/admin/ingest/{job_id}")
+async def ingest_status(job_id: str, request: Request):
+    require_admin(request)
+    return await get_ingest_job(job_id)
+
+@app.get("/admin/ingest/{job_id}/events")
+async def ingest_events(job_id: str, request: Request):
+    require_admin(request)
+    await get_ingest_job(job_id)
+    # Server-sent events: the whole log so far, then live progress until the job finishes
+    lines = (f"event: {event['stage']}\nid: {event['seq']}\ndata: {json.dumps(event)}\n\n"
+             async for event in INGEST_RUNNER.follow(job_id))
+    return StreamingResponse(lines, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def script_cache_stats():
+    info = script_body.cache_info()
+    return {(("result", "hit"),): info.hits, (("result", "miss"),): info.misses}
+
+METRICS.gauge("ems_db_protocols", "Protocols loaded in PROTOCOL_DB.", lambda: len(PROTOCOL_DB))
+METRICS.gauge("ems_db_text_bytes", "Total raw_text bytes across loaded protocols.", lambda: DB_TEXT_BYTES)
+METRICS.gauge("ems_db_load_seconds", "Time taken to load the protocol DB.", lambda: DB_LOAD_SECONDS)
+METRICS.gauge("ems_db_version", "DB version from the last ingest.", lambda: DB_SYNC["db_version"])
+METRICS.gauge("ems_script_cache_lookups", "Script cleanup cache lookups since start.", script_cache_stats)
+METRICS.gauge("ems_render_cache_lookups", "Render cache lookups by tier since start.", RENDER_CACHE.stats)
+METRICS.gauge("ems_render_cache_hit_ratio", "Render cache hit ratio by tier.", RENDER_CACHE.hit_ratios)
+METRICS.gauge("ems_render_cache_renders", "Segments this worker rendered after missing every tier.",
+              lambda: RENDER_CACHE.renders)
+METRICS.gauge("ems_render_queue_depth", "Renders running and waiting for a slot.", RENDER_GATE.depth)
+METRICS.gauge("ems_render_rejected", "Renders turned away with 503 since start.", RENDER_GATE.rejections)
+METRICS.gauge("ems_rate_limited", "Requests turned away with 429 since start.", lambda: CLIENT_LIMITER.limited)
+METRICS.gauge("ems_rate_limit_clients", "Clients with a token bucket.", lambda: len(CLIENT_LIMITER.buckets))
+METRICS.gauge("ems_ingest_jobs", "API ingest jobs by status.", INGEST_RUNNER.stats)
+METRICS.gauge("ems_update_listeners", "Open /updates connections.", lambda: UPDATES.subscribers)
+METRICS.gauge("ems_update_events_sent", "Update events written to listeners since start.", lambda: UPDATES.sent)
+if VERSION_STORE is not None:
+    METRICS.gauge("ems_manual_version_texts", "Protocol rows across stored versions vs distinct texts kept.",
+                  VERSION_STORE.stats)
+
+@app.get("/metrics")
+async def metrics():
+    return Response(METRICS.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,227 @@
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+# Every manual version the API has served, keyed by DB version. Protocol text is stored
+# once per distinct content hash (most protocols don't change between editions), and
+# line diffs between consecutive versions are computed when a version is added, so
+# /protocols/{id}/diff is a single row lookup. Other pairs are diffed on first request
+# from the stored texts and kept.
+
+VERSIONS_FILE = os.environ.get("EMS_VERSIONS_DB", "manual_versions.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    hash TEXT PRIMARY KEY,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    db_version INTEGER PRIMARY KEY,
+    effective TEXT,
+    replaces TEXT,
+    protocols INTEGER NOT NULL,
+    added REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS version_protocols (
+    db_version INTEGER NOT NULL,
+    protocol_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    PRIMARY KEY (db_version, protocol_id)
+);
+CREATE TABLE IF NOT EXISTS diffs (
+    protocol_id TEXT NOT NULL,
+    from_version INTEGER NOT NULL,
+    to_version INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    lines_added INTEGER NOT NULL,
+    lines_removed INTEGER NOT NULL,
+    hunks TEXT NOT NULL,
+    PRIMARY KEY (protocol_id, from_version, to_version)
+);
+CREATE INDEX IF NOT EXISTS idx_diffs_versions ON diffs(from_version, to_version);
+"""
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def text_lines(text: str) -> List[str]:
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def line_diff(old: str, new: str) -> dict:
+    """Changed runs of lines: {"lines_added", "lines_removed", "hunks": [{"removed": [...], "added": [...]}]}"""
+    a, b = text_lines(old), text_lines(new)
+    hunks, added, removed = [], 0, 0
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        hunks.append({"at": j1, "removed": a[i1:i2], "added": b[j1:j2]})
+        removed += i2 - i1
+        added += j2 - j1
+    return {"lines_added": added, "lines_removed": removed, "hunks": hunks}
+
+
+class VersionStore:
+    """Manual versions, deduplicated protocol text and per-protocol diffs in one SQLite file"""
+
+    def __init__(self, path: str = VERSIONS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def has_version(self, db_version: int) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM versions WHERE db_version = ?", (db_version,)).fetchone() is not None
+
+    def add_version(self, protocols: Dict[str, dict], db_version: int, metadata: Optional[dict] = None) -> bool:
+        """Record a loaded DB as a version; False if it is already stored"""
+        metadata = metadata or {}
+        texts = {pid: item.get("raw_text", "") for pid, item in protocols.items()}
+        hashes = {pid: text_hash(text) for pid, text in texts.items()}
+
+        with self.lock:
+            # IMMEDIATE: two workers starting on the same DB must not both add it
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.conn.execute("SELECT 1 FROM versions WHERE db_version = ?", (db_version,)).fetchone():
+                    self.conn.execute("ROLLBACK")
+                    return False
+
+                known = {row[0] for row in self.conn.execute("SELECT hash FROM texts")}
+                fresh = {}
+                for pid, digest in hashes.items():
+                    if digest not in known and digest not in fresh:
+                        fresh[digest] = zlib.compress(texts[pid].encode("utf-8"))
+                self.conn.executemany("INSERT INTO texts VALUES (?, ?)", fresh.items())
+
+                self.conn.execute("INSERT INTO versions VALUES (?, ?, ?, ?, ?)",
+                                  (db_version, metadata.get("effective"), metadata.get("replaces"),
+                                   len(protocols), time.time()))
+                self.conn.executemany("INSERT INTO version_protocols VALUES (?, ?, ?, ?)",
+                                      [(db_version, pid, protocols[pid].get("title", pid), digest)
+                                       for pid, digest in hashes.items()])
+
+                previous = self.conn.execute("SELECT MAX(db_version) FROM versions WHERE db_version < ?",
+                                             (db_version,)).fetchone()[0]
+                if previous is not None:
+                    old = self.version_hashes(previous)
+                    rows = [self.diff_row(pid, previous, db_version, old.get(pid), hashes.get(pid))
+                            for pid in sorted(set(old) | set(hashes)) if old.get(pid) != hashes.get(pid)]
+                    self.conn.executemany("INSERT OR REPLACE INTO diffs VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def version_hashes(self, db_version: int) -> Dict[str, str]:
+        return dict(self.conn.execute("SELECT protocol_id, text_hash FROM version_protocols WHERE db_version = ?",
+                                      (db_version,)))
+
+    def text(self, digest: Optional[str]) -> str:
+        if digest is None:
+            return ""
+        row = self.conn.execute("SELECT body FROM texts WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else ""
+
+    def diff_row(self, pid: str, from_version: int, to_version: int,
+                 old_hash: Optional[str], new_hash: Optional[str]) -> tuple:
+        status = "added" if old_hash is None else "removed" if new_hash is None else "changed"
+        diff = line_diff(self.text(old_hash), self.text(new_hash))
+        return (pid, from_version, to_version, status, diff["lines_added"], diff["lines_removed"],
+                json.dumps(diff["hunks"], separators=(",", ":"), ensure_ascii=False))
+
+    def versions(self) -> List[dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT v.db_version, v.effective, v.replaces, v.protocols, v.added, "
+                "(SELECT COUNT(*) FROM diffs d WHERE d.to_version = v.db_version AND d.from_version = "
+                "(SELECT MAX(db_version) FROM versions WHERE db_version < v.db_version)) "
+                "FROM versions v ORDER BY v.db_version").fetchall()
+        return [{"db_version": v, "effective": effective, "replaces": replaces, "protocols": count,
+                 "added": added, "changed_from_previous": changed}
+                for v, effective, replaces, count, added, changed in rows]
+
+    def latest(self) -> Optional[int]:
+        with self.lock:
+            return self.conn.execute("SELECT MAX(db_version) FROM versions").fetchone()[0]
+
+    def previous(self, db_version: int) -> Optional[int]:
+        with self.lock:
+            return self.conn.execute("SELECT MAX(db_version) FROM versions WHERE db_version < ?",
+                                     (db_version,)).fetchone()[0]
+
+    def diff(self, pid: str, from_version: int, to_version: int) -> Optional[dict]:
+        """Line diff of one protocol between two stored versions; None if either version is unknown"""
+        with self.lock:
+            known = {row[0] for row in self.conn.execute(
+                "SELECT db_version FROM versions WHERE db_version IN (?, ?)", (from_version, to_version))}
+            if known != {from_version, to_version}:
+                return None
+
+            row = self.conn.execute(
+                "SELECT status, lines_added, lines_removed, hunks FROM diffs "
+                "WHERE protocol_id = ? AND from_version = ? AND to_version = ?",
+                (pid, from_version, to_version)).fetchone()
+            if row is None:
+                old = self.conn.execute("SELECT text_hash FROM version_protocols WHERE db_version = ? AND protocol_id = ?",
+                                        (from_version, pid)).fetchone()
+                new = self.conn.execute("SELECT text_hash FROM version_protocols WHERE db_version = ? AND protocol_id = ?",
+                                        (to_version, pid)).fetchone()
+                old_hash, new_hash = old and old[0], new and new[0]
+                if old_hash == new_hash:
+                    # Same text (or absent from both): nothing to store
+                    return {"protocol_id": pid, "from": from_version, "to": to_version,
+                            "status": "unchanged" if old_hash else "missing",
+                            "lines_added": 0, "lines_removed": 0, "hunks": []}
+                # Not consecutive versions: diff once from the stored texts and keep it
+                computed = self.diff_row(pid, from_version, to_version, old_hash, new_hash)
+                self.conn.execute("INSERT OR REPLACE INTO diffs VALUES (?, ?, ?, ?, ?, ?, ?)", computed)
+                row = computed[3:]
+
+        status, added, removed, hunks = row
+        return {"protocol_id": pid, "from": from_version, "to": to_version, "status": status,
+                "lines_added": added, "lines_removed": removed, "hunks": json.loads(hunks)}
+
+    def changes(self, from_version: int, to_version: int) -> List[dict]:
+        """Every protocol that differs between two consecutive versions, with its title"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT d.protocol_id, COALESCE(n.title, o.title, d.protocol_id), d.status, d.lines_added, "
+                "d.lines_removed, d.hunks FROM diffs d "
+                "LEFT JOIN version_protocols n ON n.db_version = d.to_version AND n.protocol_id = d.protocol_id "
+                "LEFT JOIN version_protocols o ON o.db_version = d.from_version AND o.protocol_id = d.protocol_id "
+                "WHERE d.from_version = ? AND d.to_version = ? ORDER BY d.protocol_id",
+                (from_version, to_version)).fetchall()
+        return [{"protocol_id": pid, "title": title, "status": status, "lines_added": added,
+                 "lines_removed": removed, "hunks": json.loads(hunks)}
+                for pid, title, status, added, removed, hunks in rows]
+
+    def stats(self) -> Dict[tuple, int]:
+        """Stored protocol rows versus distinct texts: how much deduplication saves"""
+        with self.lock:
+            refs = self.conn.execute("SELECT COUNT(*) FROM version_protocols").fetchone()[0]
+            texts = self.conn.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+        return {(("kind", "protocol_refs"),): refs, (("kind", "distinct_texts"),): texts}
+
+
+def open_version_store(path: Optional[str] = VERSIONS_FILE) -> Optional[VersionStore]:
+    """The version store, or None if the file can't be used (the API runs without history)"""
+    if not path:
+        return None
+    try:
+        return VersionStore(path)
+    except sqlite3.Error as e:
+        print(f"⚠️ Manual version store unavailable ({e}); serving the current version only")
+        return None
@@ -0,0 +1,172 @@
+import math
+import time
+from typing import Callable, Dict, Tuple
+
+# Everything here is updated from the event loop thread only, so plain ints are enough:
+# no locks, no atomics, just a dict lookup and a few additions per request.
+
+
+class Histogram:
+    """Log-linear (HDR-style) histogram: each power of two is split into SUB_BUCKETS slots"""
+
+    SUB_BUCKETS = 4
+
+    def __init__(self, lowest: float, octaves: int):
+        self.lowest = lowest
+        self.octaves = octaves
+        # Slot 0 holds values below `lowest`, the last slot everything past the top octave
+        self.counts = [0] * (octaves * self.SUB_BUCKETS + 2)
+        self.count = 0
+        self.sum = 0.0
+
+    def index(self, value: float) -> int:
+        ratio = value / self.lowest
+        if ratio < 1:
+            return 0
+        mantissa, exponent = math.frexp(ratio)  # ratio = mantissa * 2**exponent, mantissa in [0.5, 1)
+        octave = exponent - 1
+        if octave >= self.octaves:
+            return len(self.counts) - 1
+        return 1 + octave * self.SUB_BUCKETS + int((mantissa * 2 - 1) * self.SUB_BUCKETS)
+
+    def observe(self, value: float):
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Yield (upper_bound, cumulative_count) at every power of two"""
+        running = self.counts[0]
+        yield self.lowest, running
+        for octave in range(self.octaves):
+            start = 1 + octave * self.SUB_BUCKETS
+            running += sum(self.counts[start:start + self.SUB_BUCKETS])
+            yield self.lowest * 2 ** (octave + 1), running
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile from slot upper bounds"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for slot, n in enumerate(self.counts):
+            running += n
+            if running >= target:
+                if slot == 0:
+                    return self.lowest
+                octave, sub = divmod(slot - 1, self.SUB_BUCKETS)
+                return self.lowest * 2 ** octave * (1 + (sub + 1) / self.SUB_BUCKETS)
+        return self.lowest * 2 ** self.octaves
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def format_number(value) -> str:
+    if isinstance(value, float) and value == math.inf:
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Per-route request metrics plus callback gauges, rendered in Prometheus text format"""
+
+    def __init__(self):
+        # latency from 50us to ~55 min, response size from 64B to 64MB
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.sizes: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, str], int] = {}
+        self.in_flight = 0
+        self.gauges: Dict[str, Tuple[str, Callable[[], Dict[Tuple, float]]]] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int):
+        key = (method, route)
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = Histogram(0.00005, 26)
+            self.sizes[key] = Histogram(64, 20)
+        latency.observe(seconds)
+        self.sizes[key].observe(size)
+
+        status_key = (method, route, str(status))
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], object]):
+        """Register a gauge read at scrape time; `read` returns a number or {label tuple: number}"""
+        self.gauges[name] = (help_text, read)
+
+    def render_histograms(self, name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram]) -> list:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (method, route), hist in sorted(histograms.items()):
+            labels = {"method": method, "route": route}
+            for bound, count in hist.cumulative():
+                lines.append(f"{name}_bucket{format_labels({**labels, 'le': format_number(float(bound))})} {count}")
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {hist.count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_number(float(hist.sum))}")
+            lines.append(f"{name}_count{format_labels(labels)} {hist.count}")
+        return lines
+
+    def render(self) -> str:
+        lines = self.render_histograms("http_request_duration_seconds", "Request latency by route.", self.latency)
+        lines += self.render_histograms("http_response_size_bytes", "Response body size by route.", self.sizes)
+
+        lines += ["# HELP http_responses_total Responses by route and status.", "# TYPE http_responses_total counter"]
+        for (method, route, status), count in sorted(self.responses.items()):
+            lines.append(f"http_responses_total{format_labels({'method': method, 'route': route, 'status': status})} {count}")
+
+        lines += ["# HELP http_requests_in_flight Requests currently being served.",
+                  "# TYPE http_requests_in_flight gauge",
+                  f"http_requests_in_flight {self.in_flight}"]
+
+        for name, (help_text, read) in sorted(self.gauges.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            value = read()
+            if isinstance(value, dict):
+                for labels, v in sorted(value.items()):
+                    lines.append(f"{name}{format_labels(dict(labels))} {format_number(v)}")
+            else:
+                lines.append(f"{name} {format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: times each request and records it under its route template"""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            # Label by the route template, not the raw path, to keep label cardinality bounded
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            metrics.observe(scope["method"], route, status, time.perf_counter() - start, size)
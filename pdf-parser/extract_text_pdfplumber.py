@@ -1,10 +1,15 @@
-import pdfplumber
+import argparse
+import json
 import re
+import time
 from pathlib import Path
 
+from ocr_fallback import OcrPipeline, needs_ocr, render_page_png
+from page_artifacts import build_page_artifact, write_page_artifact
+
 pdf_path = "ems-protocol-manual-OCT25.pdf"
 output_dir = Path("output_pages")
-output_dir.mkdir(exist_ok=True)
+REPORT_FILE = "extraction_report.json"
 
 def clean_duplicated_text(text: str) -> str:
     if not text:
@@ -13,15 +18,91 @@ def clean_duplicated_text(text: str) -> str:
     cleaned = re.sub(r'\s+', ' ', cleaned)
     return cleaned
 
-with pdfplumber.open(pdf_path) as pdf:
-    print(f"Total pages: {len(pdf.pages)}")
+def clean_ocr_text(text: str) -> str:
+    # OCR reads the rendered image, so there are no doubled letters to undo
+    return re.sub(r'\s+', ' ', text or "").strip()
+
+def write_page_text(output_dir, page_num, text):
+    out_path = output_dir / f"page_{page_num:03}.txt"
+    with out_path.open("w", encoding="utf-8") as f:
+        f.write(text)
+    return out_path
+
+def extract_pages(pdf_path, output_dir, ocr=True, workers=None):
+    import pdfplumber
+
+    output_dir.mkdir(exist_ok=True)
+    report = {}
+    # Image-only pages are OCRed while later pages are still being read; their
+    # artifacts wait here for the text
+    pipeline = OcrPipeline(workers) if ocr else None
+    ocr_artifacts = {}
+
+    with pdfplumber.open(pdf_path) as pdf:
+        print(f"Total pages: {len(pdf.pages)}")
+
+        for page_num, page in enumerate(pdf.pages, start=1):
+            start = time.perf_counter()
+            raw = page.extract_text()
+            cleaned = clean_duplicated_text(raw)
+
+            # Words and tables come from the same parsed page, so later parsers never reopen the PDF
+            artifact = build_page_artifact(page, page_num, cleaned)
+            report[page_num] = {"page": page_num, "method": "text", "chars": len(cleaned),
+                                "text_chars": len(cleaned), "seconds": 0.0}
+
+            if pipeline and pipeline.available and needs_ocr(cleaned):
+                ocr_artifacts[page_num] = artifact
+                pipeline.submit(page_num, render_page_png(page))
+            else:
+                out_path = write_page_text(output_dir, page_num, cleaned)
+                write_page_artifact(output_dir, artifact)
+                print(f"Saved {out_path}")
+
+            report[page_num]["seconds"] = round(time.perf_counter() - start, 4)
+
+            # Drop this page's parsed objects before moving on
+            page.close()
+
+    if ocr_artifacts:
+        print(f"🔍 {len(ocr_artifacts)} pages have no text layer, waiting for OCR...")
+        ocr_results = pipeline.finish()
+        if pipeline.error is not None:
+            # pytesseract or the tesseract binary is missing: keep the pages, flagged as empty
+            print(f"⚠️ OCR unavailable ({pipeline.error}); saving those pages without text")
+        no_text = {"method": "text", "seconds": 0.0}
+
+        for page_num in sorted(ocr_artifacts):
+            result = ocr_results.get(page_num) or {"text": ocr_artifacts[page_num]["text"], **no_text}
+            text = clean_ocr_text(result["text"])
+            artifact = ocr_artifacts[page_num]
+            artifact["text"] = text
+            artifact["method"] = result["method"]
+            out_path = write_page_text(output_dir, page_num, text)
+            write_page_artifact(output_dir, artifact)
+
+            row = report[page_num]
+            row["method"] = result["method"] if text else "empty"
+            row["chars"] = len(text)
+            row["seconds"] = round(row["seconds"] + result["seconds"], 4)
+            print(f"Saved {out_path} ({row['method']}, {row['chars']} chars)")
+
+    rows = [report[n] for n in sorted(report)]
+    with (output_dir / REPORT_FILE).open("w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2)
 
-    for page_num, page in enumerate(pdf.pages, start=1):
-        raw = page.extract_text()
-        cleaned = clean_duplicated_text(raw)
+    counts = {}
+    for row in rows:
+        counts[row["method"]] = counts.get(row["method"], 0) + 1
+    print(f"📊 Pages by method: {counts}  (report: {output_dir / REPORT_FILE})")
+    return rows
 
-        out_path = output_dir / f"page_{page_num:03}.txt"
-        with out_path.open("w", encoding="utf-8") as f:
-            f.write(cleaned)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract per-page text, words and tables from the manual PDF")
+    parser.add_argument("pdf", nargs="?", default=pdf_path)
+    parser.add_argument("--output-dir", default=str(output_dir))
+    parser.add_argument("--no-ocr", action="store_true", help="Skip the OCR fallback for image-only pages")
+    parser.add_argument("--workers", type=int, help="OCR worker processes (default: CPU count)")
+    args = parser.parse_args()
 
-        print(f"Saved {out_path}")
+    extract_pages(args.pdf, Path(args.output_dir), ocr=not args.no_ocr, workers=args.workers)
@@ -0,0 +1,118 @@
+import hashlib
+import io
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Pages with less extracted text than this are treated as image-only and sent to OCR
+MIN_TEXT_CHARS = 20
+OCR_RESOLUTION = 300
+OCR_CACHE_DIR = "ocr_cache"
+
+
+def needs_ocr(text: str) -> bool:
+    return len((text or "").strip()) < MIN_TEXT_CHARS
+
+
+def render_page_png(page, resolution: int = OCR_RESOLUTION) -> bytes:
+    """Rasterize a pdfplumber page so it can be shipped to an OCR worker"""
+    buffer = io.BytesIO()
+    page.to_image(resolution=resolution).original.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def ocr_image(png_bytes: bytes, lang: str = "eng"):
+    """Runs in a worker process; returns (text, seconds)"""
+    import pytesseract
+    from PIL import Image
+
+    start = time.perf_counter()
+    text = pytesseract.image_to_string(Image.open(io.BytesIO(png_bytes)), lang=lang)
+    return text, time.perf_counter() - start
+
+
+class OcrCache:
+    """OCR text on disk keyed by the page image hash, so re-runs only OCR pages that changed"""
+
+    def __init__(self, directory: str = OCR_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, image_hash: str) -> str:
+        return os.path.join(self.directory, f"{image_hash}.txt")
+
+    def get(self, image_hash: str):
+        path = self.path(image_hash)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def put(self, image_hash: str, text: str):
+        path = self.path(image_hash)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+
+
+class OcrPipeline:
+    """OCR that overlaps with reading the PDF: each page image goes to the pool as soon as
+    it is rendered, and at most `max_pending` images wait in memory at once"""
+
+    def __init__(self, workers: int = None, cache: OcrCache = None, lang: str = "eng", max_pending: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache or OcrCache()
+        self.lang = lang
+        self.max_pending = max_pending or 2 * self.workers
+        self.pool = None
+        self.futures = OrderedDict()   # page_num -> (image hash, future), oldest first
+        self.results = {}              # page_num -> {"text", "method", "seconds"}
+        # Set if pytesseract or the tesseract binary turns out to be missing
+        self.error = None
+
+    @property
+    def available(self) -> bool:
+        return self.error is None
+
+    def submit(self, page_num: int, png: bytes):
+        if self.error is not None:
+            return
+        image_hash = hashlib.sha256(png).hexdigest()
+        cached = self.cache.get(image_hash)
+        if cached is not None:
+            self.results[page_num] = {"text": cached, "method": "ocr-cached", "seconds": 0.0}
+            return
+
+        # Rendering outpaces OCR: wait for the oldest page rather than queueing more images
+        while len(self.futures) >= self.max_pending and self.error is None:
+            self.collect_oldest()
+        if self.error is not None:
+            return
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.futures[page_num] = (image_hash, self.pool.submit(ocr_image, png, self.lang))
+
+    def collect_oldest(self):
+        page_num, (image_hash, future) = self.futures.popitem(last=False)
+        try:
+            text, seconds = future.result()
+        except (ImportError, OSError) as e:
+            self.error = e
+            self.close()
+            return
+        self.cache.put(image_hash, text)
+        self.results[page_num] = {"text": text, "method": "ocr", "seconds": seconds}
+
+    def finish(self) -> dict:
+        """Wait for the pages still in the pool; {page_num: result} for every page OCR read"""
+        while self.futures and self.error is None:
+            self.collect_oldest()
+        self.close()
+        return self.results
+
+    def close(self):
+        self.futures.clear()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
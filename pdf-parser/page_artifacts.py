@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+# One JSON file per page, written by extract_text_pdfplumber.py:
+#   {"page", "width", "height", "text",
+#    "words": {"text": [...], "x0": [...], "top": [...], "x1": [...], "bottom": [...]},
+#    "tables": [{"bbox": [x0, top, x1, bottom], "rows": [[cell, ...], ...]}, ...]}
+# Pages read by the OCR fallback also carry "method" ("ocr" or "ocr-cached").
+# Words are stored column-wise so a page with thousands of words stays small on disk.
+
+WORD_FIELDS = ["text", "x0", "top", "x1", "bottom"]
+ARTIFACT_GLOB = "page_*.json"
+
+
+def artifact_path(output_dir, page_num: int) -> Path:
+    return Path(output_dir) / f"page_{page_num:03}.json"
+
+
+def build_page_artifact(page, page_num: int, text: str) -> dict:
+    """Words and tables from one pdfplumber page; both reuse the page's already-parsed chars"""
+    # The manual draws shadowed headings as two overlapping copies of each char
+    deduped = page.dedupe_chars()
+    words = deduped.extract_words()
+    tables = deduped.find_tables()
+    return {
+        "page": page_num,
+        "width": float(page.width),
+        "height": float(page.height),
+        "text": text,
+        "words": {
+            field: [w[field] if field == "text" else round(float(w[field]), 2) for w in words]
+            for field in WORD_FIELDS
+        },
+        "tables": [
+            {"bbox": [round(float(v), 2) for v in table.bbox], "rows": table.extract()}
+            for table in tables
+        ],
+    }
+
+
+def write_page_artifact(output_dir, artifact: dict) -> Path:
+    path = artifact_path(output_dir, artifact["page"])
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+    return path
+
+
+def load_page_artifact(output_dir, page_num: int) -> dict:
+    with artifact_path(output_dir, page_num).open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_page_artifacts(output_dir):
+    """Every page artifact in page order, without touching the PDF"""
+    for path in sorted(Path(output_dir).glob(ARTIFACT_GLOB)):
+        with path.open("r", encoding="utf-8") as f:
+            yield json.load(f)
+
+
+def page_words(artifact: dict) -> list:
+    """Words as row dicts, in reading order"""
+    columns = artifact["words"]
+    return [dict(zip(WORD_FIELDS, row)) for row in zip(*(columns[f] for f in WORD_FIELDS))]
+
+
+def words_in_region(artifact: dict, x0: float, top: float, x1: float, bottom: float) -> list:
+    """Words fully inside a box, e.g. one column of a dosing chart or one flowchart box"""
+    return [w for w in page_words(artifact)
+            if w["x0"] >= x0 and w["x1"] <= x1 and w["top"] >= top and w["bottom"] <= bottom]
@@ -0,0 +1,117 @@
+import importlib.util
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Every backend yields (page_num, text) with 1-based page numbers, opening the PDF once.
+# Imports happen inside each backend so only the one in use is loaded.
+
+
+class PdfBackend:
+    name = ""
+    module = ""
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    def page_texts(self, pdf_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+        raise NotImplementedError
+
+
+def wanted_pages(total: int, pages: Optional[Iterable[int]]) -> List[int]:
+    if pages is None:
+        return list(range(1, total + 1))
+    return [p for p in sorted(set(pages)) if 1 <= p <= total]
+
+
+class PdfplumberBackend(PdfBackend):
+    name = "pdfplumber"
+    module = "pdfplumber"
+
+    def page_texts(self, pdf_path, pages=None):
+        import pdfplumber
+
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_num in wanted_pages(len(pdf.pages), pages):
+                page = pdf.pages[page_num - 1]
+                yield page_num, page.extract_text() or ""
+                page.close()
+
+
+class PypdfBackend(PdfBackend):
+    name = "pypdf"
+    module = "pypdf"
+
+    def page_texts(self, pdf_path, pages=None):
+        from pypdf import PdfReader
+
+        reader = PdfReader(pdf_path)
+        for page_num in wanted_pages(len(reader.pages), pages):
+            yield page_num, reader.pages[page_num - 1].extract_text() or ""
+
+
+class PdfminerBackend(PdfBackend):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def page_texts(self, pdf_path, pages=None):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        page_numbers = None if pages is None else [p - 1 for p in pages]
+        for layout in extract_pages(pdf_path, page_numbers=page_numbers):
+            text = "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+            yield layout.pageid, text
+
+
+class PdfiumBackend(PdfBackend):
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def page_texts(self, pdf_path, pages=None):
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            for page_num in wanted_pages(len(pdf), pages):
+                page = pdf[page_num - 1]
+                textpage = page.get_textpage()
+                yield page_num, textpage.get_text_range()
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+
+
+class PymupdfBackend(PdfBackend):
+    name = "pymupdf"
+    module = "fitz"
+
+    def page_texts(self, pdf_path, pages=None):
+        import fitz
+
+        with fitz.open(pdf_path) as doc:
+            for page_num in wanted_pages(doc.page_count, pages):
+                yield page_num, doc[page_num - 1].get_text()
+
+
+BACKENDS = {backend.name: backend for backend in
+            (PdfplumberBackend(), PypdfBackend(), PdfminerBackend(), PdfiumBackend(), PymupdfBackend())}
+DEFAULT_BACKEND = "pdfplumber"
+
+
+def available_backends() -> List[str]:
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(name: str) -> PdfBackend:
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown PDF backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if not backend.available():
+        raise ImportError(f"PDF backend '{name}' needs the '{backend.module}' package")
+    return backend
+
+
+def extract_page_texts(pdf_path: str, backend: str = DEFAULT_BACKEND,
+                       pages: Optional[Iterable[int]] = None) -> Dict[int, str]:
+    """The one text extraction entry point: {page_num: text} from the chosen backend"""
+    return dict(get_backend(backend).page_texts(pdf_path, pages))
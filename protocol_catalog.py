@@ -0,0 +1,119 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+TEXT_FILE = "ems-protocol-manual.txt"
+TOC_HEADING = "TABLE OF CONTENTS"
+
+# Section divider lines in the TOC and the category everything under them belongs to
+SECTION_CATEGORIES = {
+    "ADULT TREATMENT PROTOCOLS": "Adult",
+    "PEDIATRIC TREATMENT PROTOCOLS": "Pediatric",
+    "OPERATIONS PROTOCOLS": "Operations",
+    "PROCEDURES PROTOCOLS": "Procedures",
+    "FORMULARY": "Formulary",
+}
+FRONT_MATTER = {"Foreword": "Front Matter", "Terms and Conventions": "Definitions"}
+# Typos in the printed TOC that don't match the protocol pages
+TOC_CORRECTIONS = {"Epistaxsis": "Epistaxis"}
+# "Title<TAB>page"; appendices are lettered, which ends the numbered part of the manual
+TOC_LINE = re.compile(r'^(?P<title>[^\t]+?)\.*\t(?P<page>\w+)$')
+# Cover page: "EFFECTIVE: October 15, 2025" then "(Replaces January 6, 2025 Version)"
+EFFECTIVE_LINE = re.compile(r'^EFFECTIVE:\s*(?P<date>.+?)\s*$', re.MULTILINE)
+REPLACES_LINE = re.compile(r'^\(Replaces\s+(?P<date>.+?)\s+Version\)\s*$', re.MULTILINE)
+
+
+def protocol_id(title: str, category: str) -> str:
+    """Same IDs the ingestors have always produced, e.g. ('Seizure', 'Pediatric') -> 'pediatric_seizure'"""
+    if category == "Pediatric" and not re.search(r'pediatric|neonatal', title, re.IGNORECASE):
+        title = f"Pediatric {title}"
+    return title.lower().replace(" ", "_").replace("/", "_").replace("(", "").replace(")", "")
+
+
+def parse_toc(text: str, total_pages: Optional[int] = None) -> List[dict]:
+    """Catalog entries (id, title, category, first_page, last_page) in manual order"""
+    start = text.find(TOC_HEADING)
+    if start == -1:
+        return []
+
+    entries = []
+    # Section divider pages bound the protocol before them but aren't protocols
+    boundaries = []
+    category = None
+    for raw in text[start + len(TOC_HEADING):].splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if line.endswith("(Cont.)"):
+            continue
+        match = TOC_LINE.match(line)
+        if not match:
+            # The TOC is over once the foreword starts
+            if entries:
+                break
+            continue
+
+        title = TOC_CORRECTIONS.get(match.group("title").strip(), match.group("title").strip())
+        page = match.group("page")
+        if not page.isdigit():
+            break
+        page = int(page)
+
+        if title in SECTION_CATEGORIES:
+            category = SECTION_CATEGORIES[title]
+            boundaries.append(page)
+            if category != "Formulary":
+                continue
+            # The formulary has no sub-entries: it is its own catalog entry
+        entry_category = category or FRONT_MATTER.get(title, "Front Matter")
+        entries.append({
+            "id": protocol_id(title, entry_category) if title != "FORMULARY" else "formulary",
+            "title": title.title() if title.isupper() else title,
+            "category": entry_category,
+            "first_page": page,
+            "last_page": None,
+        })
+
+    starts = sorted({e["first_page"] for e in entries} | set(boundaries))
+    for entry in entries:
+        later = [p for p in starts if p > entry["first_page"]]
+        entry["last_page"] = later[0] - 1 if later else total_pages
+    return entries
+
+
+def manual_edition(text: str) -> Dict[str, str]:
+    """{"effective": ..., "replaces": ...} from the cover page, whichever are printed"""
+    cover = text[:text.find(TOC_HEADING)] if TOC_HEADING in text else text[:2000]
+    edition = {}
+    for key, pattern in (("effective", EFFECTIVE_LINE), ("replaces", REPLACES_LINE)):
+        match = pattern.search(cover)
+        if match:
+            edition[key] = match.group("date")
+    return edition
+
+
+def load_catalog(path: str = TEXT_FILE, total_pages: Optional[int] = None) -> List[dict]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return parse_toc(f.read(), total_pages)
+
+
+def catalog_titles(catalog: List[dict], categories: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """{category: [titles]} for the title-splitting ingestors"""
+    wanted = list(categories) if categories is not None else list(SECTION_CATEGORIES.values())
+    titles = {category: [] for category in wanted if category != "Formulary"}
+    for entry in catalog:
+        if entry["category"] in titles:
+            titles[entry["category"]].append(entry["title"])
+    return titles
+
+
+def find_entry(catalog: List[dict], protocol: str) -> Optional[dict]:
+    """Look an entry up by ID or (case-insensitive) title"""
+    for entry in catalog:
+        if entry["id"] == protocol or entry["title"].lower() == protocol.lower():
+            return entry
+    return None
+
+
+def entry_pages(entry: dict) -> List[int]:
+    last = entry["last_page"] if entry["last_page"] is not None else entry["first_page"]
+    return list(range(entry["first_page"], last + 1))
@@ -0,0 +1,371 @@
+import hashlib
+import json
+import marshal
+import os
+import struct
+import sys
+import zlib
+from typing import Dict, Optional
+
+from protocol_store import STORE_FILE, build_sqlite
+
+DB_FILE = "ems_protocols.json"
+SNAPSHOT_FILE = "ems_protocols.snapshot"
+JSONL_FILE = "ems_protocols.jsonl"
+
+# Snapshot layout: magic, payload length, CRC32 of the payload, then the marshalled DB file
+SNAPSHOT_MAGIC = b"EMSSNAP1"
+SNAPSHOT_HEADER = struct.Struct("<8sQI")
+
+# Metadata strings up to this long are labels (levels, drug names, equipment) repeated
+# across protocols; longer ones are text and stay per record
+INTERN_MAX_CHARS = 64
+
+
+def content_hash(record: dict) -> str:
+    """Stable hash of a protocol record, independent of key order and formatting"""
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def intern_value(value):
+    if isinstance(value, str):
+        return sys.intern(value) if len(value) <= INTERN_MAX_CHARS else value
+    if isinstance(value, list):
+        return [intern_value(v) for v in value]
+    if isinstance(value, dict):
+        return {sys.intern(k): intern_value(v) for k, v in value.items()}
+    return value
+
+
+def intern_record(item: dict) -> dict:
+    """The record with its keys, category and short metadata values shared with every
+    other protocol's, instead of a copy per record"""
+    record = {sys.intern(k): v for k, v in item.items()}
+    if isinstance(record.get("category"), str):
+        record["category"] = sys.intern(record["category"])
+    if isinstance(record.get("metadata"), dict):
+        record["metadata"] = intern_value(record["metadata"])
+    return record
+
+
+def intern_protocols(protocols: Dict[str, dict]) -> Dict[str, dict]:
+    """Intern every record, replacing them in place one at a time so the parsed copies are
+    freed as it goes rather than after a second full DB is built. Every worker holds the
+    whole DB."""
+    for pid, item in protocols.items():
+        protocols[pid] = intern_record(item)
+    return protocols
+
+
+def read_db_file(path: str = DB_FILE) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_snapshot(data: dict, path: str = SNAPSHOT_FILE):
+    """Write the DB in a form that loads much faster than JSON at API startup"""
+    payload = marshal.dumps(data)
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(payload), zlib.crc32(payload))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str = SNAPSHOT_FILE) -> Optional[dict]:
+    """Load a snapshot, or return None if it is missing, truncated or corrupt"""
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+    except FileNotFoundError:
+        return None
+
+    if len(blob) < SNAPSHOT_HEADER.size:
+        return None
+    magic, length, checksum = SNAPSHOT_HEADER.unpack_from(blob)
+    payload = memoryview(blob)[SNAPSHOT_HEADER.size:]
+    if magic != SNAPSHOT_MAGIC or len(payload) != length or zlib.crc32(payload) != checksum:
+        print(f"⚠️ Ignoring invalid snapshot {path}")
+        return None
+    try:
+        return marshal.loads(payload)
+    except (EOFError, ValueError, TypeError):
+        print(f"⚠️ Ignoring unreadable snapshot {path}")
+        return None
+
+
+def mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return -1.0
+
+
+def load_db_data(path: str = DB_FILE, snapshot_path: str = SNAPSHOT_FILE,
+                 jsonl_path: str = JSONL_FILE) -> Optional[dict]:
+    """Prefer the snapshot when it is at least as new as the JSON file, else parse the JSON.
+    A JSONL ingest newer than both is loaded instead."""
+    if mtime(jsonl_path) > max(mtime(path), mtime(snapshot_path)):
+        sidecar = read_db_file(jsonl_sync_path(jsonl_path)) or {}
+        return {**sidecar, "protocols": read_jsonl(jsonl_path)}
+
+    try:
+        snapshot_fresh = os.path.getmtime(snapshot_path) >= os.path.getmtime(path)
+    except FileNotFoundError:
+        snapshot_fresh = os.path.exists(snapshot_path) and not os.path.exists(path)
+
+    if snapshot_fresh:
+        data = read_snapshot(snapshot_path)
+        if data is not None:
+            return data
+    return read_db_file(path)
+
+
+# --- JSONL ingest output ------------------------------------------------------
+# One {"id": ..., **record} object per line, appended as soon as the record is parsed.
+# A record written again (e.g. a protocol continued on the next page) supersedes the
+# earlier line until the finished ingest compacts the file to one line per record.
+# The sidecar index maps id -> [byte offset, length] of its latest line; a second
+# sidecar holds the metadata and /sync manifest that the JSON file keeps inline.
+
+def index_path(jsonl_path: str) -> str:
+    return jsonl_path + ".idx"
+
+
+def jsonl_sync_path(jsonl_path: str) -> str:
+    return jsonl_path + ".sync"
+
+
+def jsonl_line(pid: str, record: dict) -> bytes:
+    return json.dumps({"id": pid, **record}, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class JsonlWriter:
+    """Streams records to a JSONL file, flushing each one, and writes the offset index on close"""
+
+    def __init__(self, path: str = JSONL_FILE):
+        self.path = path
+        self.index = {}
+        self.file = open(path, "wb")
+
+    def write(self, pid: str, record: dict):
+        line = jsonl_line(pid, record)
+        offset = self.file.tell()
+        self.file.write(line)
+        # Finished records survive a crash later in the ingest
+        self.file.flush()
+        self.index[pid] = [offset, len(line)]
+
+    def compact(self, records: Dict[str, dict]):
+        """Replace the streamed file with one line per final record"""
+        self.file.close()
+        tmp_path = self.path + ".tmp"
+        index = {}
+        with open(tmp_path, "wb") as f:
+            for pid, record in records.items():
+                line = jsonl_line(pid, record)
+                index[pid] = [f.tell(), len(line)]
+                f.write(line)
+        os.replace(tmp_path, self.path)
+        self.index = index
+
+    def close(self):
+        self.file.close()
+        write_jsonl_index(self.path, self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_jsonl_index(jsonl_path: str, index: Dict[str, list]):
+    tmp_path = index_path(jsonl_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, index_path(jsonl_path))
+
+
+def scan_jsonl_index(jsonl_path: str) -> Dict[str, list]:
+    """Rebuild the index from the file itself, skipping a line cut off by a crash"""
+    index = {}
+    offset = 0
+    with open(jsonl_path, "rb") as f:
+        for line in f:
+            if line.endswith(b"\n"):
+                try:
+                    index[json.loads(line)["id"]] = [offset, len(line)]
+                except (ValueError, KeyError):
+                    pass
+            offset += len(line)
+    return index
+
+
+def load_jsonl_index(jsonl_path: str = JSONL_FILE) -> Dict[str, list]:
+    """The sidecar index, or a fresh scan if it is missing or older than the data (interrupted ingest)"""
+    if mtime(index_path(jsonl_path)) >= mtime(jsonl_path):
+        with open(index_path(jsonl_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    return scan_jsonl_index(jsonl_path)
+
+
+class JsonlReader:
+    """Random access to single records of a JSONL ingest by seeking to their offset"""
+
+    def __init__(self, path: str = JSONL_FILE):
+        self.path = path
+        self.index = load_jsonl_index(path)
+        self.file = open(path, "rb")
+
+    def __contains__(self, pid: str) -> bool:
+        return pid in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def ids(self):
+        return self.index.keys()
+
+    def get(self, pid: str) -> Optional[dict]:
+        entry = self.index.get(pid)
+        if entry is None:
+            return None
+        offset, length = entry
+        self.file.seek(offset)
+        record = json.loads(self.file.read(length))
+        record.pop("id", None)
+        return record
+
+    def close(self):
+        self.file.close()
+
+
+def read_jsonl(path: str = JSONL_FILE) -> Dict[str, dict]:
+    """Every current record of a JSONL ingest"""
+    reader = JsonlReader(path)
+    try:
+        # Index order is the order records were first written
+        # Each line is parsed on its own, so nothing is shared between records unless interned
+        return {pid: intern_record(reader.get(pid)) for pid in reader.ids()}
+    finally:
+        reader.close()
+
+
+def build_sync_info(data: dict) -> dict:
+    """Read the version manifest of a loaded DB file, filling it in for older files"""
+    protocols = data.get("protocols", data)
+    sync = data.get("sync") or {}
+    manifest = sync.get("manifest")
+
+    # Older DB files have no manifest: treat every protocol as part of version 1, so a
+    # client syncing from 0 gets all of them. Entries stamped 0 by an earlier save are
+    # lifted the same way.
+    if manifest is None:
+        manifest = {pid: {"hash": content_hash(rec), "version": 1} for pid, rec in protocols.items()}
+    else:
+        manifest = {pid: entry if entry["version"] else {**entry, "version": 1} for pid, entry in manifest.items()}
+
+    return {
+        "db_version": max(sync.get("db_version", 0), 1) if manifest else sync.get("db_version", 0),
+        "manifest": manifest,
+        "removed": sync.get("removed", {}),
+    }
+
+
+def stamp_versions(protocols: Dict[str, dict], previous: Optional[dict]) -> dict:
+    """Compare a fresh ingest against the previous DB file and assign versions"""
+    prev = build_sync_info(previous) if previous else {"db_version": 0, "manifest": {}, "removed": {}}
+    prev_manifest = prev["manifest"]
+    db_version = prev["db_version"] + 1
+
+    manifest = {}
+    changed = False
+    for pid, record in protocols.items():
+        digest = content_hash(record)
+        old = prev_manifest.get(pid)
+        if old and old["hash"] == digest:
+            manifest[pid] = old
+        else:
+            manifest[pid] = {"hash": digest, "version": db_version}
+            changed = True
+
+    # Tombstones are kept so a client on any older version learns about removals
+    removed = {pid: v for pid, v in prev["removed"].items() if pid not in protocols}
+    for pid in prev_manifest:
+        if pid not in protocols:
+            removed[pid] = db_version
+            changed = True
+
+    if not changed:
+        db_version = prev["db_version"]
+
+    return {"db_version": db_version, "manifest": manifest, "removed": removed}
+
+
+def save_db(protocols: Dict[str, dict], metadata: dict, path: str = DB_FILE,
+            snapshot_path: Optional[str] = SNAPSHOT_FILE, store_path: Optional[str] = STORE_FILE) -> dict:
+    """Write the DB file main.py loads, with per-protocol hashes and a bumped DB version,
+    plus the startup snapshot and the SQLite search store built from the same records"""
+    sync = stamp_versions(protocols, read_db_file(path))
+    output = {"metadata": {**metadata, "db_version": sync["db_version"]}, "sync": sync, "protocols": protocols}
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=4)
+    os.replace(tmp_path, path)
+
+    # Written after the JSON so its mtime marks it as current
+    if snapshot_path:
+        write_snapshot(output, snapshot_path)
+    if store_path:
+        build_sqlite(protocols, store_path)
+    return sync
+
+
+def save_jsonl(writer: JsonlWriter, protocols: Dict[str, dict], metadata: dict) -> dict:
+    """Finish a streamed ingest: compact the file, write its index, and stamp versions
+    against the previous JSONL ingest (or the JSON DB next to it) like save_db does"""
+    sync_file = jsonl_sync_path(writer.path)
+    previous = read_db_file(sync_file) or read_db_file(os.path.join(os.path.dirname(writer.path), DB_FILE))
+    sync = stamp_versions(protocols, previous)
+
+    writer.compact(protocols)
+    writer.close()
+    tmp_path = sync_file + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"metadata": {**metadata, "db_version": sync["db_version"]}, "sync": sync}, f,
+                  separators=(",", ":"))
+    os.replace(tmp_path, sync_file)
+    return sync
+
+
+def changes_since(protocols: Dict[str, dict], sync: dict, since: int) -> dict:
+    """Protocols added or changed after `since`, plus IDs removed after it"""
+    manifest = sync["manifest"]
+    return {
+        "db_version": sync["db_version"],
+        "since": since,
+        "changed": {
+            pid: {**protocols[pid], "content_hash": entry["hash"]}
+            for pid, entry in manifest.items()
+            if entry["version"] > since and pid in protocols
+        },
+        "removed": sorted(pid for pid, v in sync["removed"].items() if v > since),
+    }
+
+
+def manifest_changes(old: dict, new: dict) -> dict:
+    """IDs added or changed and IDs removed between two loaded versions, by manifest hash"""
+    old_manifest, new_manifest = old["manifest"], new["manifest"]
+    return {
+        "changed": sorted(pid for pid, entry in new_manifest.items()
+                          if old_manifest.get(pid, {}).get("hash") != entry["hash"]),
+        "removed": sorted(pid for pid in old_manifest if pid not in new_manifest),
+    }
@@ -0,0 +1,242 @@
+import os
+import queue
+import re
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Written by protocol_db.save_db next to the DB file the API loads
+STORE_FILE = "ems_protocols.db"
+
+SCHEMA = """
+CREATE TABLE protocols (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL,
+    word_count INTEGER NOT NULL DEFAULT 0,
+    raw_text TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE provider_levels (
+    protocol_id TEXT NOT NULL REFERENCES protocols(id),
+    level TEXT NOT NULL
+);
+CREATE TABLE flags (
+    protocol_id TEXT NOT NULL REFERENCES protocols(id),
+    name TEXT NOT NULL
+);
+CREATE TABLE medications (
+    protocol_id TEXT NOT NULL REFERENCES protocols(id),
+    name TEXT NOT NULL,
+    dosage TEXT,
+    route TEXT
+);
+CREATE TABLE contraindications (
+    protocol_id TEXT NOT NULL REFERENCES protocols(id),
+    text TEXT NOT NULL
+);
+CREATE TABLE pearls (
+    protocol_id TEXT NOT NULL REFERENCES protocols(id),
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+
+-- Lookups go from the filter value to protocol IDs, so every index leads with it
+CREATE INDEX idx_protocols_category ON protocols(category, id);
+CREATE INDEX idx_levels_level ON provider_levels(level, protocol_id);
+CREATE INDEX idx_flags_name ON flags(name, protocol_id);
+CREATE INDEX idx_medications_name ON medications(name, protocol_id);
+CREATE INDEX idx_contraindications_protocol ON contraindications(protocol_id);
+CREATE INDEX idx_pearls_protocol ON pearls(protocol_id, position);
+"""
+
+# Boolean fields stored as rows in `flags`
+FLAG_FIELDS = ["requires_telemetry", "has_flowchart"]
+
+# --- Fields derived from protocol text ------------------------------------------
+# The served DB keeps little beyond raw_text, so the indexed fields are read from the
+# text here. ProtocolParser (ingest_advanced) uses the same rules for its output.
+
+MEDICATION_PATTERNS = {
+    'EPINEPHRINE': r'EPINEPHRINE\s+(?:1:1000|1:10,000|1:100,000)?\s*,?\s*([^\n]+)',
+    'ATROPINE': r'ATROPINE\s+([^\n]+)',
+    'NALOXONE': r'NALOXONE\s+([^\n]+)',
+    'ALBUTEROL': r'ALBUTEROL\s+([^\n]+)',
+    'MIDAZOLAM': r'MIDAZOLAM\s+([^\n]+)',
+    'FENTANYL': r'FENTANYL\s+([^\n]+)',
+    'MORPHINE': r'MORPHINE\s+([^\n]+)',
+    'NITROGLYCERIN': r'NITROGLYCERIN\s+([^\n]+)',
+    'ADENOSINE': r'ADENOSINE\s+([^\n]+)',
+    'AMIODARONE': r'AMIODARONE\s+([^\n]+)',
+    'CALCIUM CHLORIDE': r'CALCIUM CHLORIDE\s+([^\n]+)',
+    'SODIUM BICARBONATE': r'SODIUM BICARBONATE\s+([^\n]+)',
+    'GLUCOSE': r'(?:GLUCOSE|D10)\s+([^\n]+)',
+    'DIPHENHYDRAMINE': r'DIPHENHYDRAMINE\s+([^\n]+)',
+    'ONDANSETRON': r'ONDANSETRON\s+([^\n]+)',
+}
+
+TELEMETRY_PATTERNS = [
+    r'telemetry.*required',
+    r'contact.*physician',
+    r'physician order',
+    r'medical control',
+    r'telemetry contact shall be established'
+]
+
+
+def extract_medications(text: str) -> List[Dict]:
+    """Medication administrations with dosage and route"""
+    meds = []
+    for med_name, pattern in MEDICATION_PATTERNS.items():
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            dosage_info = match.group(1).strip()
+
+            route = None
+            for candidate in ("IV", "IM", "IO", "IN"):
+                if re.search(rf'\b{candidate}\b', dosage_info, re.IGNORECASE):
+                    route = candidate
+                    break
+
+            meds.append({'name': med_name.title(), 'dosage': dosage_info, 'route': route})
+    return meds
+
+
+def requires_telemetry(text: str) -> bool:
+    return any(re.search(pattern, text, re.IGNORECASE) for pattern in TELEMETRY_PATTERNS)
+
+
+def provider_levels(text: str) -> List[str]:
+    """Provider levels that may use the protocol, or ['All'] if it names none"""
+    levels = []
+    if re.search(r'\bE\b.*EMT', text):
+        levels.append('EMT')
+    if re.search(r'\bA\b.*AEMT', text):
+        levels.append('AEMT')
+    if re.search(r'\bP\b.*Paramedic', text):
+        levels.append('Paramedic')
+    return levels or ['All']
+
+
+def store_fields(item: dict) -> dict:
+    """The indexed fields of one record: its own where it has them (ProtocolParser
+    output), otherwise read from raw_text"""
+    text = item.get("raw_text", "")
+    return {
+        "word_count": item.get("word_count") or len(text.split()),
+        "provider_level": item.get("provider_level") or provider_levels(text),
+        "medications": item.get("medications") or extract_medications(text),
+        "requires_telemetry": item.get("requires_telemetry", requires_telemetry(text)),
+        "has_flowchart": item.get("has_flowchart", bool(item.get("flow")) or bool(re.search(r'Yes\s+No', text))),
+        "contraindications": item.get("contraindications", []),
+        "pearls": item.get("pearls", []),
+    }
+
+
+def build_sqlite(protocols: Dict[str, dict], path: str = STORE_FILE):
+    """Write protocols into normalized, indexed tables"""
+    # Per process: API workers may rebuild the same stale store at once
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        for pid, p in protocols.items():
+            fields = store_fields(p)
+            conn.execute(
+                "INSERT INTO protocols (id, title, category, word_count, raw_text) VALUES (?, ?, ?, ?, ?)",
+                (pid, p["title"], p.get("category", "Uncategorized"), fields["word_count"], p.get("raw_text", "")),
+            )
+            conn.executemany("INSERT INTO provider_levels VALUES (?, ?)",
+                             [(pid, level) for level in fields["provider_level"]])
+            conn.executemany("INSERT INTO flags VALUES (?, ?)",
+                             [(pid, name) for name in FLAG_FIELDS if fields[name]])
+            conn.executemany("INSERT INTO medications VALUES (?, ?, ?, ?)",
+                             [(pid, m["name"].lower(), m.get("dosage"), m.get("route"))
+                              for m in fields["medications"]])
+            conn.executemany("INSERT INTO contraindications VALUES (?, ?)",
+                             [(pid, text) for text in fields["contraindications"]])
+            conn.executemany("INSERT INTO pearls VALUES (?, ?, ?)",
+                             [(pid, i, text) for i, text in enumerate(fields["pearls"])])
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+class ReadOnlyPool:
+    """A fixed set of read-only connections shared by the API's worker threads"""
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.connections = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self.connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get_nowait().close()
+
+
+class ProtocolStore:
+    """Structured queries over the SQLite store built at ingest"""
+
+    def __init__(self, path: str = STORE_FILE, pool_size: int = 4):
+        self.pool = ReadOnlyPool(path, pool_size)
+
+    def close(self):
+        self.pool.close()
+
+    def search(self, level: Optional[str] = None, medication: Optional[str] = None,
+               category: Optional[str] = None, telemetry: Optional[bool] = None,
+               flowchart: Optional[bool] = None, limit: int = 100) -> List[dict]:
+        clauses, params = [], []
+
+        if category:
+            clauses.append("p.category = ?")
+            params.append(category)
+        if level:
+            # 'All' means the protocol wasn't restricted to a level
+            clauses.append("p.id IN (SELECT protocol_id FROM provider_levels WHERE level IN (?, 'All'))")
+            params.append(level)
+        if medication:
+            clauses.append("p.id IN (SELECT protocol_id FROM medications WHERE name = ?)")
+            params.append(medication.lower())
+        for flag, wanted in (("requires_telemetry", telemetry), ("has_flowchart", flowchart)):
+            if wanted is None:
+                continue
+            op = "IN" if wanted else "NOT IN"
+            clauses.append(f"p.id {op} (SELECT protocol_id FROM flags WHERE name = ?)")
+            params.append(flag)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT p.id, p.title, p.category FROM protocols p {where} ORDER BY p.category, p.title LIMIT ?"
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, (*params, limit))]
+
+
+def open_store(path: str = STORE_FILE, protocols: Optional[Dict[str, dict]] = None,
+               loaded_from: float = -1.0) -> Optional[ProtocolStore]:
+    """Open the store save_db wrote. With `protocols` (the loaded DB), a store that is
+    missing or older than the DB's mtime `loaded_from` is rebuilt from them first."""
+    try:
+        built = os.path.getmtime(path)
+    except FileNotFoundError:
+        built = -1.0
+    if protocols and built < loaded_from:
+        build_sqlite(protocols, path)
+    elif built < 0:
+        return None
+    return ProtocolStore(path)
@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Rendered segments (script text plus audio metadata) cached in two tiers:
+# a per-worker dict in front of a SQLite file every worker on the host shares, so a
+# popular protocol is rendered once per host instead of once per worker.
+
+RENDER_CACHE_FILE = os.environ.get("EMS_RENDER_CACHE", "render_cache.db")
+TTL_SECONDS = 3600
+MEMORY_MAX_ENTRIES = 512
+SHARED_MAX_BYTES = 64 * 1024 * 1024
+EVICT_EVERY = 100         # shared-tier writes between sweeps for expired rows
+EVICT_TO = 0.9            # a full shared tier is trimmed to this fraction, not to just under the cap
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    stored REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_renders_stored ON renders(stored);
+"""
+
+
+class CacheTier:
+    """One level of the render cache: get() returns None on a miss"""
+    name = ""
+    # Touches disk, so an event loop should call it from a thread
+    blocking = False
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: dict):
+        raise NotImplementedError
+
+    def lookup(self, key: str) -> Optional[dict]:
+        value = self.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+
+class MemoryTier(CacheTier):
+    """Per-worker LRU with a TTL"""
+    name = "memory"
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES, ttl: float = TTL_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= self.clock():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class SqliteTier(CacheTier):
+    """Host-wide tier in a SQLite file (WAL, so workers read while one writes)"""
+    name = "shared"
+    blocking = True
+
+    def __init__(self, path: str = RENDER_CACHE_FILE, max_bytes: int = SHARED_MAX_BYTES,
+                 ttl: float = TTL_SECONDS, clock: Callable[[], float] = time.time):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        # A short timeout: waiting on another worker's write is slower than rendering
+        self.conn = sqlite3.connect(path, timeout=0.5, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Size of the table at the last sweep plus what this worker has written since, so
+        # most writes don't have to sum the table. Other workers' writes show up at the
+        # next sweep, which runs at least every EVICT_EVERY writes.
+        self.known_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM renders").fetchone()[0]
+        self.writes = 0
+
+    def get(self, key):
+        try:
+            with self.lock:
+                row = self.conn.execute("SELECT value FROM renders WHERE key = ? AND expires > ?",
+                                        (key, self.clock())).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def lookup(self, key):
+        value = self.get(key)
+        # Looked up from pool threads, so the counters are kept under the lock too
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        blob = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        now = self.clock()
+        try:
+            with self.lock:
+                self.conn.execute("INSERT OR REPLACE INTO renders VALUES (?, ?, ?, ?, ?)",
+                                  (key, blob, len(blob), now + self.ttl, now))
+                self.known_bytes += len(blob)
+                self.writes += 1
+                if self.writes >= EVICT_EVERY or self.known_bytes > self.max_bytes:
+                    self.evict(now)
+        except sqlite3.OperationalError:
+            # Locked by another worker: this render just isn't shared
+            pass
+
+    def evict(self, now: float):
+        """Drop expired rows, then, past max_bytes, the oldest rows down to EVICT_TO of it"""
+        self.conn.execute("DELETE FROM renders WHERE expires <= ?", (now,))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM renders").fetchone()[0]
+        self.known_bytes, self.writes = total, 0
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * EVICT_TO)
+        doomed, freed = [], 0
+        for key, size in self.conn.execute("SELECT key, size FROM renders ORDER BY stored"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM renders WHERE key = ?", doomed)
+        self.known_bytes -= freed
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM renders")
+            self.known_bytes, self.writes = 0, 0
+
+    def entries(self) -> Tuple[int, int]:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM renders").fetchone()
+
+
+class RenderCache:
+    """Tiers checked in order; a hit in a later tier is copied into the earlier ones"""
+
+    def __init__(self, tiers: List[CacheTier]):
+        self.tiers = tiers
+        self.renders = 0
+
+    def lookup(self, key: str, shared: bool = True) -> Optional[dict]:
+        """shared=False stops at the first tier that touches disk; an event loop reads
+        those with lookup_shared() on a thread and hands a hit back to promote()"""
+        for depth, tier in enumerate(self.tiers):
+            if not shared and tier.blocking:
+                return None
+            value = tier.lookup(key)
+            if value is not None:
+                for upper in self.tiers[:depth]:
+                    upper.set(key, value)
+                return value
+        return None
+
+    def store(self, key: str, value: dict, shared: bool = True):
+        """Record a fresh render in every tier. shared=False skips the tiers that write to
+        disk, leaving them to share(), which an event loop can run on a thread."""
+        self.renders += 1
+        for tier in self.tiers:
+            if shared or not tier.blocking:
+                tier.set(key, value)
+
+    def lookup_shared(self, key: str) -> Optional[dict]:
+        """The disk tiers only, copying nothing into memory: safe on a worker thread"""
+        for tier in self.tiers:
+            if tier.blocking:
+                value = tier.lookup(key)
+                if value is not None:
+                    return value
+        return None
+
+    def promote(self, key: str, value: dict):
+        """Copy a shared-tier hit into the tiers in front of it"""
+        for tier in self.tiers:
+            if not tier.blocking:
+                tier.set(key, value)
+
+    def share(self, key: str, value: dict):
+        for tier in self.tiers:
+            if tier.blocking:
+                tier.set(key, value)
+
+    def get_or_render(self, key: str, render: Callable[[], dict]) -> dict:
+        # Blocking end to end: for scripts and benchmarks, not for an event loop
+        value = self.lookup(key)
+        if value is None:
+            value = render()
+            self.store(key, value)
+        return value
+
+    def clear(self):
+        for tier in self.tiers:
+            if isinstance(tier, MemoryTier):
+                tier.entries.clear()
+            elif isinstance(tier, SqliteTier):
+                tier.clear()
+
+    def stats(self) -> Dict[Tuple, int]:
+        """{((tier, name), (result, hit|miss)): count} for a Metrics gauge"""
+        out = {}
+        for tier in self.tiers:
+            out[(("tier", tier.name), ("result", "hit"))] = tier.hits
+            out[(("tier", tier.name), ("result", "miss"))] = tier.misses
+        return out
+
+    def hit_ratios(self) -> Dict[Tuple, float]:
+        return {(("tier", tier.name),): round(tier.hits / (tier.hits + tier.misses), 4) if tier.hits + tier.misses else 0.0
+                for tier in self.tiers}
+
+
+def open_render_cache(path: Optional[str] = RENDER_CACHE_FILE) -> RenderCache:
+    """Memory in front of the shared file; memory alone if the file can't be used"""
+    tiers: List[CacheTier] = [MemoryTier()]
+    if path:
+        try:
+            tiers.append(SqliteTier(path))
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared render cache unavailable ({e}); caching per worker only")
+    return RenderCache(tiers)
@@ -0,0 +1,233 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+# Expands abbreviations and units in protocol text into what a TTS voice should say
+# ("IO" -> "intraosseous", "mg/kg" -> "milligrams per kilogram", "q 5 min" -> "every 5 minutes").
+# Terms come from the manual's Terms and Conventions plus the curated table below, and are
+# compiled into a character trie. expand() makes one left-to-right pass: at each token start
+# it follows the trie for the longest term (bounded by the longest key), so the cost is
+# linear in the text no matter how many terms there are.
+
+# Kinds of term, by what may sit right before them
+ABBREVIATION = "abbr"   # a whole token: "IO", "ETCO2"
+UNIT = "unit"           # may follow a number directly: "5mg", "10 mg/kg"
+COUNT = "count"         # only before a number: "q 5 min"
+
+# Curated entries win over the manual's definitions
+CURATED: Dict[str, Tuple[str, str]] = {
+    "SpO2": ("oxygen saturation", ABBREVIATION),
+    "ETCO2": ("end tidal C O 2", ABBREVIATION),
+    "EtCO2": ("end tidal C O 2", ABBREVIATION),
+    "O2": ("oxygen", ABBREVIATION),
+    "SBP": ("systolic blood pressure", ABBREVIATION),
+    "LPM": ("liters per minute", ABBREVIATION),
+    "NTG": ("nitroglycerin", ABBREVIATION),
+    "S/S": ("signs and symptoms", ABBREVIATION),
+    "N/V": ("nausea and vomiting", ABBREVIATION),
+    "y/o": ("year old", ABBREVIATION),
+    "q": ("every", COUNT),
+    "mg/kg": ("milligrams per kilogram", UNIT),
+    "mcg/kg": ("micrograms per kilogram", UNIT),
+    "mcg/kg/min": ("micrograms per kilogram per minute", UNIT),
+    "ml/kg": ("milliliters per kilogram", UNIT),
+    "mL/kg": ("milliliters per kilogram", UNIT),
+    "mg/dl": ("milligrams per deciliter", UNIT),
+    "mg/dL": ("milligrams per deciliter", UNIT),
+    "mcg/ml": ("micrograms per milliliter", UNIT),
+    "mg/ml": ("milligrams per milliliter", UNIT),
+    "L/min": ("liters per minute", UNIT),
+    "mg": ("milligrams", UNIT),
+    "mcg": ("micrograms", UNIT),
+    "ml": ("milliliters", UNIT),
+    "mL": ("milliliters", UNIT),
+    "kg": ("kilograms", UNIT),
+    "mmHg": ("millimeters of mercury", UNIT),
+    "min": ("minutes", UNIT),
+    "mins": ("minutes", UNIT),
+    "hr": ("hours", UNIT),
+    "hrs": ("hours", UNIT),
+    "sec": ("seconds", UNIT),
+    "gtts": ("drops", UNIT),
+    "%": ("percent", UNIT),
+}
+
+# Abbreviations that are also English words: in an all-caps line ("SOB") they are the word,
+# so they stay as written
+ENGLISH_WORDS = {"SOB"}
+# Abbreviations that are common words in any case ("Place patient IN position", "revised and
+# MAD approved"): expanded only where they name a route or device, i.e. after a dose
+# ("2 mg IN"), in a run of routes ("IN/IM/IV"), or after "via" ("via MAD")
+CONTEXT_ONLY = {"IN", "MAD"}
+# Manual definitions longer than this are mnemonics (OPQRST, SAMPLE), not something to read inline
+MAX_DEFINITION_WORDS = 6
+
+END = None  # trie key marking a complete term
+
+
+def definition_terms(db: Dict[str, dict]) -> Dict[str, str]:
+    """{abbreviation: expansion} from the manual's Terms and Conventions entries in a loaded DB.
+    Terms defined with alternatives ("Record/Report"), as a list, or twice with different
+    meanings are ambiguous and left out, so they are read as printed."""
+    terms, ambiguous = {}, set()
+    for item in db.values():
+        if item.get("category") != "Definitions":
+            continue
+        term, expansion = item.get("title", "").strip(), item.get("raw_text", "").strip()
+        if not term or not expansion:
+            continue
+        if "/" in expansion or ";" in expansion or len(expansion.split()) > MAX_DEFINITION_WORDS:
+            ambiguous.add(term)
+        elif terms.get(term, expansion) != expansion:
+            ambiguous.add(term)
+        else:
+            terms[term] = expansion
+    return {term: expansion for term, expansion in terms.items() if term not in ambiguous}
+
+
+def follows_one(text: str, start: int) -> bool:
+    """Whether a unit at `start` follows the number 1 ("1 mg", "1mg"), not 0.1 or 11"""
+    i = start
+    while i and text[i - 1] == " ":
+        i -= 1
+    return i > 0 and text[i - 1] == "1" and (i == 1 or not (text[i - 2].isdigit() or text[i - 2] == "."))
+
+
+def singular(spoken: str) -> str:
+    """Drop the plural from the first word: milligrams per kilogram -> milligram per kilogram"""
+    first, _, rest = spoken.partition(" ")
+    if first.endswith("s"):
+        first = first[:-1]
+    return f"{first} {rest}" if rest else first
+
+
+class Expander:
+    """A compiled term table; expand() rewrites text in one pass"""
+
+    def __init__(self, terms: Dict[str, Tuple[str, str]]):
+        self.trie: dict = {}
+        for term, entry in terms.items():
+            node = self.trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[END] = entry
+        self.terms = len(terms)
+        self.kept_raw = 0
+        self.line = (0, 0, False)
+
+    def longest(self, text: str, start: int) -> Optional[Tuple[int, Tuple[str, str]]]:
+        """End and entry of the longest term at `start` that ends on a token boundary"""
+        node, best = self.trie, None
+        i = start
+        n = len(text)
+        while i < n:
+            node = node.get(text[i])
+            if node is None:
+                break
+            i += 1
+            if END in node and (i == n or not text[i].isalnum()):
+                best = (i, node[END])
+        return best
+
+    def in_context(self, text: str, start: int, end: int) -> bool:
+        """Whether a context-only abbreviation at text[start:end] names a route: after a
+        dose, after "via", or joined by "/" to another abbreviation. Only looks at the
+        neighbouring words, so expand() stays linear."""
+        n = len(text)
+        if end < n and text[end] == "/":
+            after = end + 1
+            while after < n and text[after] == " ":
+                after += 1
+            found = self.longest(text, after)
+            if found and found[1][1] == ABBREVIATION:
+                return True
+
+        # The word before, past spaces and a comma ("0.05 mg/kg, IN") or a slash ("IM/ IN")
+        stop = start
+        while stop and text[stop - 1] in " ,":
+            stop -= 1
+        joined = stop > 0 and text[stop - 1] == "/"
+        if joined:
+            stop -= 1
+            while stop and text[stop - 1] == " ":
+                stop -= 1
+        word = stop
+        while word and (text[word - 1].isalnum() or (not joined and text[word - 1] in "/%")):
+            word -= 1
+        found = self.longest(text, word) if word < stop else None
+        kind = found[1][1] if found and found[0] == stop else None
+        if joined:
+            return kind == ABBREVIATION
+        return kind == UNIT or (stop > 0 and text[stop - 1].isdigit()) or text[word:stop].lower() == "via"
+
+    def ambiguous(self, text: str, start: int, end: int) -> bool:
+        """A context-only abbreviation outside a dose or route, or an English-word one in an
+        all-caps line"""
+        if text[start:end] in CONTEXT_ONLY:
+            return not self.in_context(text, start, end)
+        if text[start:end] not in ENGLISH_WORDS:
+            return False
+        line_start, line_end, upper = self.line
+        if not line_start <= start < line_end:
+            # Looked up once per line, however many such words it holds
+            line_start = text.rfind("\n", 0, start) + 1
+            line_end = text.find("\n", end)
+            line_end = line_end if line_end != -1 else len(text)
+            upper = text[line_start:line_end].isupper()
+            self.line = (line_start, line_end, upper)
+        return upper
+
+    def expand(self, text: str) -> str:
+        self.line = (0, 0, False)  # (start, end, all caps) of the last line ambiguous() checked
+        out = []
+        emitted = 0  # text[:emitted] is already in `out`
+        last_kind = None
+        i, n = 0, len(text)
+        trie = self.trie
+        while i < n:
+            ch = text[i]
+            prev = text[i - 1] if i else " "
+            if ch not in trie or prev.isalpha():
+                i += 1
+                continue
+            found = self.longest(text, i)
+            if found is None:
+                i += 1
+                continue
+            end, (spoken, kind) = found
+            if ((kind != UNIT and prev.isdigit())
+                    or (kind == COUNT and not text[end:end + 3].lstrip()[:1].isdigit())
+                    or self.ambiguous(text, i, end)):
+                self.kept_raw += 1
+                i = end
+                continue
+
+            between = text[emitted:i]
+            if out and between.strip(" ") == "/" and kind == last_kind:
+                # "IV/IO" -> "intravenous or intraosseous", "mg/hr" -> "milligrams per hour"
+                between = " or " if kind == ABBREVIATION else " per "
+            out.append(between)
+            if kind == UNIT:
+                if prev.isdigit():
+                    out.append(" ")
+                if between == " per " or follows_one(text, i):
+                    spoken = singular(spoken)
+            out.append(spoken)
+            emitted = end
+            last_kind = kind
+            i = end
+        out.append(text[emitted:])
+        return "".join(out)
+
+
+def build_expander(db: Dict[str, dict], curated: Optional[Dict[str, Tuple[str, str]]] = None) -> Expander:
+    """The manual's own definitions (from a loaded DB) overlaid with the curated table"""
+    terms = {term: (expansion, ABBREVIATION) for term, expansion in definition_terms(db).items()}
+    terms.update(CURATED if curated is None else curated)
+    return Expander(terms)
+
+
+def spoken_texts(db: Dict[str, dict], expander: Optional[Expander] = None) -> Iterable[Tuple[str, str]]:
+    """(id, spoken text) for every protocol that is read out; definitions are skipped"""
+    expander = expander or build_expander(db)
+    for pid, item in db.items():
+        if item.get("category") != "Definitions":
+            yield pid, expander.expand(item.get("raw_text", ""))
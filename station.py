@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Average TTS speaking rate, used to estimate how long a segment plays
+WORDS_PER_MINUTE = 150
+MIN_SEGMENT_SECONDS = 10
+
+LEVEL_FLAGS = {
+    "EMT": "emt_level",
+    "AEMT": "aemt_level",
+    "Paramedic": "paramedic_level",
+}
+
+
+def matches_provider_level(item: dict, level: str) -> bool:
+    """Check a protocol against a provider level in either DB format"""
+    # ProtocolParser output carries a list, parse_ems_protocols output carries flags
+    levels = item.get("provider_level")
+    if levels:
+        return level in levels or "All" in levels
+    flag = LEVEL_FLAGS.get(level)
+    return bool(flag and item.get("metadata", {}).get(flag))
+
+
+def build_rotation(db: dict, category: Optional[str] = None, provider_level: Optional[str] = None,
+                   protocol_ids: Optional[List[str]] = None) -> List[str]:
+    """Pick the protocol IDs a station cycles through"""
+    if protocol_ids:
+        return [pid for pid in protocol_ids if pid in db]
+
+    rotation = []
+    for pid, item in db.items():
+        if category and item.get("category", "Uncategorized") != category:
+            continue
+        if provider_level and not matches_provider_level(item, provider_level):
+            continue
+        rotation.append(pid)
+    return rotation
+
+
+def estimate_duration(script_text: str) -> float:
+    """Estimate spoken length of a script in seconds"""
+    words = len(script_text.split())
+    return max(MIN_SEGMENT_SECONDS, round(words * 60 / WORDS_PER_MINUTE, 1))
+
+
+class Station:
+    """A looping schedule of segments that every listener shares"""
+
+    def __init__(self, name: str, rotation: List[str], render: Callable[[str, str], Awaitable[dict]],
+                 mode: str = "review", lookahead: int = 5, clock: Callable[[], float] = time.time,
+                 custom: bool = False):
+        self.name = name
+        self.rotation = rotation
+        self.render = render
+        self.mode = mode
+        self.lookahead = lookahead
+        self.clock = clock
+        # Created through the API rather than built from the DB
+        self.custom = custom
+        # Renders await, so two listeners arriving together must not both extend the schedule
+        self.lock = asyncio.Lock()
+
+        self.started_at = clock()
+        self.next_seq = 0
+        self.next_start = self.started_at
+        self.schedule = deque()
+
+    async def schedule_next(self):
+        """Render the next segment in the rotation and append it to the schedule"""
+        protocol_id = self.rotation[self.next_seq % len(self.rotation)]
+        segment = await self.render(protocol_id, self.mode)
+        duration = estimate_duration(segment["script_text"])
+
+        self.schedule.append({
+            "seq": self.next_seq,
+            "protocol_id": protocol_id,
+            "start": self.next_start,
+            "duration": duration,
+            "segment": segment,
+        })
+        self.next_seq += 1
+        self.next_start += duration
+
+    async def advance(self):
+        """Drop finished segments and keep `lookahead` segments rendered past the playhead"""
+        async with self.lock:
+            now = self.clock()
+
+            # Catch up after an idle period without rendering everything we missed
+            while self.schedule and self.schedule[0]["start"] + self.schedule[0]["duration"] <= now:
+                self.schedule.popleft()
+            if not self.schedule and self.next_start < now:
+                self.next_start = now
+
+            # The rotation can be emptied by a re-ingest while a render is awaited
+            while self.rotation and len(self.schedule) < self.lookahead + 1:
+                await self.schedule_next()
+
+    async def get_segment(self, seq: int) -> Optional[dict]:
+        await self.advance()
+        for entry in self.schedule:
+            if entry["seq"] == seq:
+                return entry
+        return None
+
+    async def now_playing(self) -> dict:
+        await self.advance()
+        if not self.schedule:
+            return {"station": self.name, "now_playing": None, "up_next": []}
+
+        current = self.schedule[0]
+        return {
+            "station": self.name,
+            "now_playing": {
+                "seq": current["seq"],
+                "protocol_id": current["protocol_id"],
+                "title": current["segment"]["title"],
+                "elapsed": round(max(0.0, self.clock() - current["start"]), 1),
+                "duration": current["duration"],
+            },
+            "up_next": [
+                {"seq": e["seq"], "protocol_id": e["protocol_id"], "title": e["segment"]["title"]}
+                for e in list(self.schedule)[1:]
+            ],
+        }
+
+    async def playlist(self, segment_url: Callable[[int], str]) -> str:
+        """Render a live HLS-style media playlist for the current window"""
+        await self.advance()
+        entries = list(self.schedule)
+        first_seq = entries[0]["seq"] if entries else 0
+        target = max((e["duration"] for e in entries), default=MIN_SEGMENT_SECONDS)
+
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{int(target) + 1}",
+            f"#EXT-X-MEDIA-SEQUENCE:{first_seq}",
+        ]
+        for e in entries:
+            lines.append(f"#EXTINF:{e['duration']},{e['segment']['title']}")
+            lines.append(segment_url(e["seq"]))
+        return "\n".join(lines) + "\n"
+
+
+def build_stations(db: dict, render: Callable[[str, str], Awaitable[dict]], lookahead: int = 5) -> Dict[str, Station]:
+    """Create the default stations: everything, plus one per category"""
+    stations = {"all": Station("all", build_rotation(db), render, lookahead=lookahead)}
+    for category in sorted({item.get("category", "Uncategorized") for item in db.values()}):
+        name = category.lower().replace(" ", "_")
+        stations[name] = Station(name, build_rotation(db, category=category), render, lookahead=lookahead)
+    return stations
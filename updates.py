@@ -0,0 +1,88 @@
+import asyncio
+import json
+from collections import deque
+from typing import Optional
+
+# Push channel for DB swaps. Every connection waits on one shared asyncio.Event, so a
+# publish is a single set() that wakes all of them, and each event is encoded once and
+# the same bytes are written to every connection. Idle connections cost one waiter and
+# a keepalive timer each, nothing per message.
+
+KEEPALIVE_SECONDS = 15.0
+HISTORY = 32              # events kept for clients reconnecting with Last-Event-ID
+MAX_SUBSCRIBERS = 20000
+
+
+def sse_message(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    head = f"event: {event}\n" + (f"id: {event_id}\n" if event_id is not None else "")
+    return (head + f"data: {json.dumps(data, separators=(',', ':'))}\n\n").encode("utf-8")
+
+
+class UpdateBroadcaster:
+    """Fans version-change events out to every /updates connection"""
+
+    def __init__(self, db_version: int, keepalive: float = KEEPALIVE_SECONDS, history: int = HISTORY,
+                 max_subscribers: int = MAX_SUBSCRIBERS):
+        self.db_version = db_version
+        self.keepalive = keepalive
+        self.max_subscribers = max_subscribers
+        # (db_version, encoded message), oldest first
+        self.history = deque(maxlen=history)
+        self.published = asyncio.Event()
+        self.subscribers = 0
+        self.sent = 0
+
+    def publish(self, db_version: int, changed: list, removed: list):
+        if db_version == self.db_version and not changed and not removed:
+            return
+        message = sse_message("update", {"db_version": db_version, "previous": self.db_version,
+                                         "changed": changed, "removed": removed}, db_version)
+        self.db_version = db_version
+        self.history.append((db_version, message))
+        # Wake every waiting connection at once, then arm a fresh event for the next swap
+        self.published.set()
+        self.published = asyncio.Event()
+
+    def missed(self, since: int):
+        """Encoded events after `since`, or None if they are no longer all in the history"""
+        if since >= self.db_version:
+            return []
+        if not self.history or self.history[0][0] > since + 1:
+            # A gap we can't replay; the client has to fall back to /sync
+            return None
+        return [message for version, message in self.history if version > since]
+
+    def full(self) -> bool:
+        return self.subscribers >= self.max_subscribers
+
+    async def stream(self, since: Optional[int] = None):
+        """The current version, anything missed since `since`, then each update as it happens"""
+        self.subscribers += 1
+        try:
+            seen = self.db_version
+            yield sse_message("version", {"db_version": seen}, seen)
+            if since is not None:
+                backlog = self.missed(since)
+                if backlog is None:
+                    yield sse_message("resync", {"since": since, "db_version": seen})
+                else:
+                    for message in backlog:
+                        yield message
+
+            while True:
+                # Copied first: a slow client may still be writing when the next swap lands
+                pending = [(version, message) for version, message in self.history if version > seen]
+                for version, message in pending:
+                    self.sent += 1
+                    seen = version
+                    yield message
+                if pending:
+                    continue
+
+                try:
+                    await asyncio.wait_for(self.published.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    # SSE comment: keeps proxies from closing an idle connection
+                    yield b": keepalive\n\n"
+        finally:
+            self.subscribers -= 1